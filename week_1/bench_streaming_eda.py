@@ -0,0 +1,137 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from streaming_eda import CHUNK_SIZE, csv_chunks, frame_chunks, profile_chunks, profile_csv_files, stream_outliers
+
+# streaming_eda against the 01d notebook's in-memory comprehensive_eda_report and the
+# IQR / z-score parts of detect_outliers, on the notebook's e-commerce orders scaled up
+# (with some missing values and duplicate rows mixed in). Checks every statistic
+# against its stated error bound, then times the single pass over a CSV, in chunks,
+# and split across worker processes.
+# Usage: python bench_streaming_eda.py --rows 1000000 5000000 --workers 4
+
+
+def generate_orders(n_orders, seed=42):
+    """The notebook's orders merged with customers, for any number of orders"""
+    rng = np.random.default_rng(seed)
+    n_customers = max(n_orders // 5, 1)
+    customers = pd.DataFrame({
+        'customer_id': np.arange(1, n_customers + 1),
+        'age': rng.normal(35, 12, n_customers).clip(18, 70).astype(int),
+        'city': rng.choice(['Perth', 'Sydney', 'Melbourne', 'Brisbane', 'Adelaide'],
+                           n_customers, p=[0.15, 0.3, 0.25, 0.2, 0.1]),
+        'member_type': rng.choice(['Basic', 'Premium', 'VIP'], n_customers, p=[0.6, 0.3, 0.1]),
+    })
+    orders = pd.DataFrame({
+        'customer_id': rng.integers(1, n_customers + 1, n_orders),
+        'amount': rng.lognormal(4, 1, n_orders).clip(10, 1000).round(2),
+        'items': rng.poisson(3, n_orders).clip(1, 20),
+        'category': rng.choice(['Electronics', 'Clothing', 'Books', 'Home', 'Sports'],
+                               n_orders, p=[0.25, 0.3, 0.15, 0.2, 0.1]),
+    })
+    df = pd.merge(orders, customers, on='customer_id')
+    df.loc[rng.random(len(df)) < 0.01, 'amount'] = np.nan
+    df.loc[rng.random(len(df)) < 0.02, 'category'] = None
+    duplicates = df.sample(frac=0.001, random_state=seed)
+    return pd.concat([df, duplicates], ignore_index=True)
+
+
+def comprehensive_eda_report(df):
+    """The notebook's in-memory report (cell 25)"""
+    report = {
+        'shape': df.shape,
+        'memory_usage': df.memory_usage(deep=True, index=False).sum() / 1024**2,
+        'missing_values': df.isnull().sum().to_dict(),
+        'duplicate_rows': df.duplicated().sum(),
+        'unique_counts': df.nunique().to_dict(),
+        'numeric_summary': df.select_dtypes(include=[np.number]).describe().to_dict(),
+        'correlation': df.select_dtypes(include=[np.number]).corr(),
+        'categorical_summary': {},
+    }
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            counts = df[col].value_counts()
+            report['categorical_summary'][col] = {'unique': df[col].nunique(), 'most_common': df[col].mode()[0],
+                                                  'frequency': counts.iloc[0]}
+    return report
+
+
+def check(df, streamed, profile, kll_k):
+    """Largest deviation of each streamed statistic, asserting the exact ones match"""
+    expected = comprehensive_eda_report(df)
+    for key in ['shape', 'missing_values', 'duplicate_rows', 'unique_counts']:
+        assert tuple(streamed[key]) == tuple(expected[key]) if key == 'shape' else streamed[key] == expected[key], key
+    assert np.isclose(streamed['memory_usage'], expected['memory_usage'])
+    assert streamed['categorical_summary'] == expected['categorical_summary']
+    np.testing.assert_allclose(streamed['correlation'], expected['correlation'], atol=1e-9)
+
+    rank_error = 0.0
+    for column, stats in expected['numeric_summary'].items():
+        got = streamed['numeric_summary'][column]
+        for stat in ['count', 'mean', 'std', 'min', 'max']:
+            assert np.isclose(got[stat], stats[stat], rtol=1e-9), (column, stat)
+        values = np.sort(df[column].dropna().to_numpy())
+        for q, stat in [(0.25, '25%'), (0.5, '50%'), (0.75, '75%')]:
+            # how many ranks away from q the streamed quantile lies, as a fraction of n
+            lo, hi = np.searchsorted(values, got[stat], 'left'), np.searchsorted(values, got[stat], 'right')
+            target = q * (len(values) - 1)
+            rank_error = max(rank_error, max(lo - target, target - hi, 0) / len(values))
+    assert rank_error <= 1.7 / kll_k, rank_error
+
+    outliers = stream_outliers(frame_chunks(df, CHUNK_SIZE), 'amount', profile)
+    lower, upper = profile.outlier_fences('amount')
+    z = np.abs((df['amount'] - df['amount'].mean()) / df['amount'].std(ddof=0))
+    assert len(outliers['Z-score']) == int((z > 3).sum())
+    exact_q1, exact_q3 = df['amount'].quantile([0.25, 0.75])
+    exact_iqr = int(((df['amount'] < exact_q1 - 1.5 * (exact_q3 - exact_q1))
+                     | (df['amount'] > exact_q3 + 1.5 * (exact_q3 - exact_q1))).sum())
+    return rank_error, len(outliers['IQR']), exact_iqr
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming EDA report benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--kll-k', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'pandas s':>9} {'stream s':>9} {'csv s':>7} {'parallel s':>10} "
+          f"{'rank err':>9} {'IQR rows':>9} {'exact IQR':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.rows:
+            df = generate_orders(n)
+            start = time.perf_counter()
+            comprehensive_eda_report(df)
+            pandas_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            profile = profile_chunks(frame_chunks(df, args.chunksize), kll_k=args.kll_k)
+            streamed = profile.report()
+            stream_seconds = time.perf_counter() - start
+            rank_error, iqr_rows, exact_iqr = check(df, streamed, profile, args.kll_k)
+
+            paths = []
+            for i, part in enumerate(np.array_split(np.arange(len(df)), args.workers)):
+                paths.append(os.path.join(directory, f'orders_{i}.csv'))
+                df.iloc[part].to_csv(paths[-1], index=False)
+            start = time.perf_counter()
+            for path in paths:
+                profile_chunks(csv_chunks(path, args.chunksize), kll_k=args.kll_k)
+            csv_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            merged = profile_csv_files(paths, args.workers, args.chunksize, kll_k=args.kll_k).report()
+            parallel_seconds = time.perf_counter() - start
+            assert merged['shape'] == streamed['shape'] and merged['unique_counts'] == streamed['unique_counts']
+
+            print(f"{n:>10,} {pandas_seconds:>9.2f} {stream_seconds:>9.2f} {csv_seconds:>7.2f} "
+                  f"{parallel_seconds:>10.2f} {rank_error:>9.4%} {iqr_rows:>9,} {exact_iqr:>9,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,573 @@
+import os
+import sqlite3
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# Streaming version of the 01d notebook's comprehensive_eda_report / detect_outliers.
+#
+#   profile = profile_chunks(csv_chunks('transactions.csv'))      one pass, any file size
+#   profile.report()                  same keys as comprehensive_eda_report, plus 'correlation'
+#   stream_outliers(csv_chunks('transactions.csv'), 'amount', profile)    second pass
+#   profile_csv_files(paths, workers=4)                           one process per file, merged
+#
+# Every statistic is a mergeable sketch, so chunks can come from read_csv(chunksize=...)
+# or a SQLite cursor, and profiles of separate partitions combine with merge():
+#   - count / mean / std and the correlation matrix: pairwise co-moments merged with
+#     Chan's update (Welford for batches) - exact up to floating point,
+#   - min / max / missing counts / rows / memory: exact,
+#   - quartiles and the IQR fences: a KLL sketch per numeric column,
+#   - nunique and duplicate rows: exact 64-bit hash sets (8 bytes per distinct value)
+#     up to DISTINCT_EXACT_LIMIT values per column / DUPLICATE_EXACT_LIMIT rows, then a
+#     HyperLogLog - which cannot see a handful of duplicates among many rows,
+#   - most common value and its frequency: exact counts up to FREQUENCY_EXACT_LIMIT
+#     distinct values, then a count-min sketch plus the top-k candidates.
+# profile.error_bounds() states the bound that applies to each statistic.
+# A column is numeric or categorical by its dtype in the first chunk; text that turns up
+# later in a numeric column is left out of that column's numeric statistics.
+
+CHUNK_SIZE = 500_000
+KLL_K = 1000
+DISTINCT_EXACT_LIMIT = 1 << 22
+DUPLICATE_EXACT_LIMIT = 1 << 26
+HLL_PRECISION = 14
+FREQUENCY_EXACT_LIMIT = 100_000
+COUNT_MIN_DEPTH = 5
+COUNT_MIN_WIDTH = 1 << 16
+TOP_K = 64
+
+
+def _hash_values(values):
+    """64-bit hash per value (pandas' hash_array; datetimes hashed by their int64 value)"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'mM':
+        values = values.view(np.int64)
+    return pd.util.hash_array(values)
+
+
+class KLLSketch:
+    """KLL quantile sketch: O(k) memory, mergeable, rank error about 1.7 / k of n"""
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = len(items) % 2  # an odd item out stays at this level
+                # every other item moves up a level with twice the weight
+                promoted = items[keep + self.rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:keep]
+                compacted = True
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate quantile(s) with pandas' linear interpolation between ranks"""
+        values = np.concatenate(self.levels)
+        if not len(values):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        # each item stands for `weight` consecutive ranks; place it at the middle of them
+        ranks = np.cumsum(weights) - (weights + 1) / 2
+        return np.interp(np.asarray(q) * (self.n - 1), ranks, values)
+
+
+class DistinctCounter:
+    """Distinct values: an exact set of 64-bit hashes, switching to HyperLogLog when large"""
+
+    def __init__(self, exact_limit=DISTINCT_EXACT_LIMIT, precision=HLL_PRECISION):
+        self.exact_limit = exact_limit
+        self.precision = precision
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self._pending = []
+        self._pending_size = 0
+        self.registers = None
+
+    def _compact(self):
+        if self.registers is not None:
+            return
+        if self._pending:
+            hashes = np.sort(np.concatenate([self.hashes] + self._pending))
+            self.hashes = hashes[np.concatenate([[True], hashes[1:] != hashes[:-1]])]
+            self._pending, self._pending_size = [], 0
+        if len(self.hashes) > self.exact_limit:
+            self._to_hll()
+
+    def _to_hll(self):
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self._add_to_registers(self.hashes)
+        self.hashes = None
+
+    def _add_to_registers(self, hashes):
+        p = self.precision
+        bucket = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes << np.uint64(p)
+        # rank = leading zeros of the remaining bits + 1
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = np.minimum(64 - bit_length + 1, 64 - p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, bucket, rank)
+
+    def update_hashes(self, hashes):
+        if self.registers is not None:
+            self._add_to_registers(hashes)
+            return self
+        self._pending.append(np.asarray(hashes, dtype=np.uint64))
+        self._pending_size += len(hashes)
+        # amortised: deduplicate once the pending hashes outgrow the set
+        if self._pending_size > max(len(self.hashes), 1 << 16):
+            self._compact()
+        return self
+
+    def update(self, values):
+        return self.update_hashes(_hash_values(values))
+
+    def merge(self, other):
+        other._compact()
+        if other.registers is None:
+            return self.update_hashes(other.hashes)
+        self._compact()
+        if self.registers is None:
+            self._to_hll()
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def exact(self):
+        self._compact()
+        return self.registers is None
+
+    def count(self):
+        self._compact()
+        if self.registers is None:
+            return len(self.hashes)
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class FrequencySketch:
+    """Value counts: exact up to exact_limit distinct values, then count-min plus top-k candidates"""
+
+    def __init__(self, exact_limit=FREQUENCY_EXACT_LIMIT, depth=COUNT_MIN_DEPTH, width=COUNT_MIN_WIDTH,
+                 top_k=TOP_K):
+        self.exact_limit = exact_limit
+        self.depth = depth
+        self.width = width
+        self.top_k = top_k
+        self.n = 0
+        self.counts = pd.Series(dtype=np.int64)
+        self.table = None
+        self.candidates = None
+
+    def _cells(self, keys):
+        hashes = _hash_values(np.asarray(keys, dtype=object))
+        low = (hashes & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        high = (hashes >> np.uint64(32)).astype(np.int64) | 1
+        return [(low + i * high) % self.width for i in range(self.depth)]
+
+    def _add_to_table(self, counts):
+        for row, cells in enumerate(self._cells(counts.index)):
+            self.table[row] += np.bincount(cells, weights=counts.to_numpy(np.float64), minlength=self.width)
+        self._keep_top(counts.index)
+
+    def _estimate(self, keys):
+        return np.min([self.table[row][cells] for row, cells in enumerate(self._cells(keys))], axis=0)
+
+    def _keep_top(self, keys):
+        keys = pd.Index(self.candidates).append(pd.Index(keys)).unique()
+        estimates = pd.Series(self._estimate(keys), index=keys)
+        self.candidates = estimates.nlargest(self.top_k).index
+
+    def _to_count_min(self):
+        self.table = np.zeros((self.depth, self.width))
+        self.candidates = pd.Index([])
+        counts, self.counts = self.counts, None
+        self._add_to_table(counts)
+
+    def update_counts(self, counts):
+        self.n += int(counts.sum())
+        if self.table is not None:
+            # only this chunk's most frequent values can join the candidates
+            self._add_to_table(counts)
+            return self
+        self.counts = self.counts.add(counts, fill_value=0).astype(np.int64)
+        if len(self.counts) > self.exact_limit:
+            self._to_count_min()
+        return self
+
+    def update(self, values):
+        return self.update_counts(pd.Series(values).value_counts())
+
+    def merge(self, other):
+        if other.table is None:
+            return self.update_counts(other.counts)
+        if self.table is None:
+            self._to_count_min()
+        self.table += other.table
+        self.n += other.n
+        self._keep_top(other.candidates)
+        return self
+
+    @property
+    def exact(self):
+        return self.table is None
+
+    def most_common(self):
+        """(value, count) of the most frequent value, or (None, 0) when there are no values"""
+        if self.exact:
+            if not len(self.counts):
+                return None, 0
+            # ties go to the smallest value, like mode()[0]
+            top = self.counts[self.counts == self.counts.max()]
+            return top.index.sort_values()[0], int(top.iloc[0])
+        estimates = pd.Series(self._estimate(self.candidates), index=self.candidates)
+        return estimates.idxmax(), int(estimates.max())
+
+    def overcount_bound(self):
+        """Count-min overestimate bound e/width * n, holding with probability 1 - exp(-depth)"""
+        return 0.0 if self.exact else np.e / self.width * self.n
+
+
+class CoMoments:
+    """Pairwise-complete counts, means, variances and co-moments of numeric columns (like DataFrame.corr)
+
+    For every pair (i, j) the statistics cover the rows where both are present, so the
+    diagonal is each column's own count/mean/variance. Batches merge with Chan et al.'s
+    parallel update: exact up to floating point, in any order.
+    """
+
+    def __init__(self, columns):
+        p = len(columns)
+        self.columns = list(columns)
+        self.n = np.zeros((p, p))
+        self.mean = np.zeros((p, p))    # mean[i, j]: mean of column i over rows where i and j are present
+        self.m2 = np.zeros((p, p))      # sum of squared deviations, same rows
+        self.comoment = np.zeros((p, p))
+
+    def _combine(self, n, mean, m2, comoment):
+        total = self.n + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            weight = np.where(total > 0, self.n * n / total, 0.0)
+            self.comoment += comoment + delta * delta.T * weight
+            self.m2 += m2 + delta * delta * weight
+            self.mean += np.where(total > 0, delta * n / total, 0.0)
+        self.n = total
+
+    def update(self, values):
+        """values: 2-D float array, one column per self.columns entry, NaN for missing"""
+        values = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(values)
+        # centre on the chunk's column means first so the sums below do not cancel
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(values.shape[1])
+        x = np.where(present, values - shift, 0.0)
+        mask = present.astype(np.float64)
+        n = mask.T @ mask
+        sums = x.T @ mask               # sums[i, j]: sum of column i where j is present
+        squares = (x * x).T @ mask
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, sums / n, 0.0)
+            m2 = np.where(n > 0, squares - sums * mean, 0.0)
+            comoment = np.where(n > 0, x.T @ x - sums * sums.T / n, 0.0)
+        self._combine(n, mean + shift[:, None], m2, comoment)
+        return self
+
+    def merge(self, other):
+        self._combine(other.n, other.mean, other.m2, other.comoment)
+        return self
+
+    def count(self):
+        return np.diag(self.n)
+
+    def column_mean(self):
+        return np.where(self.count() > 0, np.diag(self.mean), np.nan)
+
+    def column_std(self):
+        n = self.count()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 1, np.sqrt(np.diag(self.m2) / (n - 1)), np.nan)
+
+    def correlation(self):
+        """Pearson correlation matrix (pairwise-complete, NaN where undefined)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr[self.n < 2] = np.nan
+        np.fill_diagonal(corr, np.where(self.count() > 1, 1.0, np.nan))
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns)
+
+
+def _is_categorical(dtype):
+    return (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+            or isinstance(dtype, pd.CategoricalDtype))
+
+
+def _is_numeric(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _combine_dtypes(left, right):
+    if left == right:
+        return left
+    if _is_numeric(left) and _is_numeric(right):
+        return np.result_type(left, right)
+    return np.dtype(object)
+
+
+class StreamingProfile:
+    """comprehensive_eda_report statistics accumulated chunk by chunk (and mergeable)"""
+
+    def __init__(self, kll_k=KLL_K, distinct_limit=DISTINCT_EXACT_LIMIT, duplicate_limit=DUPLICATE_EXACT_LIMIT,
+                 frequency_limit=FREQUENCY_EXACT_LIMIT, seed=0):
+        self.kll_k = kll_k
+        self.distinct_limit = distinct_limit
+        self.duplicate_limit = duplicate_limit
+        self.frequency_limit = frequency_limit
+        self.seed = seed
+        self.columns = None
+        self.rows = 0
+        self.memory_bytes = 0
+
+    def _start(self, chunk):
+        self.columns = list(chunk.columns)
+        self.dtypes = dict(chunk.dtypes)
+        self.numeric = [c for c in self.columns if _is_numeric(chunk[c].dtype)]
+        self.categorical = [c for c in self.columns if _is_categorical(chunk[c].dtype)]
+        self.missing = dict.fromkeys(self.columns, 0)
+        self.minimum = dict.fromkeys(self.numeric, np.nan)
+        self.maximum = dict.fromkeys(self.numeric, np.nan)
+        self.distinct = {c: DistinctCounter(self.distinct_limit) for c in self.columns}
+        self.rows_distinct = DistinctCounter(self.duplicate_limit)
+        self.quantiles = {c: KLLSketch(self.kll_k, seed=self.seed + i) for i, c in enumerate(self.numeric)}
+        self.frequencies = {c: FrequencySketch(self.frequency_limit) for c in self.categorical}
+        self.moments = CoMoments(self.numeric)
+
+    def update(self, chunk):
+        if self.columns is None:
+            self._start(chunk)
+        chunk = chunk[self.columns]
+        self.rows += len(chunk)
+        self.memory_bytes += int(chunk.memory_usage(deep=True, index=False).sum())
+        for column, dtype in chunk.dtypes.items():
+            self.dtypes[column] = _combine_dtypes(self.dtypes[column], dtype)
+        missing = chunk.isna().sum()
+        for column in self.columns:
+            self.missing[column] += int(missing[column])
+            values = chunk[column].dropna()
+            self.distinct[column].update(values.to_numpy())
+            if column in self.frequencies:
+                self.frequencies[column].update_counts(values.value_counts())
+        self.rows_distinct.update_hashes(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        if self.numeric:
+            frame = chunk[self.numeric]
+            drifted = [c for c in self.numeric if not _is_numeric(frame[c].dtype)]
+            if drifted:
+                # numeric in the first chunk (e.g. all empty, so float64) but not in this one:
+                # values that do not parse as numbers are left out of the numeric statistics
+                frame = frame.copy()
+                for column in drifted:
+                    frame[column] = pd.to_numeric(frame[column], errors='coerce')
+            numeric = frame.to_numpy(dtype=np.float64, na_value=np.nan)
+            self.moments.update(numeric)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns in this chunk
+                low, high = np.nanmin(numeric, axis=0), np.nanmax(numeric, axis=0)
+            for i, column in enumerate(self.numeric):
+                self.minimum[column] = np.fmin(self.minimum[column], low[i])
+                self.maximum[column] = np.fmax(self.maximum[column], high[i])
+                self.quantiles[column].update(numeric[:, i])
+        return self
+
+    def merge(self, other):
+        """Fold another partition's profile (same columns) into this one"""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(other.__dict__)
+            return self
+        self.rows += other.rows
+        self.memory_bytes += other.memory_bytes
+        for column in self.columns:
+            self.dtypes[column] = _combine_dtypes(self.dtypes[column], other.dtypes[column])
+            self.missing[column] += other.missing[column]
+            self.distinct[column].merge(other.distinct[column])
+        self.rows_distinct.merge(other.rows_distinct)
+        for column in self.numeric:
+            self.minimum[column] = np.fmin(self.minimum[column], other.minimum[column])
+            self.maximum[column] = np.fmax(self.maximum[column], other.maximum[column])
+            self.quantiles[column].merge(other.quantiles[column])
+        for column in self.categorical:
+            self.frequencies[column].merge(other.frequencies[column])
+        self.moments.merge(other.moments)
+        return self
+
+    def numeric_summary(self):
+        """describe() of the numeric columns as a DataFrame (statistics x columns)"""
+        summary = {}
+        count, mean, std = self.moments.count(), self.moments.column_mean(), self.moments.column_std()
+        for i, column in enumerate(self.numeric):
+            q1, median, q3 = self.quantiles[column].quantile([0.25, 0.5, 0.75])
+            summary[column] = {'count': count[i], 'mean': mean[i], 'std': std[i], 'min': self.minimum[column],
+                               '25%': q1, '50%': median, '75%': q3, 'max': self.maximum[column]}
+        return pd.DataFrame(summary)
+
+    def outlier_fences(self, column, whisker=1.5):
+        """(lower, upper) IQR fences of a numeric column, from the KLL quartiles"""
+        q1, q3 = self.quantiles[column].quantile([0.25, 0.75])
+        return q1 - whisker * (q3 - q1), q3 + whisker * (q3 - q1)
+
+    def report(self):
+        """Same keys and layout as comprehensive_eda_report(df), plus 'correlation' and 'error_bounds'"""
+        if self.columns is None:
+            raise ValueError('no chunks have been profiled')
+        report = {
+            'shape': (self.rows, len(self.columns)),
+            'memory_usage': self.memory_bytes / 1024**2,  # MB, without the index
+            'missing_values': dict(self.missing),
+            'missing_percentage': {c: n / self.rows * 100 for c, n in self.missing.items()},
+            'duplicate_rows': self.rows - self.rows_distinct.count(),
+            'dtypes': pd.Series(list(self.dtypes.values())).value_counts().to_dict(),
+            'unique_counts': {c: counter.count() for c, counter in self.distinct.items()},
+        }
+        if self.numeric:
+            report['numeric_summary'] = self.numeric_summary().to_dict()
+            report['correlation'] = self.moments.correlation()
+        if self.categorical:
+            report['categorical_summary'] = {}
+            for column in self.categorical:
+                value, frequency = self.frequencies[column].most_common()
+                report['categorical_summary'][column] = {
+                    'unique': self.distinct[column].count(),
+                    'most_common': value,
+                    'frequency': frequency,
+                }
+        report['error_bounds'] = self.error_bounds()
+        return report
+
+    def error_bounds(self):
+        """How far each report statistic can be from the in-memory comprehensive_eda_report"""
+        inexact_distinct = [c for c, counter in self.distinct.items() if not counter.exact]
+        inexact_frequency = {c: sketch.overcount_bound() for c, sketch in self.frequencies.items()
+                             if not sketch.exact}
+        hll_error = 1.04 / np.sqrt(1 << HLL_PRECISION)
+        return {
+            'exact': ['shape', 'missing_values', 'missing_percentage', 'dtypes', 'count', 'min', 'max'],
+            'floating_point': ['mean', 'std', 'correlation'],
+            'quantiles': f"rank error about {1.7 / self.kll_k:.2%} of the rows (KLL, k={self.kll_k})",
+            'unique_counts': (f"exact except {inexact_distinct}: HyperLogLog, standard error {hll_error:.2%}"
+                              if inexact_distinct else 'exact'),
+            'duplicate_rows': (f"rows - HyperLogLog distinct rows, standard error {hll_error:.2%} of the rows"
+                               if not self.rows_distinct.exact else 'exact'),
+            'frequency': ({c: f"overcounts by at most {bound:,.0f} with probability "
+                              f"{1 - np.exp(-COUNT_MIN_DEPTH):.1%}" for c, bound in inexact_frequency.items()}
+                          or 'exact'),
+        }
+
+
+def frame_chunks(df, chunksize=CHUNK_SIZE):
+    """An in-memory DataFrame as chunks, for comparing against the in-memory report"""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def csv_chunks(path, chunksize=CHUNK_SIZE, **read_csv_kwargs):
+    return pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs)
+
+
+def sqlite_chunks(database, sql, params=(), chunksize=CHUNK_SIZE):
+    """SELECT results as DataFrames of at most chunksize rows, read with fetchmany"""
+    connection = sqlite3.connect(database)
+    try:
+        cursor = connection.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        connection.close()
+
+
+def profile_chunks(chunks, **kwargs):
+    """One pass over an iterable of DataFrames; returns the StreamingProfile"""
+    profile = StreamingProfile(**kwargs)
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile
+
+
+def _profile_csv(args):
+    path, chunksize, read_csv_kwargs, kwargs = args
+    return profile_chunks(csv_chunks(path, chunksize, **read_csv_kwargs), **kwargs)
+
+
+def profile_csv_files(paths, workers=None, chunksize=CHUNK_SIZE, read_csv_kwargs=None, **kwargs):
+    """Profile each CSV file in its own process and merge the partial profiles"""
+    tasks = [(path, chunksize, read_csv_kwargs or {}, kwargs) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return reduce(StreamingProfile.merge, pool.map(_profile_csv, tasks), StreamingProfile(**kwargs))
+
+
+def stream_outliers(chunks, column, profile, whisker=1.5, z_threshold=3):
+    """Second pass of detect_outliers: {'IQR': rows, 'Z-score': rows} using profile's fences.
+
+    The notebook's Isolation Forest needs every row in memory, so it has no streaming
+    counterpart here.
+    """
+    lower, upper = profile.outlier_fences(column, whisker)
+    i = profile.numeric.index(column)
+    mean, std = profile.moments.column_mean()[i], profile.moments.column_std()[i]
+    # stats.zscore uses the population standard deviation (ddof=0)
+    n = profile.moments.count()[i]
+    population_std = std * np.sqrt((n - 1) / n)
+    iqr, z_score = [], []
+    for chunk in chunks:
+        values = pd.to_numeric(chunk[column], errors='coerce')   # text is left out, as in the profile
+        iqr.append(chunk[(values < lower) | (values > upper)])
+        z_score.append(chunk[np.abs((values - mean) / population_std) > z_threshold])
+    return {'IQR': pd.concat(iqr, ignore_index=True) if iqr else pd.DataFrame(),
+            'Z-score': pd.concat(z_score, ignore_index=True) if z_score else pd.DataFrame()}
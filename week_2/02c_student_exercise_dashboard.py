@@ -2,8 +2,18 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt  
 import seaborn as sns
+from matplotlib.colors import to_hex
+
+from chart_cache import FigureCache, chart_key
+from distribution_histograms import (
+    CHUNK_SIZE,
+    DISTRIBUTIONS,
+    IN_MEMORY_MAX_SAMPLES,
+    distribution_histogram,
+    distribution_params,
+)
+from rerun_profiler import RerunProfiler
 
 # Page config
 st.set_page_config(
@@ -12,70 +22,86 @@ st.set_page_config(
     layout = 'wide'
 )
 
+# Section timings, cache hits/misses and RSS per rerun ("Rerun timing" in the sidebar)
+profiler = RerunProfiler('02c_student_exercise_dashboard')
+
 # Title
 st.title("Statistical Diagrams")
 st.markdown("Interactive view of different types of statistical distribution.")
 
 #sidebar items
 random_seed = st.sidebar.number_input("Random seed", value = 42, min_value = 1)
-size_samples = st.sidebar.number_input("Size samples (100 to 100000)", value = 10000, min_value=100)
+size_samples = st.sidebar.number_input("Size samples (100 to 100000000)", value = 10000, min_value=100, max_value=10**8)
 loc = st.sidebar.number_input("Loc (2 to 9)", min_value = 2, max_value = 9, value=5)
 scale = st.sidebar.number_input("Scale (std dev; 1 to 2)", min_value = 1, max_value = 2, value=1)
 plot_range = st.sidebar.slider("Range for random.randint and random.uniform", min_value = 0, max_value = 10, value=(0,10))
 
 # Load data
-@st.cache_data
-
-def load_data(random_seed, size_samples, loc, scale, plot_range):
-    np.random.seed(random_seed)
-    df = pd.DataFrame({
-        'random_normal' : np.random.normal(loc, scale, size_samples).round(2),
-        'random_lognormal' : np.random.lognormal(loc, scale, size_samples).round(2),
-        'random_exponential' : np.random.exponential(scale,size_samples).round(2),
-        'random_poisson' : np.random.poisson(loc,size_samples),
-        'random_randint' : np.random.randint(plot_range[0], plot_range[1], size_samples),
-        'random_uniform' : np.random.uniform(plot_range[0], plot_range[1], size_samples).round(2)
-    })
-    return df
-
-distribution_df = load_data(random_seed, size_samples, loc, scale, plot_range)
+# Each distribution has its own Generator stream (SeedSequence(seed).spawn) and its own
+# cache entry keyed only on the inputs it uses, so e.g. moving the range slider only
+# recomputes the randint and uniform panels.
+# profiler.cache_data is st.cache_data that also counts hits and misses for this session.
+@profiler.cache_data
+def load_histogram(name, random_seed, size_samples, params):
+    return distribution_histogram(name, random_seed, size_samples, params)
+
+def get_histogram(name):
+    params = distribution_params(name, loc=loc, scale=scale, plot_range=plot_range)
+    return load_histogram(name, random_seed, size_samples, params)
+
+with profiler.section('histograms'):
+    histograms = {name: get_histogram(name) for name in DISTRIBUTIONS}
+if size_samples > IN_MEMORY_MAX_SAMPLES:
+    st.sidebar.caption(f"Streaming mode: samples generated in chunks of {CHUNK_SIZE:,}")
+
+cache_stats = profiler.cache_totals('load_histogram')
+st.sidebar.metric(
+    "Histogram cache hit rate",
+    f"{cache_stats['hits'] / (cache_stats['hits'] + cache_stats['misses']):.0%}",
+    f"{cache_stats['hits']} hits / {cache_stats['misses']} misses",
+    delta_color="off"
+)
+
+# Chart rendering: PNGs are cached per (data, styling) so unchanged panels skip matplotlib
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(max_bytes=32 * 2**20)
+
+figure_cache = get_figure_cache()
+use_native_charts = st.sidebar.toggle("Streamlit native charts", value=False)
+
+def show_histogram(counts, edges, color, label):
+    with profiler.section(f'chart: {label}'):
+        if use_native_charts:
+            # The browser only receives the pre-binned counts
+            st.bar_chart(pd.DataFrame({'Frequency': counts}, index=np.round(edges[:-1], 2)), color=to_hex(color))
+            return
+
+        def draw(fig, ax):
+            ax.hist(edges[:-1], bins=edges, weights=counts, color=color, alpha=0.7, label=label)
+            ax.set_xlabel(None)
+            ax.set_ylabel('Frequency')
+
+        st.image(figure_cache.get_png(chart_key(label, counts, edges, color), draw, figsize=(5, 4)))
 
 # Row 1: Top plots
 col1, col2, col3 = st.columns(3)
 
 with col1:
     st.subheader("np.random.normal()")
-    fig, ax = plt.subplots(figsize = (5,4))
-    ax.hist(distribution_df['random_normal'], bins=40, color='steelblue', alpha=0.7, label='normal dist.')
-    ax.set_xlabel(None)
-    ax.set_ylabel('Frequency')
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_histogram(*histograms['random_normal'], color='steelblue', label='normal dist.')
     st.caption(f"numpy.random.normal(loc= {loc}, scale= {scale}, size= {size_samples})")
     st.caption("[Docs] https://numpy.org/doc/stable/reference/random/generated/numpy.random.normal.html")
 
 with col2:
     st.subheader("np.random.lognormal()")
-    fig, ax = plt.subplots(figsize = (5,4))
-    ax.hist(distribution_df['random_lognormal'], bins=40, color='orange', alpha=0.7, label='lognormal dist.')
-    ax.set_xlabel(None)
-    ax.set_ylabel('Frequency')
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_histogram(*histograms['random_lognormal'], color='orange', label='lognormal dist.')
     st.caption(f"numpy.random.lognormal(loc= {loc}, scale= {scale}, size= {size_samples})")
     st.caption("[Docs] https://numpy.org/doc/stable/reference/random/generated/numpy.random.lognormal.html")
 
 with col3:
     st.subheader("np.random.exponential()")
-    fig, ax = plt.subplots(figsize = (5,4))
-    ax.hist(distribution_df['random_exponential'], bins=40, color = 'red', alpha=0.7, label='exponential dist.')
-    ax.set_xlabel(None)
-    ax.set_ylabel('Frequency')
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_histogram(*histograms['random_exponential'], color='red', label='exponential dist.')
     st.caption(f"numpy.random.exponential(scale= {scale}, size= {size_samples})")
     st.caption("[Docs] https://numpy.org/doc/stable/reference/random/generated/numpy.random.exponential.html")
 
@@ -84,41 +110,24 @@ col1, col2, col3 = st.columns(3)
 
 with col1:
     st.subheader("np.random.poisson()")
-    fig, ax = plt.subplots(figsize = (5,4))
-    ax.hist(distribution_df['random_poisson'], bins=40, color = 'red', alpha=0.7, label='poisson dist.')
-    ax.set_xlabel(None)
-    ax.set_ylabel('Frequency')
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_histogram(*histograms['random_poisson'], color='red', label='poisson dist.')
     st.caption(f"numpy.random.poisson(lam= {loc}, size= {size_samples})")
     st.caption("[Docs] https://numpy.org/doc/stable/reference/random/generated/numpy.random.poisson.html")
 
 with col2:
     st.subheader("np.random.randint()")
-    fig, ax = plt.subplots(figsize = (5,4))
-    bins = np.arange(plot_range[0], plot_range[1]+1)
-    ax.hist(distribution_df['random_randint'], bins=bins, color = 'orange', alpha=0.7, label='randint dist.')
-    ax.set_xlabel(None)
-    ax.set_ylabel('Frequency')
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_histogram(*histograms['random_randint'], color='orange', label='randint dist.')
     st.caption(f"numpy.random.randint(low= {plot_range[0]}, high= {plot_range[1]}, size= {size_samples})")
     st.caption("[Docs] https://numpy.org/doc/stable/reference/random/generated/numpy.random.randint.html")
 
 with col3:
     st.subheader("np.random.uniform()")
-    fig, ax = plt.subplots(figsize = (5,4))
-    ax.hist(distribution_df['random_uniform'], bins=40, color = 'limegreen', alpha=0.7, label='uniform dist.')
-    ax.set_xlabel(None)
-    ax.set_ylabel('Frequency')
-    plt.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_histogram(*histograms['random_uniform'], color='limegreen', label='uniform dist.')
     st.caption(f"numpy.random.uniform(low= {plot_range[0]}, high= {plot_range[1]}, size= {size_samples})")
     st.caption("[Docs] https://numpy.org/doc/2.3/reference/random/generated/numpy.random.uniform.html")
 
 # Footer
 st.markdown("---")
 st.caption("Dashboard is created with Streamlit.")
+
+profiler.finish()
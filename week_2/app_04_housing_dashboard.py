@@ -1,10 +1,38 @@
 
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import seaborn as sns
 
+from chart_cache import FigureCache, chart_key
+from housing_data import DEFAULT_N_PROPERTIES, apply_schema, generate_housing_data, memory_report
+from housing_cube import HousingCube
+from housing_index import HousingFilterIndex
+from housing_store import DEFAULT_STORE, HousingStore, build_store
+from raw_table import (
+    COLUMN_FORMATS,
+    DISPLAY_COLUMNS,
+    EXPORT_FORMATS,
+    PAGE_SIZE,
+    export_bytes,
+    frame_chunks,
+    page_count,
+    page_rows,
+    scale_page,
+    sort_order,
+)
+from rerun_profiler import RerunProfiler
+from scatter_density import (
+    DEFAULT_POINT_THRESHOLD,
+    SCATTER_MODES,
+    choose_scatter_mode,
+    density_cells,
+    density_grid,
+    stratified_sample,
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Australian Housing Dashboard",
@@ -12,54 +40,138 @@ st.set_page_config(
     layout="wide"  # Use full screen width
 )
 
+# Times each section of this rerun and counts cache hits; see the "Rerun timing" sidebar panel
+profiler = RerunProfiler('app_04_housing_dashboard')
+
 # Title and description
 st.title("🏠 Australian Housing Market Dashboard")
 st.markdown("Interactive analysis of property prices across major cities")
 
 # Generate our housing data (from notebook 1)
-@st.cache_data  # This decorator caches the data - SUPER IMPORTANT!
-def load_data():
-    np.random.seed(42)
-    n_properties = 5000
-
-    cities = ['Sydney', 'Melbourne', 'Brisbane', 'Perth', 'Adelaide', 'Hobart', 'Darwin', 'Canberra']
-    city_weights = [0.25, 0.22, 0.15, 0.12, 0.10, 0.06, 0.04, 0.06]
-
-    housing_data = pd.DataFrame({
-        'property_id': range(1, n_properties + 1),
-        'city': np.random.choice(cities, n_properties, p=city_weights),
-        'property_type': np.random.choice(['House', 'Apartment', 'Townhouse', 'Villa'], 
-                                         n_properties, p=[0.45, 0.35, 0.15, 0.05]),
-        'bedrooms': np.random.choice([1, 2, 3, 4, 5], n_properties, p=[0.1, 0.25, 0.35, 0.25, 0.05]),
-        'bathrooms': np.random.choice([1, 2, 3], n_properties, p=[0.4, 0.45, 0.15]),
-        'car_spaces': np.random.choice([0, 1, 2, 3], n_properties, p=[0.15, 0.35, 0.40, 0.10]),
-        'land_size': np.random.lognormal(6, 0.8, n_properties),
-        'building_size': np.random.lognormal(5, 0.6, n_properties),
-        'year_built': np.random.normal(1995, 20, n_properties).astype(int).clip(1950, 2024),
-        'distance_cbd': np.random.exponential(15, n_properties),
-    })
-
-    # Add realistic prices
-    base_price = {
-        'Sydney': 1200000, 'Melbourne': 950000, 'Brisbane': 750000, 'Perth': 650000,
-        'Adelaide': 600000, 'Hobart': 550000, 'Darwin': 600000, 'Canberra': 850000
-    }
-
-    housing_data['price'] = housing_data.apply(lambda row: 
-        base_price[row['city']] * 
-        (1 + 0.15 * row['bedrooms']) * 
-        (1 + 0.1 * row['bathrooms']) *
-        (1 - 0.01 * row['distance_cbd']) *
-        (1 + np.random.normal(0, 0.15)), axis=1
+@profiler.cache_data  # This decorator caches the data - SUPER IMPORTANT!
+def load_data(n_properties):
+    # Vectorized generator: one seeded Generator, whole-array pricing (see housing_data.py)
+    raw_data = generate_housing_data(n_properties, seed=42)
+
+    # Compact dtypes (categoricals, int8/int16, float32) so each session holds less RAM
+    housing_data = apply_schema(raw_data)
+
+    # Filter index is built once here so sidebar changes don't rescan every column
+    return housing_data, memory_report(raw_data, housing_data), HousingFilterIndex(housing_data)
+
+@profiler.cache_data
+def load_cube(n_properties):
+    # Aggregate cube for metrics and city/type charts, built once per dataset size
+    df, _, _ = load_data(n_properties)
+    return HousingCube(df)
+
+DENSITY_BINS = 60
+
+@profiler.cache_data(max_entries=64)
+def load_density_grid(n_properties, filter_state, _filtered_df):
+    # Cached per filter state; the leading underscore stops Streamlit hashing the rows
+    return density_grid(
+        _filtered_df['distance_cbd'].to_numpy(),
+        _filtered_df['price'].to_numpy(),
+        _filtered_df['bedrooms'].to_numpy(),
+        bins=DENSITY_BINS
     )
 
-    housing_data['price_per_sqm'] = housing_data['price'] / housing_data['building_size']
-    housing_data['age'] = 2024 - housing_data['year_built']
+@profiler.cache_data(max_entries=64)
+def load_stratified_sample(n_properties, filter_state, point_threshold, _filtered_df):
+    return stratified_sample(_filtered_df['bedrooms'].to_numpy(), point_threshold)
+
+@profiler.cache_data(max_entries=16)
+def load_sort_order(n_properties, filter_state, column, ascending, _filtered_df):
+    # One argsort per selection and sort column; paging through it is then a slice
+    return sort_order(_filtered_df[column], ascending)
+
+@st.cache_resource
+def get_figure_cache():
+    # One PNG cache per server process, shared by every session (LRU, 64 MB cap)
+    return FigureCache(max_bytes=64 * 2**20)
+
+figure_cache = get_figure_cache()
+
+@st.cache_resource
+def get_store(path):
+    # One pool of read-only connections per server process, shared by every session;
+    # a rebuilt file (new mtime) is picked up by store.refresh(), which reopens the pool
+    return HousingStore(path)
+
+@profiler.cache_data(max_entries=256)
+def store_query(path, modified, query, filter_state, *args):
+    # Parameterised SQL on the store; results are shared across sessions per filter state
+    cities, types, bedrooms, price_k = filter_state
+    filters = (cities, types, bedrooms, (price_k[0] * 1000, price_k[1] * 1000))
+    return getattr(get_store(path), query)(filters, *args)
+
+# Data source: generated into this process's memory, or an on-disk SQLite store that
+# every app process shares (rows never leave SQLite, only aggregates and one page do)
+st.sidebar.header("⚙️ Data")
+data_source = st.sidebar.radio(
+    "Data Source",
+    options=['In-memory', 'SQLite store'],
+    horizontal=True,
+    help="SQLite store: filters run as SQL over pre-aggregated cells, so the data can exceed RAM"
+)
 
-    return housing_data
+if data_source == 'In-memory':
+    # Dataset size - each size is generated once and then served from the cache
+    n_properties = st.sidebar.select_slider(
+        "Number of Properties",
+        options=[5_000, 50_000, 500_000, 1_000_000, 5_000_000],
+        value=DEFAULT_N_PROPERTIES,
+        format_func=lambda n: f"{n:,}"
+    )
 
-# Load the data
-df = load_data()
+    # Load the data
+    with profiler.section('load data'):
+        df, memory_df, filter_index = load_data(n_properties)
+
+    with st.sidebar.expander("💾 Memory Usage"):
+        total = memory_df.loc['TOTAL']
+        st.write(f"{total['before_kib']/1024:,.1f} MB → {total['after_kib']/1024:,.1f} MB "
+                 f"({total['saving_pct']:.0f}% smaller)")
+        st.dataframe(memory_df.round(1), use_container_width=True)
+
+    city_options = list(df['city'].cat.categories)
+    type_options = list(df['property_type'].cat.categories)
+    bedroom_bounds = (int(df['bedrooms'].min()), int(df['bedrooms'].max()))
+    price_bounds = (df['price'].min(), df['price'].max())
+else:
+    store_path = st.sidebar.text_input("Store File", value=DEFAULT_STORE)
+    if not os.path.exists(store_path):
+        st.sidebar.warning(f"{store_path} does not exist yet")
+        build_rows = st.sidebar.select_slider(
+            "Properties to Generate",
+            options=[50_000, 500_000, 1_000_000, 5_000_000, 10_000_000],
+            value=1_000_000,
+            format_func=lambda n: f"{n:,}"
+        )
+        if st.sidebar.button("Build store"):
+            with st.spinner(f"Generating {build_rows:,} properties into {store_path}..."):
+                build_store(store_path, build_rows)
+            profiler.finish(panel=False)
+            st.rerun()
+        st.info(f"Build the store from the sidebar or run: python housing_store.py --rows 10000000 --path {store_path}")
+        # st.stop() ends the script here, so log this rerun (and stop any profile) first
+        profiler.finish()
+        st.stop()
+
+    with profiler.section('load data'):
+        store = get_store(store_path)
+        store.refresh()
+    store_modified = store.modified
+    n_properties = store.n_rows
+
+    with st.sidebar.expander("💾 Store"):
+        st.write(f"{store.n_rows:,} properties, {os.path.getsize(store_path)/2**20:,.0f} MB on disk")
+
+    city_options = store.cities
+    type_options = store.property_types
+    bedroom_bounds = tuple(int(b) for b in store.extent['bedrooms'])
+    price_bounds = store.extent['price']
 
 # SIDEBAR FILTERS
 st.sidebar.header("🔍 Filters")
@@ -67,123 +179,181 @@ st.sidebar.header("🔍 Filters")
 # City filter
 selected_cities = st.sidebar.multiselect(
     "Select Cities",
-    options=df['city'].unique(),
-    default=df['city'].unique()
+    options=city_options,
+    default=city_options
 )
 
 # Property type filter
 selected_types = st.sidebar.multiselect(
     "Property Types",
-    options=df['property_type'].unique(),
-    default=df['property_type'].unique()
+    options=type_options,
+    default=type_options
 )
 
 # Bedroom filter
 bedroom_range = st.sidebar.slider(
     "Number of Bedrooms",
-    min_value=int(df['bedrooms'].min()),
-    max_value=int(df['bedrooms'].max()),
+    min_value=bedroom_bounds[0],
+    max_value=bedroom_bounds[1],
     value=(2, 4)
 )
 
 # Price filter
 price_range = st.sidebar.slider(
     "Price Range ($K)",
-    min_value=int(df['price'].min()/1000),
-    max_value=int(df['price'].max()/1000),
+    min_value=int(price_bounds[0]/1000),
+    max_value=int(price_bounds[1]/1000),
     value=(500, 1500),
     step=50
 )
 
-# Filter the data
-filtered_df = df[
-    (df['city'].isin(selected_cities)) &
-    (df['property_type'].isin(selected_types)) &
-    (df['bedrooms'] >= bedroom_range[0]) &
-    (df['bedrooms'] <= bedroom_range[1]) &
-    (df['price'] >= price_range[0] * 1000) &
-    (df['price'] <= price_range[1] * 1000)
-]
+# Chart backend
+st.sidebar.header("🎨 Display")
+use_native_charts = st.sidebar.toggle(
+    "Streamlit native charts",
+    value=False,
+    help="Vega-Lite charts from pre-binned data instead of cached matplotlib PNGs"
+)
+
+# Large selections switch "Price vs Distance from CBD" to a density or sampled render
+requested_scatter_mode = st.sidebar.selectbox(
+    "Scatter Mode",
+    options=SCATTER_MODES,
+    help="Auto plots every point up to the threshold, then switches to a density grid"
+)
+point_threshold = st.sidebar.number_input(
+    "Scatter Point Threshold",
+    min_value=1_000,
+    max_value=1_000_000,
+    value=DEFAULT_POINT_THRESHOLD,
+    step=5_000
+)
+
+filter_state = (tuple(selected_cities), tuple(selected_types), bedroom_range, price_range)
+
+with profiler.section('filter'):
+    if data_source == 'In-memory':
+        # Filter the data - intersect the precomputed bitmaps instead of six full-column comparisons
+        filtered_rows = filter_index.select(
+            selected_cities,
+            selected_types,
+            bedroom_range,
+            (price_range[0] * 1000, price_range[1] * 1000)
+        )
+        filtered_df = df.take(filtered_rows)
+
+        # Metrics and city/type charts are rolled up from the cube rather than recomputed from rows
+        cube = load_cube(n_properties)
+        overall = cube.overall()
+        selection = cube.rollup(
+            df,
+            filter_index,
+            selected_cities,
+            selected_types,
+            bedroom_range,
+            (price_range[0] * 1000, price_range[1] * 1000)
+        )
+        n_selected = len(filtered_df)
+    else:
+        # Summed from the store's pre-aggregated cells; the 'vs all' baselines were
+        # precomputed when the store was built
+        overall = store.overall
+        selection, selection_extent = store_query(store_path, store_modified, 'selection', filter_state)
+        n_selected = selection.total_count()
 
 # MAIN DASHBOARD
 # Row 1: Key Metrics
 col1, col2, col3, col4 = st.columns(4)
 
-with col1:
+with col1, profiler.section('metrics'):
     st.metric(
         "Total Properties",
-        f"{len(filtered_df):,}",
-        f"{len(filtered_df)/len(df)*100:.1f}% of total"
+        f"{selection.total_count():,}",
+        f"{selection.total_count()/overall.total_count()*100:.1f}% of total"
     )
 
-with col2:
-    avg_price = filtered_df['price'].mean()
+with col2, profiler.section('metrics'):
+    avg_price = selection.mean('price')
     st.metric(
         "Average Price",
         f"${avg_price/1e6:.2f}M",
-        f"${avg_price - df['price'].mean():+,.0f} vs all"
+        f"${avg_price - overall.mean('price'):+,.0f} vs all"
     )
 
-with col3:
-    avg_size = filtered_df['building_size'].mean()
+with col3, profiler.section('metrics'):
+    avg_size = selection.mean('building_size')
     st.metric(
         "Avg Building Size",
         f"{avg_size:.0f} sqm",
-        f"{avg_size - df['building_size'].mean():+.0f} vs all"
+        f"{avg_size - overall.mean('building_size'):+.0f} vs all"
     )
 
-with col4:
-    avg_age = filtered_df['age'].mean()
+with col4, profiler.section('metrics'):
+    avg_age = selection.mean('age')
     st.metric(
         "Average Age",
         f"{avg_age:.0f} years",
-        f"{avg_age - df['age'].mean():+.1f} vs all"
+        f"{avg_age - overall.mean('age'):+.1f} vs all"
     )
 
 # Row 2: Charts
 st.markdown("---")  # Horizontal line
 col1, col2 = st.columns(2)
 
-with col1:
+with col1, profiler.section('chart: price by city'):
     st.subheader("📊 Average Price by City")
+    city_avg = selection.mean_by_city('price').sort_values(ascending=False)
 
-    fig, ax = plt.subplots(figsize=(8, 6))
-    city_avg = filtered_df.groupby('city')['price'].mean().sort_values(ascending=False)
+    if use_native_charts:
+        st.bar_chart(city_avg.rename('Average Price ($M)') / 1e6)
+    else:
+        def draw_city_avg(fig, ax):
+            bars = ax.bar(city_avg.index.astype(str), city_avg.values/1e6, color='steelblue')
+            ax.set_xlabel('City')
+            ax.set_ylabel('Average Price ($M)')
+            ax.set_title('Average Property Prices')
 
-    bars = ax.bar(city_avg.index, city_avg.values/1e6, color='steelblue')
-    ax.set_xlabel('City')
-    ax.set_ylabel('Average Price ($M)')
-    ax.set_title('Average Property Prices')
+            # Add value labels on bars
+            for bar in bars:
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2., height,
+                        f'${height:.1f}M',
+                        ha='center', va='bottom')
 
-    # Add value labels on bars
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height,
-                f'${height:.1f}M',
-                ha='center', va='bottom')
+            ax.tick_params(axis='x', labelrotation=45)
 
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    st.pyplot(fig)
+        st.image(figure_cache.get_png(chart_key('city_avg', city_avg.index, city_avg.values), draw_city_avg))
 
-with col2:
+with col2, profiler.section('chart: property types'):
     st.subheader("🏠 Property Type Distribution")
-
-    fig, ax = plt.subplots(figsize=(8, 6))
-    type_counts = filtered_df['property_type'].value_counts()
+    type_counts = selection.count_by_type()
 
     colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
-    wedges, texts, autotexts = ax.pie(
-        type_counts.values,
-        labels=type_counts.index,
-        autopct='%1.1f%%',
-        colors=colors,
-        startangle=90
-    )
-
-    ax.set_title('Property Types')
-    plt.tight_layout()
-    st.pyplot(fig)
+    if use_native_charts:
+        st.vega_lite_chart(
+            pd.DataFrame({'property_type': type_counts.index, 'count': type_counts.values}),
+            {
+                'mark': {'type': 'arc'},
+                'encoding': {
+                    'theta': {'field': 'count', 'type': 'quantitative'},
+                    'color': {'field': 'property_type', 'type': 'nominal',
+                              'scale': {'range': colors}, 'title': 'Property Type'},
+                },
+            },
+            use_container_width=True
+        )
+    else:
+        def draw_type_pie(fig, ax):
+            ax.pie(
+                type_counts.values,
+                labels=type_counts.index,
+                autopct='%1.1f%%',
+                colors=colors,
+                startangle=90
+            )
+            ax.set_title('Property Types')
+
+        st.image(figure_cache.get_png(chart_key('type_pie', type_counts.index, type_counts.values), draw_type_pie))
 
 # Row 3: Price Distribution
 st.markdown("---")
@@ -191,58 +361,180 @@ st.subheader("📈 Price Distribution Analysis")
 
 col1, col2 = st.columns(2)
 
-with col1:
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.hist(filtered_df['price']/1e6, bins=30, color='skyblue', edgecolor='navy', alpha=0.7)
-    ax.set_xlabel('Price ($M)')
-    ax.set_ylabel('Number of Properties')
-    ax.set_title('Price Distribution')
-    ax.axvline(filtered_df['price'].mean()/1e6, color='red', linestyle='--', label=f'Mean: ${filtered_df["price"].mean()/1e6:.1f}M')
-    ax.legend()
-    plt.tight_layout()
-    st.pyplot(fig)
-
-with col2:
-    fig, ax = plt.subplots(figsize=(8, 6))
-
-    # Scatter plot: Price vs Distance from CBD
-    scatter = ax.scatter(
-        filtered_df['distance_cbd'],
-        filtered_df['price']/1e6,
-        c=filtered_df['bedrooms'],
-        cmap='viridis',
-        alpha=0.6,
-        s=30
-    )
-
-    ax.set_xlabel('Distance from CBD (km)')
-    ax.set_ylabel('Price ($M)')
-    ax.set_title('Price vs Distance from CBD')
-
-    # Add colorbar
-    cbar = plt.colorbar(scatter, ax=ax)
-    cbar.set_label('Bedrooms')
-
-    plt.tight_layout()
-    st.pyplot(fig)
+with col1, profiler.section('chart: price histogram'):
+    # Bin once; both backends plot the counts rather than the raw prices
+    if data_source == 'In-memory':
+        price_counts, price_edges = np.histogram(filtered_df['price']/1e6, bins=30)
+    else:
+        price_counts, price_edges = store_query(store_path, store_modified, 'price_histogram', filter_state,
+                                                selection_extent.get('price'), 30)
+        price_edges = price_edges / 1e6
+
+    if use_native_charts:
+        bin_centres = np.round((price_edges[:-1] + price_edges[1:]) / 2, 2)
+        st.bar_chart(pd.DataFrame({'Number of Properties': price_counts}, index=pd.Index(bin_centres, name='Price ($M)')))
+        st.caption(f"Mean: ${avg_price/1e6:.1f}M")
+    else:
+        def draw_price_hist(fig, ax):
+            ax.hist(price_edges[:-1], bins=price_edges, weights=price_counts,
+                    color='skyblue', edgecolor='navy', alpha=0.7)
+            ax.set_xlabel('Price ($M)')
+            ax.set_ylabel('Number of Properties')
+            ax.set_title('Price Distribution')
+            ax.axvline(avg_price/1e6, color='red', linestyle='--', label=f'Mean: ${avg_price/1e6:.1f}M')
+            ax.legend()
+
+        st.image(figure_cache.get_png(chart_key('price_hist', price_counts, price_edges, avg_price), draw_price_hist))
+
+with col2, profiler.section('chart: price vs distance'):
+    # Plain scatter for small selections; density grid or stratified sample for large ones
+    scatter_mode = choose_scatter_mode(requested_scatter_mode, n_selected, point_threshold)
+    if data_source == 'SQLite store' and scatter_mode == 'Stratified sample':
+        # Sampling needs the rows in memory; the store bins server-side instead
+        scatter_mode = 'Density'
+
+    if scatter_mode == 'Density':
+        if data_source == 'In-memory':
+            counts, mean_bedrooms, x_edges, y_edges = load_density_grid(n_properties, filter_state, filtered_df)
+        else:
+            counts, mean_bedrooms, x_edges, y_edges = store_query(
+                store_path, store_modified, 'density_grid', filter_state,
+                selection_extent.get('distance_cbd'), selection_extent.get('price'), DENSITY_BINS)
+        mode_note = (f"Density mode: {n_selected:,} properties in {counts.shape[0]}×{counts.shape[1]} cells, "
+                     f"colour = mean bedrooms per cell")
+    elif data_source == 'SQLite store':
+        points = store_query(store_path, store_modified, 'points', filter_state, point_threshold, n_selected)
+        mode_note = f"Scatter mode: {len(points):,} of {n_selected:,} properties"
+        if len(points) < n_selected:
+            mode_note += ", an even sample by row id"
+    else:
+        if scatter_mode == 'Stratified sample':
+            sample_rows = load_stratified_sample(n_properties, filter_state, point_threshold, filtered_df)
+            points = filtered_df.iloc[sample_rows]
+            mode_note = (f"Sample mode: {len(points):,} of {len(filtered_df):,} properties, "
+                         f"stratified by bedrooms")
+        else:
+            points = filtered_df
+            mode_note = f"Scatter mode: all {len(points):,} properties"
+
+    if use_native_charts:
+        if scatter_mode == 'Density':
+            st.vega_lite_chart(
+                density_cells(counts, mean_bedrooms, x_edges, y_edges / 1e6),
+                {
+                    'mark': {'type': 'rect'},
+                    'encoding': {
+                        'x': {'field': 'x_start', 'type': 'quantitative', 'title': 'Distance from CBD (km)'},
+                        'x2': {'field': 'x_end'},
+                        'y': {'field': 'y_start', 'type': 'quantitative', 'title': 'Price ($M)'},
+                        'y2': {'field': 'y_end'},
+                        'color': {'field': 'mean_colour', 'type': 'quantitative',
+                                  'scale': {'scheme': 'viridis'}, 'title': 'Mean bedrooms'},
+                        'tooltip': [{'field': 'count', 'type': 'quantitative', 'title': 'Properties'}],
+                    },
+                },
+                use_container_width=True
+            )
+        else:
+            st.scatter_chart(
+                pd.DataFrame({
+                    'Distance from CBD (km)': points['distance_cbd'].to_numpy(),
+                    'Price ($M)': points['price'].to_numpy()/1e6,
+                    'Bedrooms': points['bedrooms'].to_numpy(),
+                }),
+                x='Distance from CBD (km)',
+                y='Price ($M)',
+                color='Bedrooms'
+            )
+    else:
+        def draw_price_distance(fig, ax):
+            if scatter_mode == 'Density':
+                # 2D histogram: one cell per distance/price bin, coloured by mean bedrooms
+                mesh = ax.pcolormesh(
+                    x_edges,
+                    y_edges/1e6,
+                    np.ma.masked_invalid(mean_bedrooms.T),
+                    cmap='viridis'
+                )
+                colour_label = 'Mean Bedrooms'
+            else:
+                # Scatter plot: Price vs Distance from CBD
+                mesh = ax.scatter(
+                    points['distance_cbd'],
+                    points['price']/1e6,
+                    c=points['bedrooms'],
+                    cmap='viridis',
+                    alpha=0.6,
+                    s=30
+                )
+                colour_label = 'Bedrooms'
+
+            ax.set_xlabel('Distance from CBD (km)')
+            ax.set_ylabel('Price ($M)')
+            ax.set_title('Price vs Distance from CBD')
+
+            # Add colorbar
+            cbar = fig.colorbar(mesh, ax=ax)
+            cbar.set_label(colour_label)
+
+        # Density and sample renders are fully determined by the filter state;
+        # plain scatters are keyed on the plotted row positions
+        if data_source == 'SQLite store':
+            key = chart_key('price_distance', scatter_mode, store_path, store_modified, filter_state, point_threshold)
+        elif scatter_mode == 'Scatter':
+            key = chart_key('price_distance', n_properties, filtered_rows)
+        else:
+            key = chart_key('price_distance', scatter_mode, n_properties, filter_state, point_threshold)
+        st.image(figure_cache.get_png(key, draw_price_distance))
+
+    st.caption(mode_note)
 
 # Row 4: Data Table (Optional)
 st.markdown("---")
-if st.checkbox("📋 Show Raw Data"):
-    st.subheader("Filtered Property Data")
-
-    # Show only relevant columns
-    display_cols = ['city', 'property_type', 'bedrooms', 'bathrooms', 'price', 'building_size', 'distance_cbd', 'age']
-
-    # Format the dataframe for display
-    display_df = filtered_df[display_cols].copy()
-    display_df['price'] = display_df['price'].apply(lambda x: f'${x/1e6:.2f}M')
-    display_df['building_size'] = display_df['building_size'].apply(lambda x: f'{x:.0f} sqm')
-    display_df['distance_cbd'] = display_df['distance_cbd'].apply(lambda x: f'{x:.1f} km')
-    display_df['age'] = display_df['age'].apply(lambda x: f'{x:.0f} years')
-
-    st.dataframe(display_df.head(100), use_container_width=True)
+with profiler.section('table'):
+    if st.checkbox("📋 Show Raw Data"):
+        st.subheader("Filtered Property Data")
+
+        col1, col2, col3 = st.columns([2, 1, 2])
+        sort_column = col1.selectbox("Sort by", DISPLAY_COLUMNS, index=DISPLAY_COLUMNS.index('price'))
+        ascending = col2.toggle("Ascending", value=False)
+        n_pages = page_count(n_selected)
+        page = col3.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1)
+
+        # Slice the page first; only its rows are scaled, and the units are column formats
+        if data_source == 'SQLite store':
+            page_df = store_query(store_path, store_modified, 'page', filter_state, page - 1,
+                                  PAGE_SIZE, DISPLAY_COLUMNS, sort_column, ascending)
+        else:
+            order = load_sort_order(n_properties, filter_state, sort_column, ascending, filtered_df)
+            page_df = page_rows(filtered_df, page - 1, order=order)
+
+        st.dataframe(
+            scale_page(page_df),
+            column_config={column: st.column_config.NumberColumn(format=number_format)
+                           for column, (number_format, _) in COLUMN_FORMATS.items()},
+            hide_index=True,
+            use_container_width=True
+        )
+
+        # Downloads are built only on request, chunk by chunk, in the current sort order
+        col1, col2 = st.columns([1, 3])
+        export_format = col1.radio("Download as", list(EXPORT_FORMATS), horizontal=True)
+        if col2.button(f"Prepare download ({n_selected:,} rows)"):
+            with st.spinner(f"Writing {n_selected:,} rows as {export_format}..."):
+                if data_source == 'SQLite store':
+                    filters = (selected_cities, selected_types, bedroom_range,
+                               (price_range[0] * 1000, price_range[1] * 1000))
+                    chunks = store.iter_chunks(filters, DISPLAY_COLUMNS, sort_column, ascending)
+                else:
+                    chunks = frame_chunks(filtered_df, order)
+                data = export_bytes(chunks, export_format)
+            extension, mime = EXPORT_FORMATS[export_format]
+            col2.download_button(f"⬇️ Download {extension.upper()} ({len(data)/2**20:,.1f} MB)", data,
+                                 file_name=f"properties.{extension}", mime=mime, on_click='ignore')
 
 # Footer
 st.markdown("---")
 st.caption("Dashboard created with Streamlit • Data is synthetic for demonstration purposes")
+
+profiler.finish()
@@ -3,9 +3,14 @@ import streamlit as st
 import pandas as pd
 import time
 
+from rerun_profiler import RerunProfiler
+
 st.set_page_config(
     page_title="Streamlit Pro Tips"
 )
+
+# Times the demos below on every rerun ("Rerun timing" in the sidebar)
+profiler = RerunProfiler('app_05_pro_tips')
 st.title("🚀 Streamlit Pro Tips")
 
 # TIP 1: Use Session State for persistence
@@ -45,10 +50,11 @@ st.header("3. Containers for Dynamic Updates")
 # Create empty container
 placeholder = st.empty()
 
-# Update it multiple times
-for i in range(5):
-    placeholder.write(f"Counting: {i+1}/5")
-    time.sleep(0.5)
+# Update it multiple times (this blocks every rerun for 2.5s - see the timing panel)
+with profiler.section('3. containers demo'):
+    for i in range(5):
+        placeholder.write(f"Counting: {i+1}/5")
+        time.sleep(0.5)
 
 placeholder.success("✅ Done!")
 
@@ -97,14 +103,17 @@ with st.form("my_form"):
 st.header("7. Show Progress")
 
 if st.button("Start long process"):
-    # Show progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    with profiler.section('7. progress demo'):
+        # Show progress bar
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+
+        for i in range(100):
+            progress_bar.progress(i + 1)
+            status_text.text(f'Processing... {i+1}%')
+            time.sleep(0.01)
 
-    for i in range(100):
-        progress_bar.progress(i + 1)
-        status_text.text(f'Processing... {i+1}%')
-        time.sleep(0.01)
+        status_text.text('Done!')
+        st.balloons()
 
-    status_text.text('Done!')
-    st.balloons()
+profiler.finish()
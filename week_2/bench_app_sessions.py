@@ -0,0 +1,367 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import streamlit
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+
+from rerun_profiler import DEFAULT_LOG, rss_mb
+
+# Load test for the Streamlit apps: --sessions simulated users per app, each a headless
+# streamlit.testing.v1.AppTest running the script in this process (so st.cache_data is
+# shared between sessions exactly as it is between browser tabs on one server). Every
+# session opens the app, then makes --steps scripted widget changes drawn from its
+# actions in APPS (sidebar filters, seed/size inputs, guesses that bisect towards the
+# secret), one rerun each, all sessions at once. AppTest keeps its mock Runtime in a class
+# attribute that every run resets, so runs cannot overlap: sessions queue for one lock
+# the way reruns queue for the GIL in a single server process. Per app it reports
+# p50/p95 rerun latency (queue + run, what the user waits), the run alone, the script's
+# own total from rerun_profiler's log where the app has one, cache hit ratios per cached
+# function and memory per session. That figure is an approximation: after the timed
+# sessions, one more session runs the same way with tracemalloc on (tracing would slow
+# the timed runs several-fold), and the bytes its runs leave allocated - its session
+# state plus whatever cache entries it still has to fill - are what one more user costs.
+# tracemalloc sees Python objects and numpy/pandas buffers but not native allocations
+# (SQLite's page cache, matplotlib's renderer); a session that frees more than it keeps
+# (evicted cache entries) counts as 0.
+# Results go to --json; --compare flags p50/p95/memory regressions against an earlier
+# run beyond --tolerance and exits with status 1 when there are any.
+# Usage: python bench_app_sessions.py --sessions 8 --steps 10 --json sessions.json --compare previous.json
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WEEK_1 = os.path.join(os.path.dirname(HERE), 'week_1')
+HOUSING_SIZES = [5_000, 50_000, 500_000, 1_000_000, 5_000_000]
+SETTINGS = ['sessions', 'steps', 'properties', 'seed', 'memory']   # runs are only comparable when these match
+COMPARED = [('latency_ms', 'p50'), ('latency_ms', 'p95'), ('run_ms', 'p50'), ('memory', 'mb_per_session')]
+
+_run_lock = threading.Lock()
+
+
+def widget(at, kind, label):
+    """The widget of type kind whose label starts with label (sidebar or main area)"""
+    for element in at.get(kind):
+        if element.label.startswith(label):
+            return element
+    raise LookupError(f"no {kind} labelled {label!r}")
+
+
+def pick(rng, options):
+    """A random non-empty subset of options, in their original order"""
+    chosen = rng.random(len(options)) < 0.6
+    chosen[rng.integers(len(options))] = True
+    return [option for option, keep in zip(options, chosen) if keep]
+
+
+# Each action changes widgets on the element tree of the previous run; rng is the
+# session's, memo survives between its steps. Values come from small pools, so
+# sessions repeat each other's filter states the way real users do.
+def housing_filters(at, rng, memo):
+    cities = widget(at, 'multiselect', 'Select Cities')
+    cities.set_value(pick(rng, cities.options))
+
+
+def housing_types(at, rng, memo):
+    types = widget(at, 'multiselect', 'Property Types')
+    types.set_value(pick(rng, types.options))
+
+
+def housing_bedrooms(at, rng, memo):
+    low = int(rng.integers(1, 4))
+    widget(at, 'slider', 'Number of Bedrooms').set_value((low, low + int(rng.integers(0, 3))))
+
+
+def housing_price(at, rng, memo):
+    low = int(rng.choice([300, 500, 800]))
+    widget(at, 'slider', 'Price Range').set_value((low, low + int(rng.choice([500, 1000, 2000]))))
+
+
+def housing_charts(at, rng, memo):
+    native = widget(at, 'toggle', 'Streamlit native charts')
+    native.set_value(not native.value)
+
+
+def housing_scatter(at, rng, memo):
+    mode = widget(at, 'selectbox', 'Scatter Mode')
+    mode.set_value(rng.choice(mode.options))
+
+
+def housing_table(at, rng, memo):
+    show = widget(at, 'checkbox', '📋 Show Raw Data')
+    if not show.value:
+        show.check()
+        return
+    sort = widget(at, 'selectbox', 'Sort by')
+    sort.set_value(rng.choice(sort.options))
+    page = widget(at, 'number_input', 'Page')
+    page.set_value(min(int(rng.integers(1, 4)), page.max))
+
+
+def housing_open(at, args):
+    widget(at, 'select_slider', 'Number of Properties').set_value(args.properties)
+
+
+def student_seed(at, rng, memo):
+    widget(at, 'number_input', 'Random seed').set_value(int(rng.integers(1, 5)))
+
+
+def student_size(at, rng, memo):
+    widget(at, 'number_input', 'Size samples').set_value(int(rng.choice([1_000, 10_000, 100_000])))
+
+
+def student_shape(at, rng, memo):
+    widget(at, 'number_input', 'Loc').set_value(int(rng.integers(2, 10)))
+    widget(at, 'number_input', 'Scale').set_value(int(rng.integers(1, 3)))
+
+
+def student_range(at, rng, memo):
+    low = int(rng.integers(0, 5))
+    widget(at, 'slider', 'Range for random').set_value((low, low + int(rng.integers(1, 6))))
+
+
+def student_charts(at, rng, memo):
+    native = widget(at, 'toggle', 'Streamlit native charts')
+    native.set_value(not native.value)
+
+
+def game_guess(at, rng, memo):
+    """Submit the midpoint of what the last answers leave open (a fresh range after a win or loss)"""
+    if at.session_state['guesses_left'] == 0:
+        widget(at, 'button', 'New game').click()
+        memo.clear()
+        return
+    last = memo.get('guess')
+    answers = [element.value for element in [*at.warning, *at.success]]
+    low, high = memo.get('range', (1, at.session_state['max_num']))
+    if last is not None and 'Too low!' in answers:
+        low = last + 1
+    elif last is not None and 'Too high!' in answers:
+        high = last - 1
+    elif last is not None or high < low:  # won, or the secret is outside the range ("New game" ignores difficulty)
+        low, high = 1, at.session_state['max_num']
+    memo['range'], memo['guess'] = (low, high), (low + high) // 2
+    widget(at, 'number_input', 'Take a guess').set_value(memo['guess'])
+    widget(at, 'button', 'Submit guess').click()
+
+
+def game_difficulty(at, rng, memo):
+    difficulty = widget(at, 'radio', 'Choose difficulty')
+    difficulty.set_value(rng.choice(difficulty.options))
+    widget(at, 'button', 'Start / Apply difficulty').click()
+    memo.clear()
+
+
+# name: (script, rerun_profiler app name or None, widget setup after the first run, [(action, weight)])
+APPS = {
+    'housing': (os.path.join(HERE, 'app_04_housing_dashboard.py'), 'app_04_housing_dashboard', housing_open,
+                [(housing_filters, 2), (housing_types, 1), (housing_bedrooms, 2), (housing_price, 2),
+                 (housing_charts, 1), (housing_scatter, 1), (housing_table, 1)]),
+    'student': (os.path.join(HERE, '02c_student_exercise_dashboard.py'), '02c_student_exercise_dashboard', None,
+                [(student_seed, 3), (student_size, 2), (student_shape, 1), (student_range, 1), (student_charts, 1)]),
+    'game': (os.path.join(WEEK_1, 'game1_os.py'), None, None, [(game_guess, 8), (game_difficulty, 1)]),
+}
+
+
+def timed_run(at):
+    """Run at once the lock is free; returns (ms including the wait, ms of the run, bytes it left allocated).
+
+    The bytes are only counted while tracemalloc is tracing (0 otherwise).
+    """
+    tracing = tracemalloc.is_tracing()
+    queued = time.perf_counter()
+    with _run_lock:
+        before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = time.perf_counter()
+        at.run()
+        end = time.perf_counter()
+        if tracing:
+            gc.collect()  # the run's garbage is not what it keeps
+        retained = tracemalloc.get_traced_memory()[0] - before if tracing else 0
+    return (end - queued) * 1000, (end - start) * 1000, retained
+
+
+def run_session(number, app, args):
+    """One user: open the app, make args.steps widget changes.
+
+    Returns ([(action, ms, run ms, errors)], state, bytes its runs left allocated).
+    """
+    script, _, setup, actions = APPS[app]
+    rng = np.random.default_rng([args.seed, number])
+    functions, weights = zip(*actions)
+    memo, timings = {}, []
+    at = AppTest.from_file(script, default_timeout=args.timeout)
+    opened = timed_run(at)
+    if setup is not None and not at.exception:
+        setup(at, args)
+        opened = tuple(np.add(opened, timed_run(at)))
+    ms, run_ms, retained = opened
+    timings.append(('open', ms, run_ms, [e.message for e in at.exception]))
+    for _ in range(args.steps):
+        action = functions[rng.choice(len(functions), p=np.asarray(weights) / sum(weights))]
+        try:
+            action(at, rng, memo)
+        except LookupError as error:  # the previous run did not draw the widget
+            timings.append((action.__name__, float('nan'), float('nan'), [str(error)]))
+            continue
+        ms, run_ms, allocated = timed_run(at)
+        retained += allocated
+        timings.append((action.__name__, ms, run_ms, [e.message for e in at.exception]))
+    return timings, at.session_state, int(retained)
+
+
+def percentiles(values):
+    values = np.asarray([value for value in values if value == value], dtype=float)
+    if not len(values):
+        return None
+    return {'n': int(len(values)), 'p50': round(float(np.percentile(values, 50)), 2),
+            'p95': round(float(np.percentile(values, 95)), 2), 'max': round(float(values.max()), 2),
+            'mean': round(float(values.mean()), 2)}
+
+
+def script_totals(log_path, profiler_app, offset):
+    """total_ms of the rerun_profiler records for profiler_app written after byte offset"""
+    if profiler_app is None or not os.path.exists(log_path):
+        return []
+    with open(log_path) as log:
+        log.seek(offset)
+        return [record['total_ms'] for record in map(json.loads, log) if record['app'] == profiler_app]
+
+
+def load_test(app, args):
+    """args.sessions concurrent sessions of app; returns its results dict"""
+    _, profiler_app, _, _ = APPS[app]
+    offset = os.path.getsize(DEFAULT_LOG) if os.path.exists(DEFAULT_LOG) else 0
+    gc.collect()  # what the previous app left behind is not this app's
+    rss_start = rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.sessions) as pool:
+        sessions = list(pool.map(lambda number: run_session(number, app, args), range(args.sessions)))
+    wall = time.perf_counter() - start
+    gc.collect()  # sessions are still alive through their session_state
+    rss_end = rss_mb()
+    scripts = script_totals(DEFAULT_LOG, profiler_app, offset)   # before the traced session logs its own
+    tracemalloc.start()
+    try:
+        _, _, retained = run_session(args.sessions, app, args)   # one more user, traced
+    finally:
+        tracemalloc.stop()
+
+    steps = [step for timings, _, _ in sessions for step in timings]
+    reruns = [step for step in steps if step[0] != 'open']
+    errors = sorted({message for *_, messages in steps for message in messages})
+    cache, key = {}, f'_rerun_profiler_{profiler_app}'
+    for _, state, _ in sessions:
+        for name, counts in (state[key]['cache_totals'] if key in state else {}).items():
+            merged = cache.setdefault(name, {'hits': 0, 'misses': 0})
+            merged['hits'] += counts['hits']
+            merged['misses'] += counts['misses']
+    for counts in cache.values():
+        counts['hit_ratio'] = round(counts['hits'] / max(counts['hits'] + counts['misses'], 1), 3)
+    hits = sum(counts['hits'] for counts in cache.values())
+    lookups = hits + sum(counts['misses'] for counts in cache.values())
+    return {
+        'sessions': args.sessions,
+        'reruns': len(reruns),
+        'errors': errors,
+        'wall_s': round(wall, 2),
+        'runs_per_s': round(len(steps) / wall, 2),
+        'open_ms': percentiles(ms for action, ms, _, _ in steps if action == 'open'),
+        'latency_ms': percentiles(ms for _, ms, _, _ in reruns),
+        'run_ms': percentiles(ms for _, _, ms, _ in reruns),
+        'script_ms': percentiles(scripts),
+        'actions_ms': {action: percentiles(ms for name, ms, _, _ in reruns if name == action)
+                       for action in sorted({step[0] for step in reruns})},
+        'cache': cache,
+        'cache_hit_ratio': round(hits / lookups, 3) if lookups else None,
+        'memory': {'mb_per_session': round(max(retained, 0) / 2**20, 2),
+                   'rss_mb_start': round(rss_start, 1), 'rss_mb_end': round(rss_end, 1)},
+    }
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'time': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'streamlit': streamlit.__version__, 'pandas': pd.__version__,
+            'cpus': os.cpu_count(), 'sessions': args.sessions, 'steps': args.steps, 'seed': args.seed,
+            'properties': args.properties, 'memory': 'tracemalloc'}
+
+
+def compare(results, previous, tolerance):
+    """Lines for every compared figure that grew by more than tolerance since previous"""
+    regressions = []
+    for app, figures in results['apps'].items():
+        before = previous.get('apps', {}).get(app)
+        if before is None:
+            continue
+        for group, name in COMPARED:
+            old, new = (before.get(group) or {}).get(name), (figures.get(group) or {}).get(name)
+            if old is not None and old > 0 and new is not None and new > old * (1 + tolerance):
+                regressions.append(f"{app} {group}.{name}: {old:,.1f} -> {new:,.1f} (+{new / old - 1:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent-session load test for the Streamlit apps')
+    parser.add_argument('--apps', nargs='+', choices=list(APPS), default=list(APPS))
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--steps', type=int, default=10, help='widget changes (reruns) per session')
+    parser.add_argument('--properties', type=int, choices=HOUSING_SIZES, default=50_000,
+                        help='dataset size the housing sessions select first')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=300, help='seconds one rerun may take')
+    parser.add_argument('--json', help='write the results here')
+    parser.add_argument('--compare', help='results JSON of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed growth before a regression')
+    args = parser.parse_args()
+    # bare-mode ScriptRunContext warnings and deprecation notices; AppTest re-applies the option on every run
+    streamlit.config.set_option('logger.level', 'error')
+    streamlit.logger.set_log_level('error')
+
+    results = {'meta': metadata(args), 'apps': {}}
+    print(f"{args.sessions} sessions x {args.steps} steps per app; rerun log {DEFAULT_LOG}")
+    print(f"{'app':<8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'run p50':>8} {'script p50':>11} "
+          f"{'script p95':>11} {'hit ratio':>10} {'MB/session':>11} {'errors':>7}")
+    for app in args.apps:
+        figures = results['apps'][app] = load_test(app, args)
+        latency, script, ratio = figures['latency_ms'], figures['script_ms'] or {}, figures['cache_hit_ratio']
+        print(f"{app:<8} {figures['reruns']:>7} {latency['p50']:>8,.0f} {latency['p95']:>8,.0f} "
+              f"{figures['run_ms']['p50']:>8,.0f} {script.get('p50', float('nan')):>11,.0f} "
+              f"{script.get('p95', float('nan')):>11,.0f} {'-' if ratio is None else f'{ratio:.0%}':>10} "
+              f"{figures['memory']['mb_per_session']:>11,.1f} {len(figures['errors']):>7}")
+        for error in figures['errors']:
+            print(f"  ! {error}")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        changed = [name for name in SETTINGS if previous['meta'].get(name) != results['meta'][name]]
+        if changed:
+            print(f"# {args.compare} ran with different {', '.join(changed)}: figures are not comparable")
+        regressions = compare(results, previous, args.tolerance)
+        print(f"# vs {args.compare}: " + ('no regressions' if not regressions else f"{len(regressions)} regressions"))
+        for line in regressions:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import io
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from chart_cache import FigureCache, chart_key
+from housing_data import CITIES, PROPERTY_TYPES, apply_schema, generate_housing_data
+from housing_index import HousingFilterIndex
+from rerun_profiler import rss_mb
+
+# Simulate dashboard reruns of the four housing charts and compare
+#   - "pyplot":  new figures every rerun, rendered like st.pyplot and never closed (the old app)
+#   - "cached":  FigureCache PNGs keyed by the plotted data
+# Reports mean/p95 rerun latency and process RSS growth.
+# Usage: python bench_chart_cache.py --reruns 500 --rows 100000 --states 10
+
+
+def filter_states(n_states, seed=0):
+    """Random sidebar states, replayed in a cycle like users flicking between filters"""
+    rng = np.random.default_rng(seed)
+    states = []
+    for _ in range(n_states):
+        cities = list(rng.choice(CITIES, rng.integers(1, len(CITIES) + 1), replace=False))
+        low = int(rng.integers(0, 20)) * 50_000
+        states.append((cities, PROPERTY_TYPES, (2, 4), (low, low + 1_000_000)))
+    return states
+
+
+def chart_inputs(df, rows):
+    filtered = df.take(rows)
+    city_avg = filtered.groupby('city', observed=True)['price'].mean().sort_values(ascending=False)
+    type_counts = filtered['property_type'].value_counts()
+    type_counts = type_counts[type_counts > 0]
+    return filtered, city_avg, type_counts
+
+
+def draw_all(draw_chart, filtered, city_avg, type_counts, rows):
+    draw_chart(('city_avg', city_avg.index, city_avg.values),
+               lambda fig, ax: ax.bar(city_avg.index.astype(str), city_avg.values / 1e6, color='steelblue'))
+    draw_chart(('type_pie', type_counts.index, type_counts.values),
+               lambda fig, ax: ax.pie(type_counts.values, labels=type_counts.index, autopct='%1.1f%%', startangle=90))
+    counts, edges = np.histogram(filtered['price'] / 1e6, bins=30)
+    draw_chart(('price_hist', counts, edges),
+               lambda fig, ax: ax.hist(edges[:-1], bins=edges, weights=counts, color='skyblue', edgecolor='navy'))
+    draw_chart(('price_distance', rows),
+               lambda fig, ax: ax.scatter(filtered['distance_cbd'], filtered['price'] / 1e6,
+                                          c=filtered['bedrooms'], cmap='viridis', alpha=0.6, s=30))
+
+
+def pyplot_chart(key_parts, draw):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    draw(fig, ax)
+    plt.tight_layout()
+    fig.savefig(io.BytesIO(), format='png')  # What st.pyplot does; the old app never closed fig
+
+
+def run(mode, df, filter_index, states, reruns):
+    figure_cache = FigureCache(max_bytes=64 * 2**20)
+
+    def cached_chart(key_parts, draw):
+        figure_cache.get_png(chart_key(*key_parts), draw)
+
+    draw_chart = cached_chart if mode == 'cached' else pyplot_chart
+    rss_start = rss_mb()
+    timings = []
+    for i in range(reruns):
+        start = time.perf_counter()
+        rows = filter_index.select(*states[i % len(states)])
+        draw_all(draw_chart, *chart_inputs(df, rows), rows)
+        timings.append(time.perf_counter() - start)
+
+    timings = np.array(timings) * 1000
+    result = {
+        'mode': mode,
+        'mean_ms': timings.mean(),
+        'p95_ms': np.percentile(timings, 95),
+        'rss_growth_mb': rss_mb() - rss_start,
+        'open_figures': len(plt.get_fignums()),
+        'hit_rate': figure_cache.stats()['hit_rate'],
+    }
+    plt.close('all')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chart rendering cache benchmark')
+    parser.add_argument('--reruns', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--states', type=int, default=10)
+    args = parser.parse_args()
+
+    df = apply_schema(generate_housing_data(args.rows))
+    filter_index = HousingFilterIndex(df)
+    states = filter_states(args.states)
+
+    print(f"{'mode':>8} {'mean ms':>9} {'p95 ms':>9} {'RSS +MB':>9} {'open figs':>9} {'hit rate':>9}")
+    for mode in ['pyplot', 'cached']:
+        result = run(mode, df, filter_index, states, args.reruns)
+        print(f"{result['mode']:>8} {result['mean_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+              f"{result['rss_growth_mb']:>9.1f} {result['open_figures']:>9} {result['hit_rate']:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
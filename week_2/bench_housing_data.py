@@ -0,0 +1,43 @@
+import argparse
+import time
+import tracemalloc
+
+from housing_data import generate_housing_data, generate_housing_data_apply
+
+# Compare the vectorized housing generator with the original row-wise apply path.
+# Usage: python bench_housing_data.py --sizes 10000 1000000 10000000
+# The apply path is skipped above --apply-max-rows because it takes minutes per million rows.
+
+
+def measure(generator, n_properties):
+    """Return (seconds, peak MiB) for one call of generator(n_properties)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = generator(n_properties)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del df
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Housing data generation benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--apply-max-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'path':>10} {'seconds':>10} {'peak MiB':>10}")
+    for n in args.sizes:
+        paths = [('vectorized', generate_housing_data)]
+        if n <= args.apply_max_rows:
+            paths.append(('apply', generate_housing_data_apply))
+        for name, generator in paths:
+            elapsed, peak = measure(generator, n)
+            print(f"{n:>12,} {name:>10} {elapsed:>10.3f} {peak:>10.1f}")
+        if n > args.apply_max_rows:
+            print(f"{n:>12,} {'apply':>10} {'skipped':>10} {'':>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+
+from housing_data import CITIES, PROPERTY_TYPES, apply_schema, generate_housing_data
+from housing_index import HousingFilterIndex
+
+# Compare sidebar filter latency: boolean masks over the whole frame vs HousingFilterIndex.
+# Usage: python bench_housing_filters.py --sizes 1000000 5000000 --repeats 20
+
+# A few representative sidebar states: (cities, property types, bedroom range, price range in $)
+FILTER_STATES = [
+    (CITIES, PROPERTY_TYPES, (2, 4), (500_000, 1_500_000)),
+    (['Sydney', 'Melbourne'], ['House'], (3, 5), (1_000_000, 2_500_000)),
+    (['Hobart'], ['Apartment', 'Villa'], (1, 2), (300_000, 600_000)),
+    (CITIES, PROPERTY_TYPES, (1, 5), (0, 10_000_000)),
+]
+
+
+def mask_filter(df, cities, types, bedroom_range, price_range):
+    """The dashboard's original filter: six full-column comparisons"""
+    return df[
+        (df['city'].isin(cities)) &
+        (df['property_type'].isin(types)) &
+        (df['bedrooms'] >= bedroom_range[0]) &
+        (df['bedrooms'] <= bedroom_range[1]) &
+        (df['price'] >= price_range[0]) &
+        (df['price'] <= price_range[1])
+    ]
+
+
+def index_filter(df, filter_index, cities, types, bedroom_range, price_range):
+    return df.take(filter_index.select(cities, types, bedroom_range, price_range))
+
+
+def best_of(func, repeats):
+    """Fastest wall time of repeats calls, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Housing sidebar filter benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 5_000_000])
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'state':>6} {'matches':>10} {'mask ms':>9} {'index ms':>9} {'speedup':>8}")
+    for n in args.sizes:
+        df = apply_schema(generate_housing_data(n))
+
+        start = time.perf_counter()
+        filter_index = HousingFilterIndex(df)
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"{n:>10,} index build: {build_ms:.0f} ms")
+
+        for i, state in enumerate(FILTER_STATES):
+            expected = mask_filter(df, *state)
+            actual = index_filter(df, filter_index, *state)
+            assert np.array_equal(expected.index.to_numpy(), actual.index.to_numpy()), 'index and mask disagree'
+
+            mask_ms = best_of(lambda: mask_filter(df, *state), args.repeats)
+            index_ms = best_of(lambda: index_filter(df, filter_index, *state), args.repeats)
+            print(f"{n:>10,} {i:>6} {len(expected):>10,} {mask_ms:>9.2f} {index_ms:>9.2f} {mask_ms / index_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_housing_filters import FILTER_STATES, best_of
+from housing_cube import HousingCube
+from housing_data import apply_schema
+from housing_index import HousingFilterIndex
+from housing_store import HousingStore, build_store, generate_batches
+from scatter_density import density_grid
+
+# In-memory dashboard path vs the SQLite store, per dataset size:
+#   - setup: generate + schema + filter index + cube in the server process, vs building
+#     the store file once (shared by every process afterwards),
+#   - first paint: everything the default sidebar state needs, from a cold start
+#     (memory: build the frame; store: open the file and run the default queries),
+#   - per interaction: metrics/charts rollup, price histogram, density grid and the first
+#     table page for each FILTER_STATE.
+# Usage: python bench_housing_store.py --sizes 1000000 10000000 --skip-memory 10000000
+
+
+def memory_interaction(df, filter_index, cube, state):
+    rows = filter_index.select(*state)
+    filtered = df.take(rows)
+    selection = cube.rollup(df, filter_index, *state)
+    np.histogram(filtered['price'], bins=30)
+    density_grid(filtered['distance_cbd'].to_numpy(), filtered['price'].to_numpy(),
+                 filtered['bedrooms'].to_numpy(), bins=60)
+    filtered.head(100)
+    return selection
+
+
+def store_interaction(store, state):
+    selection, extent = store.selection(state)
+    store.price_histogram(state, extent.get('price'))
+    store.density_grid(state, extent.get('distance_cbd'), extent.get('price'))
+    store.page(state)
+    return selection
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Housing SQLite store vs in-memory dashboard benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--skip-memory', type=int, nargs='*', default=[],
+                        help='sizes to run on the store only (the in-memory path needs the rows in RAM)')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--directory', default=None, help='where to build the stores (default: a temp dir)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        for n in args.sizes:
+            path = os.path.join(directory, f'housing_{n}.db')
+            build_seconds = build_store(path, n)
+            print(f"{n:>11,} store built in {build_seconds:.1f}s ({os.path.getsize(path) / 2**20:,.0f} MB)")
+
+            start = time.perf_counter()
+            store = HousingStore(path)
+            store_interaction(store, FILTER_STATES[0])
+            store_paint = time.perf_counter() - start
+            print(f"{n:>11,} first paint: store {store_paint * 1000:,.0f} ms", end='')
+
+            memory = n not in args.skip_memory
+            if memory:
+                start = time.perf_counter()
+                # the store's rows, so both sides answer the same questions
+                df = apply_schema(pd.concat(generate_batches(n), ignore_index=True))
+                filter_index = HousingFilterIndex(df)
+                cube = HousingCube(df)
+                cube.overall()
+                memory_interaction(df, filter_index, cube, FILTER_STATES[0])
+                memory_paint = time.perf_counter() - start
+                print(f", in-memory {memory_paint * 1000:,.0f} ms")
+            else:
+                print()
+
+            print(f"{'rows':>11} {'state':>6} {'matches':>10} {'store ms':>9} {'memory ms':>10}")
+            for i, state in enumerate(FILTER_STATES):
+                selection = store_interaction(store, state)
+                store_ms = best_of(lambda: store_interaction(store, state), args.repeats)
+                memory_ms = float('nan')
+                if memory:
+                    expected = memory_interaction(df, filter_index, cube, state)
+                    assert expected.total_count() == selection.total_count(), 'store and memory disagree'
+                    memory_ms = best_of(lambda: memory_interaction(df, filter_index, cube, state), args.repeats)
+                print(f"{n:>11,} {i:>6} {selection.total_count():>10,} {store_ms:>9.1f} {memory_ms:>10.1f}")
+            store.close()
+            if memory:
+                del df, filter_index, cube
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
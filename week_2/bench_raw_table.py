@@ -0,0 +1,58 @@
+import argparse
+import io
+import time
+
+import pandas as pd
+
+from bench_housing_filters import FILTER_STATES, best_of
+from housing_data import apply_schema, generate_housing_data
+from housing_index import HousingFilterIndex
+from raw_table import DISPLAY_COLUMNS, export_bytes, frame_chunks, page_rows, scale_page, sort_order
+
+# "Show Raw Data" cost per rerun: the original copy + four .apply() string passes over
+# every filtered row before head(100), vs raw_table slicing one page and scaling it.
+# Also times the one-off argsort behind a sort change and the chunked CSV/Parquet export.
+# Usage: python bench_raw_table.py --sizes 1000000 5000000
+
+
+def old_table(filtered_df):
+    display_df = filtered_df[DISPLAY_COLUMNS].copy()
+    display_df['price'] = display_df['price'].apply(lambda x: f'${x/1e6:.2f}M')
+    display_df['building_size'] = display_df['building_size'].apply(lambda x: f'{x:.0f} sqm')
+    display_df['distance_cbd'] = display_df['distance_cbd'].apply(lambda x: f'{x:.1f} km')
+    display_df['age'] = display_df['age'].apply(lambda x: f'{x:.0f} years')
+    return display_df.head(100)
+
+
+def seconds(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raw data table benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'state':>6} {'matches':>10} {'old ms':>9} {'page ms':>8} {'sort ms':>8} "
+          f"{'csv s':>7} {'old csv s':>9} {'parquet s':>9}")
+    for n in args.sizes:
+        df = apply_schema(generate_housing_data(n))
+        filter_index = HousingFilterIndex(df)
+        for i, state in enumerate(FILTER_STATES):
+            filtered_df = df.take(filter_index.select(*state))
+            old_ms = best_of(lambda: old_table(filtered_df), args.repeats)
+            sort_seconds, order = seconds(lambda: sort_order(filtered_df['price'], ascending=False))
+            page_ms = best_of(lambda: scale_page(page_rows(filtered_df, 3, order=order)), args.repeats)
+            csv_seconds, _ = seconds(lambda: export_bytes(frame_chunks(filtered_df, order), 'CSV'))
+            old_csv_seconds, _ = seconds(lambda: io.BytesIO(filtered_df[DISPLAY_COLUMNS].to_csv(index=False).encode()))
+            parquet_seconds, data = seconds(lambda: export_bytes(frame_chunks(filtered_df, order), 'Parquet'))
+            assert len(pd.read_parquet(io.BytesIO(data))) == len(filtered_df)
+            print(f"{n:>10,} {i:>6} {len(filtered_df):>10,} {old_ms:>9.1f} {page_ms:>8.2f} {sort_seconds * 1000:>8.1f} "
+                  f"{csv_seconds:>7.2f} {old_csv_seconds:>9.2f} {parquet_seconds:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
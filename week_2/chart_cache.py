@@ -0,0 +1,106 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+import matplotlib
+matplotlib.use('Agg')  # Server-side rendering only, never open a GUI window
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+# Rendering cache for the Streamlit dashboards.
+# Charts are drawn once per distinct (data, styling) key, saved as PNG bytes and
+# served from an LRU cache on later reruns. Figures are always closed after saving
+# so long-lived server processes don't accumulate them.
+
+
+def chart_key(*parts):
+    """Stable hash of the plotted data and styling (arrays, Series, DataFrames, scalars, tuples)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.Series, pd.Index)):
+            part = part.to_numpy()
+        if isinstance(part, pd.DataFrame):
+            digest.update(repr(list(part.columns)).encode())
+            for column in part.columns:
+                digest.update(np.ascontiguousarray(part[column].to_numpy()).tobytes())
+        elif isinstance(part, np.ndarray) and part.dtype != object:
+            digest.update(f'{part.dtype}{part.shape}'.encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part.tolist() if isinstance(part, np.ndarray) else part).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """LRU cache of rendered PNG bytes, bounded by entry count and total bytes"""
+
+    def __init__(self, max_bytes=64 * 2**20, max_entries=256, dpi=100):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # pyplot keeps global state, so renders from concurrent sessions are serialised
+        self._render_lock = threading.Lock()
+
+    def get_png(self, key, draw, figsize=(8, 6)):
+        """Return PNG bytes for key, calling draw(fig, ax) to render only on a cache miss"""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png
+            self.misses += 1
+
+        png = render_png(draw, figsize, self.dpi, self._render_lock)
+        self._store(key, png)
+        return png
+
+    def _store(self, key, png):
+        with self._lock:
+            if key in self._entries or len(png) > self.max_bytes:
+                return
+            self._entries[key] = png
+            self._bytes += len(png)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def render_png(draw, figsize=(8, 6), dpi=100, lock=None):
+    """Draw a new figure with draw(fig, ax), return it as PNG bytes and always close it"""
+    with lock if lock is not None else nullcontext():
+        fig, ax = plt.subplots(figsize=figsize)
+        try:
+            draw(fig, ax)
+            fig.tight_layout()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi)
+            return buffer.getvalue()
+        finally:
+            plt.close(fig)
+
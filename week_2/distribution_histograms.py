@@ -0,0 +1,110 @@
+import numpy as np
+
+# Histogram engine for the distribution dashboard (02c_student_exercise_dashboard.py).
+# Every panel is reduced to (counts, edges) once, so charts and caches hold a few
+# hundred numbers per distribution no matter how many samples were drawn.
+# Large sample sizes are generated and binned in chunks and never materialised.
+
+CHUNK_SIZE = 1_000_000
+CONTINUOUS_BINS = 40
+
+# Column name -> (sampler(rng, size, **params), parameters it depends on, rounded to 2 dp, integer valued)
+DISTRIBUTIONS = {
+    'random_normal': (lambda rng, n, loc, scale: rng.normal(loc, scale, n), ('loc', 'scale'), True, False),
+    'random_lognormal': (lambda rng, n, loc, scale: rng.lognormal(loc, scale, n), ('loc', 'scale'), True, False),
+    'random_exponential': (lambda rng, n, scale: rng.exponential(scale, n), ('scale',), True, False),
+    'random_poisson': (lambda rng, n, loc: rng.poisson(loc, n), ('loc',), False, True),
+    'random_randint': (lambda rng, n, plot_range: rng.integers(plot_range[0], plot_range[1], n), ('plot_range',), False, True),
+    'random_uniform': (lambda rng, n, plot_range: rng.uniform(plot_range[0], plot_range[1], n), ('plot_range',), True, False),
+}
+
+# Samples up to this size are drawn in one call; larger sizes are generated and binned in chunks
+IN_MEMORY_MAX_SAMPLES = 1_000_000
+
+
+def distribution_params(name, **params):
+    """Only the parameters that distribution name depends on, as a hashable tuple"""
+    return tuple((param, params[param]) for param in DISTRIBUTIONS[name][1])
+
+
+def distribution_rng(name, random_seed):
+    """Independent Generator for one distribution: child i of SeedSequence(random_seed).spawn()"""
+    stream = list(DISTRIBUTIONS).index(name)
+    return np.random.default_rng(np.random.SeedSequence(random_seed).spawn(len(DISTRIBUTIONS))[stream])
+
+
+def distribution_histogram(name, random_seed, size_samples, params, bins=CONTINUOUS_BINS):
+    """(counts, edges) for one distribution, reproducible per seed and independent of the others"""
+    params = dict(params)
+    if size_samples > IN_MEMORY_MAX_SAMPLES:
+        return streamed_histogram(name, lambda: distribution_rng(name, random_seed), size_samples, params, bins)
+
+    sampler, _, rounded, _ = DISTRIBUTIONS[name]
+    values = sampler(distribution_rng(name, random_seed), size_samples, **params)
+    return histogram(name, values.round(2) if rounded else values, params.get('plot_range'), bins)
+
+
+def integer_histogram(values, low=None, high=None):
+    """np.bincount histogram with one unit-wide bin per integer in [low, high)"""
+    values = np.asarray(values)
+    low = int(values.min()) if low is None else low
+    high = int(values.max()) + 1 if high is None else high
+    counts = np.bincount(values - low, minlength=high - low)
+    return counts, np.arange(low, high + 1)
+
+
+def continuous_histogram(values, bins=CONTINUOUS_BINS):
+    return np.histogram(values, bins=bins)
+
+
+def histogram(name, values, plot_range=None, bins=CONTINUOUS_BINS):
+    """(counts, edges) for one dashboard column; randint uses the slider range as its bins"""
+    if name == 'random_randint':
+        return integer_histogram(values, plot_range[0], plot_range[1])
+    if DISTRIBUTIONS[name][3]:
+        return integer_histogram(values)
+    return continuous_histogram(values, bins)
+
+
+def _chunks(sampler, rounded, rng, size_samples, params, chunk_size):
+    for start in range(0, size_samples, chunk_size):
+        chunk = sampler(rng, min(chunk_size, size_samples - start), **params)
+        yield chunk.round(2) if rounded else chunk
+
+
+def streamed_histogram(name, rng_factory, size_samples, params, bins=CONTINUOUS_BINS, chunk_size=CHUNK_SIZE):
+    """Bin size_samples draws of one distribution chunk by chunk.
+
+    rng_factory() must return a freshly seeded generator each call: continuous
+    distributions take two passes (min/max, then counts) over the same stream so the
+    edges match np.histogram on the full sample.
+    """
+    sampler, _, rounded, is_integer = DISTRIBUTIONS[name]
+    chunks = lambda: _chunks(sampler, rounded, rng_factory(), size_samples, params, chunk_size)
+
+    if name == 'random_randint':
+        plot_range = params['plot_range']
+        counts = np.zeros(plot_range[1] - plot_range[0], dtype=np.int64)
+        for chunk in chunks():
+            counts += np.bincount(chunk - plot_range[0], minlength=len(counts))
+        return counts, np.arange(plot_range[0], plot_range[1] + 1)
+
+    if is_integer:
+        # Non-negative counts (poisson): grow the bincount as larger values appear
+        counts = np.zeros(0, dtype=np.int64)
+        for chunk in chunks():
+            chunk_counts = np.bincount(chunk)
+            if len(chunk_counts) > len(counts):
+                counts = np.pad(counts, (0, len(chunk_counts) - len(counts)))
+            counts[:len(chunk_counts)] += chunk_counts
+        low = int(np.flatnonzero(counts)[0])
+        return counts[low:], np.arange(low, len(counts) + 1)
+
+    low, high = np.inf, -np.inf
+    for chunk in chunks():
+        low, high = min(low, chunk.min()), max(high, chunk.max())
+    counts = np.zeros(bins, dtype=np.int64)
+    for chunk in chunks():
+        chunk_counts, edges = np.histogram(chunk, bins=bins, range=(low, high))
+        counts += chunk_counts
+    return counts, edges
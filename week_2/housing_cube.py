@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# Pre-aggregated cube for the housing dashboard metrics and city/type charts.
+# Cells are keyed by (city, property_type, bedrooms, price bucket) and hold count,
+# sum and sum of squares of each measure, so any sidebar selection is a small
+# array reduction instead of a groupby over the filtered rows.
+
+CUBE_MEASURES = ['price', 'building_size', 'age']
+
+# Matches the "Price Range ($K)" slider step, so slider values land on bucket edges
+PRICE_BUCKET_WIDTH = 50_000
+
+
+class CubeSelection:
+    """Count/sum/sum-of-squares for one filter state, rolled up to (city, property_type)"""
+
+    def __init__(self, cities, property_types, count, sums, sumsq):
+        self.cities = cities
+        self.property_types = property_types
+        self.count = count    # shape (n_cities, n_types)
+        self.sums = sums      # shape (n_cities, n_types, n_measures)
+        self.sumsq = sumsq
+
+    def total_count(self):
+        return int(self.count.sum())
+
+    def mean(self, measure):
+        total = self.count.sum()
+        return self.sums[..., CUBE_MEASURES.index(measure)].sum() / total if total else np.nan
+
+    def std(self, measure):
+        """Sample standard deviation from the stored sum and sum of squares"""
+        m = CUBE_MEASURES.index(measure)
+        n = self.count.sum()
+        if n < 2:
+            return np.nan
+        total = self.sums[..., m].sum()
+        variance = (self.sumsq[..., m].sum() - total * total / n) / (n - 1)
+        return np.sqrt(max(variance, 0.0))
+
+    def mean_by_city(self, measure):
+        """Same as groupby('city', observed=True)[measure].mean() on the filtered rows"""
+        count = self.count.sum(axis=1)
+        sums = self.sums[..., CUBE_MEASURES.index(measure)].sum(axis=1)
+        has_rows = count > 0
+        return pd.Series(sums[has_rows] / count[has_rows], index=np.asarray(self.cities)[has_rows], name=measure)
+
+    def count_by_type(self):
+        """Same as value_counts() of property_type on the filtered rows, without empty types"""
+        count = self.count.sum(axis=0)
+        counts = pd.Series(count, index=self.property_types, name='count')
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+
+class HousingCube:
+    """Aggregate cube over (city, property_type, bedrooms, price bucket)"""
+
+    def __init__(self, housing_data, bucket_width=PRICE_BUCKET_WIDTH):
+        self.cities = list(housing_data['city'].cat.categories)
+        self.property_types = list(housing_data['property_type'].cat.categories)
+        self.bedrooms = np.sort(housing_data['bedrooms'].unique())
+
+        # Bucket edges sit on the slider grid (int($K) minimum + 50K steps) and end above the max price
+        price = housing_data['price'].to_numpy()
+        origin = int(price.min() / 1000) * 1000
+        if origin > price.min():  # int() rounds negative prices up
+            origin -= bucket_width
+        n_buckets = int((price.max() - origin) // bucket_width) + 1
+        self.price_edges = origin + bucket_width * np.arange(n_buckets + 1)
+
+        bucket = np.searchsorted(self.price_edges, price, side='right') - 1
+        self.shape = (len(self.cities), len(self.property_types), len(self.bedrooms), n_buckets)
+        cell = np.ravel_multi_index(self._codes(housing_data) + (bucket,), self.shape)
+
+        size = int(np.prod(self.shape))
+        self.count = np.bincount(cell, minlength=size).reshape(self.shape)
+        sums, sumsq = [], []
+        for measure in CUBE_MEASURES:
+            values = housing_data[measure].to_numpy(dtype=np.float64)
+            sums.append(np.bincount(cell, weights=values, minlength=size))
+            sumsq.append(np.bincount(cell, weights=values * values, minlength=size))
+        self.sums = np.stack(sums, axis=-1).reshape(self.shape + (len(CUBE_MEASURES),))
+        self.sumsq = np.stack(sumsq, axis=-1).reshape(self.shape + (len(CUBE_MEASURES),))
+
+    def _codes(self, housing_data, positions=None):
+        """(city, property_type, bedroom) cell codes for all rows, or only the given positions"""
+        city = housing_data['city'].cat.codes.to_numpy()
+        property_type = housing_data['property_type'].cat.codes.to_numpy()
+        bedrooms = housing_data['bedrooms'].to_numpy()
+        if positions is not None:
+            city, property_type, bedrooms = city[positions], property_type[positions], bedrooms[positions]
+        return city, property_type, np.searchsorted(self.bedrooms, bedrooms)
+
+    def overall(self):
+        """Roll-up over every row (the dashboard's 'vs all' baselines)"""
+        return CubeSelection(
+            self.cities, self.property_types,
+            self.count.sum(axis=(2, 3)), self.sums.sum(axis=(2, 3)), self.sumsq.sum(axis=(2, 3))
+        )
+
+    def rollup(self, housing_data, filter_index, cities, property_types, bedroom_range, price_range):
+        """Roll up the cells matching the sidebar filters.
+
+        Whole price buckets inside the range come from the cube. Rows in the partial
+        buckets at either end are aggregated exactly from housing_data, located through
+        the filter index's price-sorted positions, so results match the row-level filter.
+        """
+        city_sel = np.isin(self.cities, list(cities))
+        type_sel = np.isin(self.property_types, list(property_types))
+        bed_sel = (self.bedrooms >= bedroom_range[0]) & (self.bedrooms <= bedroom_range[1])
+
+        low, high = price_range
+        first = np.searchsorted(self.price_edges, low, side='left')        # first edge >= low
+        last = np.searchsorted(self.price_edges, high, side='right') - 1   # last edge <= high
+        bucket_sel = np.zeros(self.shape[3], dtype=bool)
+        if first < last:
+            bucket_sel[first:last] = True
+            exact = np.concatenate([
+                filter_index.price_positions(low, self.price_edges[first], include_high=False),
+                filter_index.price_positions(self.price_edges[last], high),
+            ])
+        else:
+            exact = filter_index.price_positions(low, high)
+
+        cube_sel = np.ix_(city_sel, type_sel, bed_sel, bucket_sel)
+        count = np.zeros(self.shape[:2])
+        sums = np.zeros(self.shape[:2] + (len(CUBE_MEASURES),))
+        sumsq = np.zeros_like(sums)
+        count[np.ix_(city_sel, type_sel)] = self.count[cube_sel].sum(axis=(2, 3))
+        sums[np.ix_(city_sel, type_sel)] = self.sums[cube_sel].sum(axis=(2, 3))
+        sumsq[np.ix_(city_sel, type_sel)] = self.sumsq[cube_sel].sum(axis=(2, 3))
+
+        # Exact-match fallback for the partial buckets at the price bounds
+        city, property_type, bedroom = self._codes(housing_data, exact)
+        keep = city_sel[city] & type_sel[property_type] & bed_sel[bedroom]
+        exact = exact[keep]
+        cell = np.ravel_multi_index((city[keep], property_type[keep]), self.shape[:2])
+        size = self.shape[0] * self.shape[1]
+        count += np.bincount(cell, minlength=size).reshape(self.shape[:2])
+        for m, measure in enumerate(CUBE_MEASURES):
+            values = housing_data[measure].to_numpy()[exact].astype(np.float64)
+            sums[..., m] += np.bincount(cell, weights=values, minlength=size).reshape(self.shape[:2])
+            sumsq[..., m] += np.bincount(cell, weights=values * values, minlength=size).reshape(self.shape[:2])
+
+        return CubeSelection(self.cities, self.property_types, count, sums, sumsq)
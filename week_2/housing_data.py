@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic Australian housing data shared by the housing dashboard and its benchmarks.
+# Kept free of streamlit imports so it can be timed and reused outside the app.
+
+CITIES = ['Sydney', 'Melbourne', 'Brisbane', 'Perth', 'Adelaide', 'Hobart', 'Darwin', 'Canberra']
+CITY_WEIGHTS = [0.25, 0.22, 0.15, 0.12, 0.10, 0.06, 0.04, 0.06]
+
+PROPERTY_TYPES = ['House', 'Apartment', 'Townhouse', 'Villa']
+PROPERTY_TYPE_WEIGHTS = [0.45, 0.35, 0.15, 0.05]
+
+BASE_PRICE = {
+    'Sydney': 1200000, 'Melbourne': 950000, 'Brisbane': 750000, 'Perth': 650000,
+    'Adelaide': 600000, 'Hobart': 550000, 'Darwin': 600000, 'Canberra': 850000
+}
+
+CURRENT_YEAR = 2024
+DEFAULT_N_PROPERTIES = 5000
+DEFAULT_SEED = 42
+
+
+def generate_housing_data(n_properties=DEFAULT_N_PROPERTIES, seed=DEFAULT_SEED):
+    """Generate the housing dataset with whole-array expressions (no per-row Python calls)"""
+    rng = np.random.default_rng(seed)
+
+    # Draw cities as integer codes so the base price is a single take() instead of a dict lookup per row
+    city_codes = rng.choice(len(CITIES), n_properties, p=CITY_WEIGHTS)
+    city_base_price = np.array([BASE_PRICE[city] for city in CITIES], dtype=np.float64)
+
+    bedrooms = rng.choice([1, 2, 3, 4, 5], n_properties, p=[0.1, 0.25, 0.35, 0.25, 0.05])
+    bathrooms = rng.choice([1, 2, 3], n_properties, p=[0.4, 0.45, 0.15])
+    building_size = rng.lognormal(5, 0.6, n_properties)
+    year_built = rng.normal(1995, 20, n_properties).astype(int).clip(1950, CURRENT_YEAR)
+    distance_cbd = rng.exponential(15, n_properties)
+
+    housing_data = pd.DataFrame({
+        'property_id': np.arange(1, n_properties + 1),
+        'city': np.asarray(CITIES, dtype=object)[city_codes],
+        'property_type': np.asarray(PROPERTY_TYPES, dtype=object)[
+            rng.choice(len(PROPERTY_TYPES), n_properties, p=PROPERTY_TYPE_WEIGHTS)
+        ],
+        'bedrooms': bedrooms,
+        'bathrooms': bathrooms,
+        'car_spaces': rng.choice([0, 1, 2, 3], n_properties, p=[0.15, 0.35, 0.40, 0.10]),
+        'land_size': rng.lognormal(6, 0.8, n_properties),
+        'building_size': building_size,
+        'year_built': year_built,
+        'distance_cbd': distance_cbd,
+    })
+
+    # Same pricing model as before, but all the noise is drawn in one call
+    noise = rng.normal(0, 0.15, n_properties)
+    price = (
+        city_base_price[city_codes] *
+        (1 + 0.15 * bedrooms) *
+        (1 + 0.1 * bathrooms) *
+        (1 - 0.01 * distance_cbd) *
+        (1 + noise)
+    )
+
+    housing_data['price'] = price
+    housing_data['price_per_sqm'] = price / building_size
+    housing_data['age'] = CURRENT_YEAR - year_built
+
+    return housing_data
+
+
+def generate_housing_data_apply(n_properties=DEFAULT_N_PROPERTIES, seed=DEFAULT_SEED):
+    """Original row-wise generator, kept only as the baseline for bench_housing_data.py"""
+    np.random.seed(seed)
+
+    housing_data = pd.DataFrame({
+        'property_id': range(1, n_properties + 1),
+        'city': np.random.choice(CITIES, n_properties, p=CITY_WEIGHTS),
+        'property_type': np.random.choice(PROPERTY_TYPES, n_properties, p=PROPERTY_TYPE_WEIGHTS),
+        'bedrooms': np.random.choice([1, 2, 3, 4, 5], n_properties, p=[0.1, 0.25, 0.35, 0.25, 0.05]),
+        'bathrooms': np.random.choice([1, 2, 3], n_properties, p=[0.4, 0.45, 0.15]),
+        'car_spaces': np.random.choice([0, 1, 2, 3], n_properties, p=[0.15, 0.35, 0.40, 0.10]),
+        'land_size': np.random.lognormal(6, 0.8, n_properties),
+        'building_size': np.random.lognormal(5, 0.6, n_properties),
+        'year_built': np.random.normal(1995, 20, n_properties).astype(int).clip(1950, CURRENT_YEAR),
+        'distance_cbd': np.random.exponential(15, n_properties),
+    })
+
+    housing_data['price'] = housing_data.apply(lambda row:
+        BASE_PRICE[row['city']] *
+        (1 + 0.15 * row['bedrooms']) *
+        (1 + 0.1 * row['bathrooms']) *
+        (1 - 0.01 * row['distance_cbd']) *
+        (1 + np.random.normal(0, 0.15)), axis=1
+    )
+
+    housing_data['price_per_sqm'] = housing_data['price'] / housing_data['building_size']
+    housing_data['age'] = CURRENT_YEAR - housing_data['year_built']
+
+    return housing_data
+
+
+# Compact dtypes for the housing frame. Strings become categoricals with a fixed category
+# order, small counts become int8/int16 and measurements become float32. Price stays
+# float64 because it drives the price filter and the headline averages.
+HOUSING_SCHEMA = {
+    'property_id': 'int32',
+    'city': pd.CategoricalDtype(CITIES),
+    'property_type': pd.CategoricalDtype(PROPERTY_TYPES),
+    'bedrooms': 'int8',
+    'bathrooms': 'int8',
+    'car_spaces': 'int8',
+    'land_size': 'float32',
+    'building_size': 'float32',
+    'year_built': 'int16',
+    'distance_cbd': 'float32',
+    'price': 'float64',
+    'price_per_sqm': 'float32',
+    'age': 'int16',
+}
+
+
+def apply_schema(housing_data, schema=HOUSING_SCHEMA):
+    """Cast the columns listed in schema to their compact dtypes"""
+    return housing_data.astype({col: dtype for col, dtype in schema.items() if col in housing_data.columns})
+
+
+def memory_report(before, after):
+    """Per-column memory_usage(deep=True) before/after applying the schema, in KiB"""
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'before_kib': before.memory_usage(deep=True, index=False) / 1024,
+        'after_kib': after.memory_usage(deep=True, index=False) / 1024,
+    })
+    report.loc['TOTAL', ['before_kib', 'after_kib']] = report[['before_kib', 'after_kib']].sum()
+    report['saving_pct'] = (1 - report['after_kib'] / report['before_kib']) * 100
+    return report
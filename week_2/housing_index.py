@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+# Precomputed filter index for the housing dashboard sidebar.
+# Built once inside the cached data load, then every widget change intersects
+# packed bitmaps (1 bit per row) instead of scanning the full columns again.
+
+
+class HousingFilterIndex:
+    """Packed per-category bitmaps for city/property_type/bedrooms plus a price-sorted position array"""
+
+    def __init__(self, housing_data):
+        self.n_rows = len(housing_data)
+        self.city = self._build_bitmaps(housing_data['city'])
+        self.property_type = self._build_bitmaps(housing_data['property_type'])
+        self.bedrooms = self._build_bitmaps(housing_data['bedrooms'])
+
+        # Row positions ordered by price; a price range is then two searchsorted calls
+        price = housing_data['price'].to_numpy()
+        self.price_order = np.argsort(price, kind='stable')
+        self.sorted_price = price[self.price_order]
+
+    @staticmethod
+    def _build_bitmaps(column):
+        """One np.packbits bitmap per distinct value of column"""
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Compare the small integer codes rather than the category strings
+            codes = column.cat.codes.to_numpy()
+            return {
+                category: np.packbits(codes == code)
+                for code, category in enumerate(column.cat.categories)
+            }
+        values = column.to_numpy()
+        return {
+            value: np.packbits(values == value)
+            for value in column.drop_duplicates().tolist()
+        }
+
+    def _union(self, bitmaps, keys):
+        """Bitwise OR of the bitmaps for keys (all-zero bitmap if none match)"""
+        combined = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for key in keys:
+            if key in bitmaps:
+                np.bitwise_or(combined, bitmaps[key], out=combined)
+        return combined
+
+    def price_positions(self, low, high, include_high=True):
+        """Row positions with low <= price <= high (or < high), in price order"""
+        start = np.searchsorted(self.sorted_price, low, side='left')
+        stop = np.searchsorted(self.sorted_price, high, side='right' if include_high else 'left')
+        return self.price_order[start:stop]
+
+    def select(self, cities, property_types, bedroom_range, price_range):
+        """Sorted row positions matching all sidebar filters (same rows as the boolean-mask version)"""
+        combined = self._union(self.city, cities)
+        np.bitwise_and(combined, self._union(self.property_type, property_types), out=combined)
+        bedroom_keys = [b for b in self.bedrooms if bedroom_range[0] <= b <= bedroom_range[1]]
+        np.bitwise_and(combined, self._union(self.bedrooms, bedroom_keys), out=combined)
+
+        # Probe the combined bitmap only at the rows inside the price range
+        positions = self.price_positions(price_range[0], price_range[1])
+        bits = (combined[positions >> 3] >> (7 - (positions & 7))) & 1
+        return np.sort(positions[bits.astype(bool)])
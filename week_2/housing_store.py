@@ -0,0 +1,434 @@
+import argparse
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from housing_cube import CUBE_MEASURES, CubeSelection
+from housing_data import CITIES, DEFAULT_SEED, PROPERTY_TYPES, generate_housing_data
+from raw_table import DISPLAY_COLUMNS, EXPORT_CHUNK_SIZE, PAGE_SIZE
+
+# SQLite store for the housing dashboard's "SQLite store" data source.
+# The rows live on disk (one file shared by every app process and replica) instead of
+# being generated into each server's memory. Every sidebar state becomes a few
+# parameterised queries that return only what the page draws: a (city, property_type)
+# aggregate for the metrics and charts, 30 price-histogram bins, a 60x60 density grid
+# (or the points of a small selection) and one 100-row page of the raw table.
+# Metrics, charts, histogram and density grid are summed from pre-aggregated cell tables
+# (CellTable) built with the store, plus the few exact rows at the ends of the price
+# range, so their cost depends on the number of cells rather than on the rows selected.
+# The whole-table baselines are precomputed into property_summary, so first paint only
+# reads a few dozen summary rows before the default selection's queries.
+# Usage: python housing_store.py --rows 10000000 --path housing.db
+
+DEFAULT_STORE = 'housing.db'
+DEFAULT_BATCH_SIZE = 500_000
+DEFAULT_POOL_SIZE = 4
+
+STORE_COLUMNS = ['property_id', 'city', 'property_type', 'bedrooms', 'bathrooms', 'car_spaces', 'land_size',
+                 'building_size', 'year_built', 'distance_cbd', 'price', 'price_per_sqm', 'age']
+
+STORE_DDL = """CREATE TABLE properties (
+    property_id INTEGER PRIMARY KEY,
+    city TEXT NOT NULL,
+    property_type TEXT NOT NULL,
+    bedrooms INTEGER,
+    bathrooms INTEGER,
+    car_spaces INTEGER,
+    land_size REAL,
+    building_size REAL,
+    year_built INTEGER,
+    distance_cbd REAL,
+    price REAL,
+    price_per_sqm REAL,
+    age INTEGER
+)"""
+
+STORE_INDEXES = [
+    # Sidebar filters in widget order plus distance_cbd, so the scatter points and the
+    # table page's rowids come from the index alone (rowid is in every entry too)
+    "CREATE INDEX idx_properties_filters ON properties (city, property_type, bedrooms, price, distance_cbd)",
+    # Price-ordered access for the partial price buckets and the top-by-price table
+    "CREATE INDEX idx_properties_price ON properties (price)",
+]
+
+# One row per (city, property_type) over the whole table: the "vs all" baselines and
+# the sidebar options/ranges, so the first page load reads a few dozen rows
+SUMMARY_TABLE = 'property_summary'
+
+# (cell column, per-row value, aggregate); CubeSelection fields in the order _selection reads them
+_CELL_FIELDS = ([('n', '1', 'SUM')]
+                + [(f'sum_{m}', m, 'SUM') for m in CUBE_MEASURES]
+                + [(f'sumsq_{m}', f'{m} * {m}', 'SUM') for m in CUBE_MEASURES]
+                + [(f'{agg.lower()}_{column}', column, agg)
+                   for column in ('price', 'distance_cbd', 'bedrooms') for agg in ('MIN', 'MAX')])
+_GRID_FIELDS = [('n', '1', 'SUM'), ('sum_bedrooms', 'bedrooms', 'SUM')]
+
+
+def filter_sql(cities, property_types, bedroom_range, price_range=None):
+    """WHERE clause and parameters for the sidebar filters; values are always ? parameters.
+
+    With price_range None the clause leaves price unfiltered.
+    """
+    cities, property_types = list(cities), list(property_types)
+    if not cities or not property_types:
+        return '0', []
+    clauses = [
+        f"city IN ({', '.join('?' * len(cities))})",
+        f"property_type IN ({', '.join('?' * len(property_types))})",
+        'bedrooms BETWEEN ? AND ?',
+    ]
+    params = cities + property_types + [int(b) for b in bedroom_range]
+    if price_range is not None:
+        clauses.append('price BETWEEN ? AND ?')
+        params += [float(p) for p in price_range]
+    return ' AND '.join(clauses), params
+
+
+def _floor_sql(column, width):
+    """SQL floor(column / width); CAST truncates towards zero and a few prices are negative"""
+    return f'(CAST({column} / {width} AS INTEGER) - ({column} < CAST({column} / {width} AS INTEGER) * {width}))'
+
+
+class CellTable:
+    """Pre-aggregated cells like housing_cube.HousingCube, stored as a SQLite table.
+
+    Cells are keyed by (city, property_type, bedrooms, price bucket, any extra buckets)
+    and hold the aggregates in fields. Price buckets are whole multiples of price_width
+    ($1,000 is the price slider's resolution, so slider values sit on bucket edges).
+    """
+
+    def __init__(self, name, price_width, fields, buckets=()):
+        self.name = name
+        self.fields = fields
+        # (cell column, row column, bucket width)
+        self.buckets = [('price_bucket', 'price', price_width)] + list(buckets)
+        self.price_width = price_width
+        self.keys = ['city', 'property_type', 'bedrooms'] + [bucket for bucket, _, _ in self.buckets]
+        self.aggregates = ', '.join(f'{agg}({field}) AS {field}' for field, _, agg in fields)
+
+    def create_sql(self):
+        """DDL building the cells from properties, plus the index the filters search"""
+        buckets = ', '.join(f'{_floor_sql(column, width)} AS {bucket}' for bucket, column, width in self.buckets)
+        aggregates = ', '.join(f'{agg}({value}) AS {field}' for field, value, agg in self.fields)
+        keys = ', '.join(self.keys)
+        return [
+            f"CREATE TABLE {self.name} AS SELECT city, property_type, bedrooms, {buckets}, {aggregates} "
+            f"FROM properties GROUP BY {keys}",
+            f"CREATE INDEX idx_{self.name}_keys ON {self.name} ({keys})",
+        ]
+
+    def rows_sql(self, filters):
+        """SELECT of cell-shaped rows (keys, fields) covering a filter state.
+
+        Whole price buckets inside the range come from the cells. Rows in the partial
+        buckets at either end are read from properties through the price index and
+        projected into the same columns, so aggregating the union matches the row-level filter.
+        """
+        cities, property_types, bedroom_range, (low, high) = filters
+        where, params = filter_sql(cities, property_types, bedroom_range)
+        first = math.ceil(low / self.price_width)        # first bucket starting at or above low
+        last = math.floor(high / self.price_width) - 1   # last bucket ending at or below high
+        if first <= last:
+            lower_stop, upper_start = first * self.price_width, (last + 1) * self.price_width
+        else:
+            first, last = 1, 0
+            lower_stop = upper_start = low
+        values = ', '.join([f'{_floor_sql(column, width)} AS {bucket}' for bucket, column, width in self.buckets]
+                           + [f'{value} AS {field}' for field, value, _ in self.fields])
+        rows = (f"SELECT city, property_type, bedrooms, {values} FROM properties INDEXED BY idx_properties_price "
+                f"WHERE {where} AND price >= ? AND price")
+        sql = (f"SELECT {', '.join(self.keys + [field for field, _, _ in self.fields])} FROM {self.name} "
+               f"WHERE {where} AND price_bucket BETWEEN ? AND ? "
+               f"UNION ALL {rows} < ? UNION ALL {rows} <= ?")
+        return sql, (params + [first, last]
+                     + params + [float(low), float(lower_stop)]
+                     + params + [float(upper_start), float(high)])
+
+
+# Metrics, city/type charts and the price histogram
+CELLS = CellTable('property_cells', 1000, _CELL_FIELDS)
+# Price vs distance density grid: coarser price buckets so the extra distance key
+# keeps the table a few hundred thousand rows at 10M properties
+GRID_DISTANCE_WIDTH = 2
+GRID = CellTable('property_grid', 10_000, _GRID_FIELDS, [('distance_bucket', 'distance_cbd', GRID_DISTANCE_WIDTH)])
+
+
+def _snapped_bins(extent, bucket_width, bins):
+    """(first bucket, buckets per bin, edges) for at most bins equal bins over extent on the bucket grid"""
+    first = math.floor(extent[0] / bucket_width)
+    n_buckets = math.floor(extent[1] / bucket_width) + 1 - first
+    per_bin = -(-n_buckets // bins)
+    n_bins = -(-n_buckets // per_bin)
+    return first, per_bin, bucket_width * (first + per_bin * np.arange(n_bins + 1.0))
+
+
+def _order_sql(order_by, ascending):
+    """ORDER BY terms for a store column (column names cannot be ? parameters, so they are checked)"""
+    if order_by not in STORE_COLUMNS:
+        raise ValueError(f"cannot sort by {order_by!r}; expected one of {STORE_COLUMNS}")
+    direction = 'ASC' if ascending else 'DESC'
+    # ties by property_id in the same direction, so price order still walks the price index
+    return f"{order_by} {direction}, property_id {direction}"
+
+
+def _edges(low, high, bins):
+    if low == high:
+        # np.histogram's convention for a single distinct value
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def generate_batches(n_properties, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE):
+    """The store's rows as generate_housing_data frames of at most batch_size rows (batch i uses seed + i)"""
+    for batch, first in enumerate(range(0, n_properties, batch_size)):
+        frame = generate_housing_data(min(batch_size, n_properties - first), seed=seed + batch)
+        frame['property_id'] += first
+        yield frame
+
+
+def build_store(path=DEFAULT_STORE, n_properties=1_000_000, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE):
+    """Generate n_properties rows into a new SQLite store at path; returns seconds taken.
+
+    Rows come from generate_batches, so memory stays flat; a store no larger than one
+    batch holds exactly generate_housing_data(n, seed).
+    """
+    start = time.perf_counter()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute(STORE_DDL)
+    insert = f"INSERT INTO properties VALUES ({', '.join('?' * len(STORE_COLUMNS))})"
+    for frame in generate_batches(n_properties, seed, batch_size):
+        columns = [frame[column].tolist() for column in STORE_COLUMNS]
+        with connection:
+            connection.executemany(insert, zip(*columns))
+    with connection:
+        for ddl in STORE_INDEXES:
+            connection.execute(ddl)
+        for ddl in CELLS.create_sql() + GRID.create_sql():
+            connection.execute(ddl)
+        connection.execute(f"""CREATE TABLE {SUMMARY_TABLE} AS
+            SELECT city, property_type, {CELLS.aggregates} FROM {CELLS.name} GROUP BY city, property_type""")
+    connection.execute("ANALYZE")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.close()
+    return time.perf_counter() - start
+
+
+class HousingStore:
+    """Pooled read-only connections to a housing store plus the dashboard's queries"""
+
+    def __init__(self, path=DEFAULT_STORE, pool_size=DEFAULT_POOL_SIZE, timeout=30):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; build it with: python housing_store.py --path {path}")
+        self.path = os.path.abspath(path)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.modified = os.path.getmtime(self.path)
+        self._load_summary()
+
+    def refresh(self):
+        """Reopen the pool and reload the summary if the file was rebuilt (new mtime)"""
+        modified = os.path.getmtime(self.path)
+        with self._lock:
+            if modified == self.modified:
+                return False
+            self.modified = modified
+            stale, self._idle, self._connections = self._idle, queue.LifoQueue(), []
+        # idle connections close now; borrowed ones close when they are handed back
+        while True:
+            try:
+                stale.get_nowait().close()
+            except queue.Empty:
+                break
+        self._load_summary()
+        return True
+
+    @contextmanager
+    def connection(self):
+        """Borrow a read-only connection (mode=ro URI; WAL lets sessions read concurrently)"""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = None
+            with self._lock:
+                if len(self._connections) < self.pool_size:
+                    connection = sqlite3.connect(f'file:{quote(self.path)}?mode=ro', uri=True,
+                                                 check_same_thread=False, timeout=self.timeout)
+                    self._connections.append(connection)
+            if connection is None:
+                try:
+                    connection = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"no free connection to {self.path} after {self.timeout}s") from None
+        try:
+            yield connection
+        finally:
+            with self._lock:
+                current = any(connection is pooled for pooled in self._connections)
+            if current:
+                self._idle.put(connection)
+            else:
+                connection.close()
+
+    def _rows(self, sql, params=()):
+        with self.connection() as connection:
+            return connection.execute(sql, params).fetchall()
+
+    def _selection(self, rows):
+        """CubeSelection and (price, distance, bedroom) extents from (city, property_type, _CELL_FIELDS) rows"""
+        n = len(CUBE_MEASURES)
+        count = np.zeros((len(self.cities), len(self.property_types)))
+        sums = np.zeros(count.shape + (n,))
+        sumsq = np.zeros_like(sums)
+        extent = {}
+        for row in rows:
+            i, j = self.cities.index(row[0]), self.property_types.index(row[1])
+            count[i, j] = row[2]
+            sums[i, j] = row[3:3 + n]
+            sumsq[i, j] = row[3 + n:3 + 2 * n]
+            for name, low, high in zip(('price', 'distance_cbd', 'bedrooms'), row[3 + 2 * n::2], row[4 + 2 * n::2]):
+                previous = extent.get(name, (low, high))
+                extent[name] = (min(previous[0], low), max(previous[1], high))
+        return CubeSelection(self.cities, self.property_types, count, sums, sumsq), extent
+
+    def _load_summary(self):
+        rows = self._rows(f"SELECT * FROM {SUMMARY_TABLE}")
+        present_cities = {row[0] for row in rows}
+        present_types = {row[1] for row in rows}
+        # the generator's category order, like the in-memory categoricals
+        self.cities = [c for c in CITIES if c in present_cities] + sorted(present_cities - set(CITIES))
+        self.property_types = ([t for t in PROPERTY_TYPES if t in present_types]
+                               + sorted(present_types - set(PROPERTY_TYPES)))
+        self.overall, self.extent = self._selection(rows)
+        self.n_rows = self.overall.total_count()
+
+    def selection(self, filters):
+        """(CubeSelection, extents) for a filter state (cities, property_types, bedroom_range, price_range)"""
+        sql, params = CELLS.rows_sql(filters)
+        return self._selection(self._rows(
+            f"SELECT city, property_type, {CELLS.aggregates} FROM ({sql}) GROUP BY city, property_type", params))
+
+    def price_histogram(self, filters, price_extent, bins=30):
+        """(counts, edges) of the filtered prices in at most bins equal-width bins over price_extent.
+
+        Edges are snapped to whole price buckets so the counts are summed from the cells;
+        apart from that it is np.histogram(price, edges).
+        """
+        if price_extent is None:
+            return np.zeros(bins, dtype=np.int64), _edges(0.0, 1.0, bins)
+        first, per_bin, edges = _snapped_bins(price_extent, CELLS.price_width, bins)
+        sql, params = CELLS.rows_sql(filters)
+        rows = np.array(self._rows(f"SELECT price_bucket, SUM(n) FROM ({sql}) GROUP BY price_bucket", params),
+                        dtype=np.int64).reshape(-1, 2)
+        counts = np.bincount((rows[:, 0] - first) // per_bin, weights=rows[:, 1], minlength=len(edges) - 1)
+        return counts.astype(np.int64), edges
+
+    def density_grid(self, filters, distance_extent, price_extent, bins=60):
+        """(counts, mean bedrooms, x_edges, y_edges) like scatter_density.density_grid over distance/price.
+
+        Summed from the GRID cells, so the edges are snapped to its buckets and each axis
+        has at most bins bins.
+        """
+        if distance_extent is None or price_extent is None:
+            return (np.zeros((bins, bins)), np.full((bins, bins), np.nan),
+                    _edges(0.0, 1.0, bins), _edges(0.0, 1.0, bins))
+        x_first, x_per_bin, x_edges = _snapped_bins(distance_extent, GRID_DISTANCE_WIDTH, bins)
+        y_first, y_per_bin, y_edges = _snapped_bins(price_extent, GRID.price_width, bins)
+        shape = (len(x_edges) - 1, len(y_edges) - 1)
+        sql, params = GRID.rows_sql(filters)
+        rows = np.array(self._rows(
+            f"SELECT distance_bucket, price_bucket, SUM(n), SUM(sum_bedrooms) FROM ({sql}) "
+            f"GROUP BY distance_bucket, price_bucket", params), dtype=np.int64).reshape(-1, 4)
+        cell = np.ravel_multi_index(((rows[:, 0] - x_first) // x_per_bin, (rows[:, 1] - y_first) // y_per_bin), shape)
+        counts = np.bincount(cell, weights=rows[:, 2], minlength=shape[0] * shape[1]).reshape(shape)
+        totals = np.bincount(cell, weights=rows[:, 3], minlength=shape[0] * shape[1]).reshape(shape)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_bedrooms = totals / counts
+        return counts, mean_bedrooms, x_edges, y_edges
+
+    def points(self, filters, limit, matches=None):
+        """distance_cbd, price, bedrooms of up to limit filtered rows, for a plain scatter.
+
+        When more than limit rows match (matches, e.g. from selection()), every step-th
+        rowid is taken rather than the first rows the filter index returns, which come
+        city by city; rows are generated in random order, so the stride is an even sample.
+        """
+        where, params = filter_sql(*filters)
+        step = max(1, -(-int(matches) // int(limit))) if matches else 1
+        rows = self._rows(f"SELECT distance_cbd, price, bedrooms FROM properties WHERE {where} "
+                          f"AND rowid % ? = 0 LIMIT ?", params + [step, int(limit)])
+        return pd.DataFrame.from_records(rows, columns=['distance_cbd', 'price', 'bedrooms'])
+
+    def page(self, filters, page=0, page_size=PAGE_SIZE, columns=DISPLAY_COLUMNS,
+             order_by='price', ascending=False):
+        """One page (0-based) of the filtered rows sorted by order_by (most expensive first by default).
+
+        The inner query finds the page's rowids, from the covering filter index for the
+        default price order; only those page_size rows are then read from the table.
+        """
+        where, params = filter_sql(*filters)
+        order = _order_sql(order_by, ascending)
+        rows = self._rows(
+            f"SELECT {', '.join(columns)} FROM properties WHERE property_id IN "
+            f"(SELECT property_id FROM properties WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?) "
+            f"ORDER BY {order}",
+            params + [int(page_size), int(page) * int(page_size)])
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def iter_chunks(self, filters, columns=DISPLAY_COLUMNS, order_by='price', ascending=False,
+                    chunk_size=EXPORT_CHUNK_SIZE):
+        """Every filtered row as DataFrames of at most chunk_size rows, read with fetchmany.
+
+        Only an empty selection yields an empty frame (one, like frame_chunks).
+        """
+        where, params = filter_sql(*filters)
+        with self.connection() as connection:
+            cursor = connection.execute(
+                f"SELECT {', '.join(columns)} FROM properties WHERE {where} ORDER BY {_order_sql(order_by, ascending)}",
+                params)
+            first = True
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows and not first:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns)
+                if len(rows) < chunk_size:
+                    break
+                first = False
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the housing dashboard SQLite store')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--path', default=DEFAULT_STORE)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    seconds = build_store(args.path, args.rows, args.seed, args.batch_size)
+    print(f"Built {args.path}: {args.rows:,} properties in {seconds:.1f}s "
+          f"({os.path.getsize(args.path) / 2**20:,.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import io
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Paged "Show Raw Data" table for the housing dashboard.
+# Only the requested page is sliced out of the filtered rows and scaled for display;
+# the units ($M, sqm, km, years) are number formats on the table's columns instead of
+# strings built per row, so a rerun costs O(page size) however many rows match.
+# Sorting is one argsort per (selection, column, direction), which the app caches.
+# Downloads are written chunk by chunk, so a large export never holds a formatted
+# copy of every row at once.
+
+PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 100_000
+
+DISPLAY_COLUMNS = ['city', 'property_type', 'bedrooms', 'bathrooms', 'price', 'building_size', 'distance_cbd', 'age']
+
+# column -> (printf-style number format, divisor applied to the page before display)
+COLUMN_FORMATS = {
+    'price': ('$%.2fM', 1e6),
+    'building_size': ('%.0f sqm', 1),
+    'distance_cbd': ('%.1f km', 1),
+    'age': ('%d years', 1),
+}
+
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def sort_order(values, ascending=True):
+    """Row positions that sort values (stable; categoricals by category order, missing values last)"""
+    if hasattr(values, 'cat'):
+        keys = values.cat.codes.to_numpy().astype(np.float64)
+        keys[keys < 0] = np.nan
+    else:
+        keys = values.to_numpy(dtype=np.float64)
+    return np.argsort(keys if ascending else -keys, kind='stable')
+
+
+def page_count(n_rows, page_size=PAGE_SIZE):
+    return max(1, -(-n_rows // page_size))
+
+
+def page_rows(frame, page, page_size=PAGE_SIZE, order=None, columns=DISPLAY_COLUMNS):
+    """Rows of one page (0-based) of frame, in order if given, with only the display columns"""
+    start = page * page_size
+    positions = np.arange(start, min(start + page_size, len(frame))) if order is None else order[start:start + page_size]
+    return frame.iloc[positions][columns]
+
+
+def scale_page(page):
+    """Copy of a page with each COLUMN_FORMATS column divided into its display unit"""
+    page = page.copy()
+    for column, (_, divisor) in COLUMN_FORMATS.items():
+        if column in page and divisor != 1:
+            page[column] = page[column] / divisor
+    return page
+
+
+def frame_chunks(frame, order=None, chunk_size=EXPORT_CHUNK_SIZE, columns=DISPLAY_COLUMNS):
+    """frame's display columns as DataFrames of at most chunk_size rows, in order if given"""
+    for page in range(page_count(len(frame), chunk_size)):
+        yield page_rows(frame, page, chunk_size, order, columns)
+
+
+def _non_empty(chunks):
+    """chunks without the empty ones; the first empty one if there is nothing else"""
+    empty = None
+    written = False
+    for chunk in chunks:
+        if len(chunk):
+            written = True
+            yield chunk
+        elif empty is None:
+            empty = chunk
+    if not written and empty is not None:
+        yield empty
+
+
+def export_bytes(chunks, export_format):
+    """CSV or Parquet file contents written from an iterable of DataFrame chunks.
+
+    CSV writes the header once and appends each chunk; Parquet writes one row group
+    per chunk. Empty chunks are skipped (an empty frame's columns have no types for
+    the Parquet schema), unless every chunk is empty.
+    """
+    buffer = io.BytesIO()
+    chunks = _non_empty(chunks)
+    if export_format == 'CSV':
+        for i, chunk in enumerate(chunks):
+            buffer.write(chunk.to_csv(index=False, header=i == 0).encode())
+    elif export_format == 'Parquet':
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(buffer, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        raise ValueError(f"unknown export format {export_format!r}; expected one of {list(EXPORT_FORMATS)}")
+    return buffer.getvalue()
@@ -0,0 +1,212 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import pyinstrument
+except ImportError:  # optional: cProfile is always available
+    pyinstrument = None
+
+# Per-rerun timing for the Streamlit apps.
+#
+#   profiler = RerunProfiler('app_04')          first thing in the script, once per rerun
+#   with profiler.section('filter'): ...        wall time of a block (repeated names add up)
+#   @profiler.timed('load')                     the same for a function
+#   @profiler.cache_data(max_entries=64)        st.cache_data that also counts hits/misses
+#   profiler.finish()                           last line: log the rerun, draw the debug panel
+#
+# Each rerun appends one JSON line (sections, cache hits/misses, RSS before/after) to
+# RERUN_LOG (default rerun_timing.jsonl) and shows the same numbers in a collapsed
+# sidebar expander, with the session's recent rerun times. The panel can also capture
+# a cProfile (or pyinstrument, when installed) profile of the next rerun only.
+
+DEFAULT_LOG = os.environ.get('RERUN_LOG', 'rerun_timing.jsonl')
+HISTORY_LENGTH = 50
+PROFILE_LINES = 40
+PROFILERS = ['cProfile'] + (['pyinstrument'] if pyinstrument is not None else [])
+
+_log_lock = threading.Lock()
+
+
+def rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+        except ImportError:
+            return float('nan')
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+class RerunProfiler:
+    """Section timings, cache hits/misses and RSS for one rerun of a Streamlit script"""
+
+    def __init__(self, app, log_path=DEFAULT_LOG):
+        self.app = app
+        self.log_path = log_path
+        # survives reruns: counters, recent totals and the profiling request
+        self.state = st.session_state.setdefault(f'_rerun_profiler_{app}', {
+            'reruns': 0, 'history': [], 'cache_totals': {},
+            'profile_next': False, 'profiler': PROFILERS[0], 'profile_text': None,
+        })
+        self.state['reruns'] += 1
+        self.sections = {}
+        self.cache = {}
+        self.rss_start = rss_mb()
+        self._profile = None
+        if self.state['profile_next']:
+            self.state['profile_next'] = False
+            if self.state['profiler'] == 'pyinstrument':
+                self._profile = pyinstrument.Profiler()
+                self._profile.start()
+            else:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - start
+
+    def timed(self, name=None):
+        """Decorator timing every call of a function as section name (default: its name)"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.section(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _count(self, name, outcome):
+        self.cache.setdefault(name, Counter())[outcome] += 1
+        totals = self.state['cache_totals'].setdefault(name, {'hits': 0, 'misses': 0})
+        totals[outcome] += 1
+
+    def cache_data(self, func=None, **cache_kwargs):
+        """st.cache_data (same arguments, with or without parentheses) counting hits and misses.
+
+        The function body only runs on a miss, so a call that did not run it was a hit.
+        functools.wraps keeps the original name, source and parameters, which is what
+        Streamlit hashes (including skipping _underscore arguments).
+        """
+        def decorate(func):
+            name = func.__name__
+
+            @functools.wraps(func)
+            def compute(*args, **kwargs):
+                self._count(name, 'misses')
+                return func(*args, **kwargs)
+
+            cached = st.cache_data(**cache_kwargs)(compute)
+
+            @functools.wraps(func)
+            def lookup(*args, **kwargs):
+                misses = self.cache.get(name, Counter())['misses']
+                result = cached(*args, **kwargs)
+                if self.cache.get(name, Counter())['misses'] == misses:
+                    self._count(name, 'hits')
+                return result
+
+            lookup.clear = cached.clear
+            return lookup
+
+        return decorate(func) if func is not None else decorate
+
+    def cache_totals(self, name):
+        """{'hits', 'misses'} of a cache_data function over this session so far"""
+        return dict(self.state['cache_totals'].get(name, {'hits': 0, 'misses': 0}))
+
+    def _stop_profile(self):
+        if self._profile is None:
+            return None
+        if isinstance(self._profile, cProfile.Profile):
+            self._profile.disable()
+            output = io.StringIO()
+            pstats.Stats(self._profile, stream=output).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            return output.getvalue()
+        self._profile.stop()
+        return self._profile.output_text(unicode=True)
+
+    def finish(self, panel=True):
+        """Log this rerun (one JSON line), then draw the debug panel in the sidebar; returns the record"""
+        total = time.perf_counter() - self.started
+        profile_text = self._stop_profile()
+        if profile_text is not None:
+            self.state['profile_text'] = profile_text
+        record = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'app': self.app,
+            'rerun': self.state['reruns'],
+            'total_ms': round(total * 1000, 2),
+            'sections_ms': {name: round(seconds * 1000, 2) for name, seconds in self.sections.items()},
+            'cache': {name: dict(counts) for name, counts in self.cache.items()},
+            'rss_mb_start': round(self.rss_start, 1),
+            'rss_mb_end': round(rss_mb(), 1),
+            'profiled': profile_text is not None,
+        }
+        self.state['history'] = (self.state['history'] + [record['total_ms']])[-HISTORY_LENGTH:]
+        if self.log_path:
+            with _log_lock, open(self.log_path, 'a') as log:
+                log.write(json.dumps(record) + '\n')
+        if panel:
+            self._panel(record)
+        return record
+
+    def _panel(self, record):
+        with st.sidebar.expander("🐞 Rerun timing"):
+            st.metric("Last rerun", f"{record['total_ms']:,.0f} ms", f"rerun #{record['rerun']} this session",
+                      delta_color="off")
+
+            sections = pd.Series(record['sections_ms'], dtype=float)
+            sections['(not in a section)'] = max(record['total_ms'] - sections.sum(), 0.0)
+            st.dataframe(pd.DataFrame({'ms': sections.round(1),
+                                       'share': (sections / max(record['total_ms'], 1e-9)).map('{:.0%}'.format)}),
+                         use_container_width=True)
+
+            if self.state['cache_totals']:
+                rows = []
+                for name, totals in self.state['cache_totals'].items():
+                    counts = record['cache'].get(name, {})
+                    rows.append((name, counts.get('hits', 0), counts.get('misses', 0),
+                                 totals['hits'], totals['misses']))
+                st.dataframe(pd.DataFrame(rows, columns=['function', 'hits', 'misses', 'session hits',
+                                                         'session misses']).set_index('function'),
+                             use_container_width=True)
+
+            st.caption(f"RSS {record['rss_mb_start']:,.0f} → {record['rss_mb_end']:,.0f} MB · "
+                       f"log: {os.path.abspath(self.log_path) if self.log_path else 'off'}")
+            if len(self.state['history']) > 1:
+                st.line_chart(pd.DataFrame({'rerun ms': self.state['history']}), height=120)
+
+            self.state['profiler'] = st.radio("Profiler", PROFILERS, horizontal=True,
+                                              index=PROFILERS.index(self.state['profiler']),
+                                              key=f'_rerun_profiler_{self.app}_choice')
+
+            def request_profile():
+                self.state['profile_next'] = True
+
+            # The click's own rerun is the one profiled (callbacks run before the script)
+            st.button("Profile a rerun", on_click=request_profile, key=f'_rerun_profiler_{self.app}_button')
+            if self.state['profile_text']:
+                st.code(self.state['profile_text'], language=None)
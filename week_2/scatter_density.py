@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+# Helpers for plotting "Price vs Distance from CBD" when there are too many points
+# for a plain scatter: a 2D-histogram density grid or a stratified sample.
+
+SCATTER_MODES = ['Auto', 'Scatter', 'Density', 'Stratified sample']
+
+# Above this many filtered points, Auto switches from a plain scatter to Density
+DEFAULT_POINT_THRESHOLD = 20_000
+
+
+def choose_scatter_mode(requested_mode, n_points, point_threshold=DEFAULT_POINT_THRESHOLD):
+    """Resolve 'Auto' to a concrete mode for n_points"""
+    if requested_mode != 'Auto':
+        return requested_mode
+    return 'Scatter' if n_points <= point_threshold else 'Density'
+
+
+def density_grid(x, y, colour_values, bins=60):
+    """np.histogram2d counts plus the mean of colour_values per cell (NaN for empty cells)"""
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    totals, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges], weights=colour_values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_colour = totals / counts
+    return counts, mean_colour, x_edges, y_edges
+
+
+def density_cells(counts, mean_colour, x_edges, y_edges):
+    """Non-empty grid cells as a long DataFrame (for Vega-Lite rect charts)"""
+    x_idx, y_idx = np.nonzero(counts)
+    return pd.DataFrame({
+        'x_start': x_edges[x_idx], 'x_end': x_edges[x_idx + 1],
+        'y_start': y_edges[y_idx], 'y_end': y_edges[y_idx + 1],
+        'count': counts[x_idx, y_idx].astype(int),
+        'mean_colour': mean_colour[x_idx, y_idx],
+    })
+
+
+def stratified_sample(groups, max_points, seed=0):
+    """Sorted row positions: up to max_points rows, split across groups in proportion to their size.
+
+    Every group keeps at least min(size, max_points // (2 * n_groups)) rows so rare
+    classes (e.g. 5-bedroom homes) stay visible in the sample.
+    """
+    groups = np.asarray(groups)
+    if len(groups) <= max_points:
+        return np.arange(len(groups))
+
+    rng = np.random.default_rng(seed)
+    labels, inverse, sizes = np.unique(groups, return_inverse=True, return_counts=True)
+    floor = max_points // (2 * len(labels))
+    quota = np.maximum(np.minimum(sizes, floor), np.floor(sizes / sizes.sum() * max_points).astype(int))
+    quota = np.minimum(quota, sizes)
+
+    # Random priority within each group; keep the rows ranked below the group's quota
+    order = np.lexsort((rng.random(len(groups)), inverse))
+    group_starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.empty(len(groups), dtype=np.int64)
+    rank[order] = np.arange(len(groups)) - np.repeat(group_starts, sizes)
+    return np.flatnonzero(rank < quota[inverse])
@@ -0,0 +1,133 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from cdc_pipeline import install_triggers, start_consumer
+
+# Simulated order stream against copies of oltp_retail.db / olap_retail.db with the CDC
+# consumer running alongside. Reports producer rate, consumer throughput and
+# OLTP-commit -> warehouse-commit lag, then checks the new facts against the OLTP rows.
+# Usage: python bench_cdc_pipeline.py --orders-per-second 1000 5000 --seconds 10
+
+
+def copy_database(source_path, target_path):
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def produce_orders(database, orders_per_second, seconds, tick=0.01, completed_share=0.8,
+                   complete_pending_share=0.1, seed=42):
+    """Insert orders (1-5 items each) every tick for seconds; some earlier Pending orders get Completed.
+
+    Returns the number of orders written.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(database, timeout=30)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    n_customers = connection.execute("SELECT MAX(customer_id) FROM customers").fetchone()[0]
+    n_stores = connection.execute("SELECT MAX(store_id) FROM stores").fetchone()[0]
+    prices = dict(connection.execute("SELECT product_id, unit_price FROM products"))
+    product_ids = list(prices)
+    next_order = connection.execute("SELECT MAX(order_id) FROM orders").fetchone()[0] + 1
+    pending = []
+
+    per_tick = orders_per_second * tick
+    owed = 0.0
+    written = 0
+    start = time.perf_counter()
+    next_tick = start
+    while time.perf_counter() - start < seconds:
+        owed += per_tick
+        n = int(owed)
+        owed -= n
+        orders, items = [], []
+        for order_id in range(next_order, next_order + n):
+            status = 'Completed' if rng.random() < completed_share else 'Pending'
+            if status == 'Pending':
+                pending.append(order_id)
+            orders.append((order_id, rng.randint(1, n_customers), rng.randint(1, n_stores),
+                           time.strftime('%Y-%m-%d %H:%M:%S'), None, status))
+            for _ in range(rng.randint(1, 5)):
+                product_id = rng.choice(product_ids)
+                items.append((order_id, product_id, rng.randint(1, 4), prices[product_id],
+                              rng.choice([0, 0.05, 0.10, 0.15])))
+        next_order += n
+        completed = [(order_id,) for order_id in pending[:int(len(pending) * complete_pending_share)]]
+        del pending[:len(completed)]
+
+        with connection:
+            connection.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)", orders)
+            connection.executemany("INSERT INTO order_items (order_id, product_id, quantity, unit_price, discount) "
+                                   "VALUES (?, ?, ?, ?, ?)", items)
+            connection.executemany("UPDATE orders SET status = 'Completed' WHERE order_id = ?", completed)
+        written += n
+
+        next_tick += tick
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    connection.close()
+    return written
+
+
+def check_facts(oltp_database, olap_database, first_order):
+    """(expected, actual) fact rows for orders created during the run"""
+    oltp = sqlite3.connect(oltp_database)
+    expected = oltp.execute("""
+        SELECT COUNT(*) FROM order_items oi JOIN orders o ON oi.order_id = o.order_id
+        WHERE o.order_id >= ? AND o.status = 'Completed'
+    """, (first_order,)).fetchone()[0]
+    oltp.close()
+    olap = sqlite3.connect(olap_database)
+    actual = olap.execute("SELECT COUNT(*) FROM fact_sales WHERE order_id >= ?", (first_order,)).fetchone()[0]
+    olap.close()
+    return expected, actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OLTP -> OLAP CDC benchmark')
+    parser.add_argument('--orders-per-second', type=int, nargs='+', default=[1000, 2000, 5000])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'target/s':>9} {'orders/s':>9} {'changes':>9} {'changes/s':>10} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'max ms':>8}  facts (expected/actual)")
+    for rate in args.orders_per_second:
+        with tempfile.TemporaryDirectory() as directory:
+            oltp_database = os.path.join(directory, 'oltp_retail.db')
+            olap_database = os.path.join(directory, 'olap_retail.db')
+            copy_database(os.path.join(here, 'oltp_retail.db'), oltp_database)
+            copy_database(os.path.join(here, 'olap_retail.db'), olap_database)
+
+            oltp = sqlite3.connect(oltp_database)
+            install_triggers(oltp)
+            first_order = oltp.execute("SELECT MAX(order_id) FROM orders").fetchone()[0] + 1
+            oltp.close()
+
+            consumer, stop_event, thread = start_consumer(oltp_database, olap_database,
+                                                          batch_size=args.batch_size,
+                                                          poll_interval=args.poll_interval)
+            start = time.perf_counter()
+            written = produce_orders(oltp_database, rate, args.seconds)
+            produced_rate = written / (time.perf_counter() - start)
+            stop_event.set()
+            thread.join()
+            consumer.close()
+
+            metrics = consumer.metrics
+            lag = metrics.lag_summary()
+            expected, actual = check_facts(oltp_database, olap_database, first_order)
+            print(f"{rate:>9,} {produced_rate:>9,.0f} {metrics.changes:>9,} {metrics.changes_per_second:>10,.0f} "
+                  f"{lag['p50_ms']:>8.0f} {lag['p95_ms']:>8.0f} {lag['max_ms']:>8.0f}  {expected:,}/{actual:,}")
+
+
+if __name__ == '__main__':
+    main()
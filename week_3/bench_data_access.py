@@ -0,0 +1,124 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from bench_olap_engine import QUERIES
+from data_access import ConnectionPool, table_metadata
+
+# The notebook access pattern (sqlite3.connect + pd.read_sql per query, COUNT(*) and
+# PRAGMA table_info per table) vs data_access on a copy of olap_retail.db:
+#   - metadata for every table: per-table helper queries vs table_metadata(),
+#   - --threads concurrent readers running a short parameterised dashboard query, with a
+#     writer updating fact rows the whole time: connect-per-query on the default rollback
+#     journal vs a WAL ConnectionPool.
+# Usage: python bench_data_access.py --threads 1 4 8 --seconds 5
+
+
+def old_table_info(connection):
+    """show_table_info / list_all_tables from the notebooks, for every table"""
+    tables = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table'", connection)['name'].tolist()
+    for table_name in tables:
+        pd.read_sql(f"SELECT COUNT(*) as count FROM {table_name}", connection).iloc[0, 0]
+        pd.read_sql(f"PRAGMA table_info({table_name})", connection)
+
+
+def run_readers(query, threads, seconds, write_database):
+    """(queries/s, p95 latency ms, reader errors) with a writer updating fact rows alongside"""
+    stop = threading.Event()
+    latencies = [[] for _ in range(threads)]
+    errors = [0] * threads
+
+    def reader(i):
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                query()
+            except sqlite3.OperationalError:
+                errors[i] += 1
+            latencies[i].append(time.perf_counter() - start)
+
+    def writer():
+        # small update transactions, so the table size (and query cost) stays constant
+        connection = sqlite3.connect(write_database, timeout=30)
+        rng = random.Random(42)
+        top = connection.execute("SELECT MAX(sale_key) FROM fact_sales").fetchone()[0]
+        while not stop.is_set():
+            with connection:
+                connection.executemany("UPDATE fact_sales SET quantity = quantity WHERE sale_key = ?",
+                                       [(rng.randint(1, top),) for _ in range(100)])
+            time.sleep(0.005)
+        connection.close()
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)] + [threading.Thread(target=writer)]
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    done = sorted(latency for thread_latencies in latencies for latency in thread_latencies)
+    return len(done) / seconds, done[int(len(done) * 0.95)] * 1000 if done else float('nan'), sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Connection pool / metadata benchmark')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    # region x segment revenue for one quarter: a typical dashboard filter query
+    _, sql, _ = QUERIES['olap_retail.db'][2]
+    sql = sql.replace('BETWEEN 20240101 AND 20240331', 'BETWEEN ? AND ?')
+    params = (20240101, 20240331)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'olap_retail.db')
+        source = sqlite3.connect(os.path.join(here, 'olap_retail.db'))
+        target = sqlite3.connect(database)
+        source.backup(target)
+        source.close()
+
+        repeat = 50
+        start = time.perf_counter()
+        for _ in range(repeat):
+            old_table_info(target)
+        old_seconds = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            table_metadata(target)
+        new_seconds = (time.perf_counter() - start) / repeat
+        target.close()
+        print(f"table metadata: per-table queries {old_seconds * 1000:.2f} ms, "
+              f"table_metadata {new_seconds * 1000:.2f} ms\n")
+
+        print(f"{'threads':>7} {'access':<22} {'queries/s':>10} {'p95 ms':>8} {'errors':>7}")
+        for threads in args.threads:
+            def connect_per_query():
+                connection = sqlite3.connect(database)
+                try:
+                    return pd.read_sql(sql, connection, params=params)
+                finally:
+                    connection.close()
+
+            rate, p95, errors = run_readers(connect_per_query, threads, args.seconds, database)
+            print(f"{threads:>7} {'connect + read_sql':<22} {rate:>10,.0f} {p95:>8.1f} {errors:>7}")
+
+            pool = ConnectionPool(database, size=threads)
+            rate, p95, errors = run_readers(lambda: pool.query(sql, params), threads, args.seconds, database)
+            print(f"{threads:>7} {'pool (WAL, read-only)':<22} {rate:>10,.0f} {p95:>8.1f} {errors:>7}")
+            pool.close()
+            # back to the rollback journal for the next connect-per-query run
+            connection = sqlite3.connect(database)
+            connection.execute("PRAGMA journal_mode = DELETE")
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+
+from csv_loader import tune_connection
+from incremental_aggregates import rebuild, refresh, verify
+
+# Full rebuild vs incremental refresh of agg_daily_sales / agg_customer_ltv on a copy of
+# data_warehouse.db whose fact_sales is grown to --history rows (fresh transaction_ids),
+# then appended to in --delta-row loads. The original .db file is never modified.
+# Usage: python bench_incremental_aggregates.py --history 1000000 10000000 --delta 10000 --loads 3
+
+
+def append_facts(connection, rows):
+    """Append rows copies of existing facts with new transaction_ids above the current maximum"""
+    connection.execute("BEGIN")
+    while rows > 0:
+        offset, count = connection.execute("SELECT MAX(transaction_id), COUNT(*) FROM fact_sales").fetchone()
+        step = min(rows, count)
+        connection.execute("""
+            INSERT INTO fact_sales
+            SELECT transaction_id + ?, customer_id, product_id, transaction_date, quantity,
+                   payment_method, price, total_amount, date_key
+            FROM fact_sales ORDER BY transaction_id LIMIT ?
+        """, (offset, step))
+        rows -= step
+    connection.execute("COMMIT")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental aggregate refresh benchmark')
+    parser.add_argument('--history', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--delta', type=int, default=10_000)
+    parser.add_argument('--loads', type=int, default=3)
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'history':>12} {'load':>5} {'rebuild s':>10} {'refresh s':>10} {'speedup':>8}  verify")
+    for history in args.history:
+        with tempfile.TemporaryDirectory() as directory:
+            source = sqlite3.connect(os.path.join(here, 'data_warehouse.db'))
+            connection = sqlite3.connect(os.path.join(directory, 'data_warehouse.db'), isolation_level=None)
+            source.backup(connection)
+            source.close()
+            tune_connection(connection)
+
+            current = connection.execute("SELECT COUNT(*) FROM fact_sales").fetchone()[0]
+            append_facts(connection, history - current)
+            rebuild(connection)
+
+            for load in range(1, args.loads + 1):
+                append_facts(connection, args.delta)
+                report = refresh(connection)
+                mismatches = verify(connection)
+                # time a full rebuild of the same state for comparison
+                rebuilt = rebuild(connection)
+                status = 'ok' if not any(mismatches.values()) else mismatches
+                print(f"{history:>12,} {load:>5} {rebuilt.seconds:>10.3f} {report.seconds:>10.3f} "
+                      f"{rebuilt.seconds / report.seconds:>7.1f}x  {status}")
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
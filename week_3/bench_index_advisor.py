@@ -0,0 +1,86 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from csv_loader import tune_connection
+from index_advisor import WORKLOADS, build_indexes, explain, full_scans, index_scans
+
+# Before/after timings for the notebook BI queries (index_advisor.WORKLOADS) on a
+# copy of each warehouse whose fact table is scaled up to --rows by re-inserting
+# its own rows. The original .db files are never modified.
+# Usage: python bench_index_advisor.py --rows 10000000 --repeat 3
+
+
+def scale_fact(connection, fact, rows):
+    """Grow fact to rows by repeatedly appending copies of itself (INTEGER PRIMARY KEY gets fresh values)"""
+    info = list(connection.execute(f'PRAGMA table_info("{fact}")'))
+    select = ', '.join('NULL' if column[5] == 1 and column[2].upper() == 'INTEGER' else f'"{column[1]}"'
+                       for column in info)
+    connection.execute("BEGIN")
+    count = connection.execute(f'SELECT COUNT(*) FROM "{fact}"').fetchone()[0]
+    while 0 < count < rows:
+        connection.execute(f'INSERT INTO "{fact}" SELECT {select} FROM "{fact}" LIMIT ?', (rows - count,))
+        count = connection.execute(f'SELECT COUNT(*) FROM "{fact}"').fetchone()[0]
+    connection.execute("COMMIT")
+    return count
+
+
+def time_query(connection, sql, repeat):
+    """Best wall time of repeat full fetches"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        connection.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scan_counts(plan):
+    """'tables/indexes' read in full by a plan, e.g. '2/1'"""
+    return f"{len(full_scans(plan))}/{len(index_scans(plan))}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index advisor before/after benchmark')
+    parser.add_argument('--databases', nargs='+', default=list(WORKLOADS))
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for database in args.databases:
+        workload = WORKLOADS[database]
+        with tempfile.TemporaryDirectory() as directory:
+            source = sqlite3.connect(os.path.join(here, database))
+            connection = sqlite3.connect(os.path.join(directory, database), isolation_level=None)
+            source.backup(connection)
+            source.close()
+            tune_connection(connection)
+
+            start = time.perf_counter()
+            rows = scale_fact(connection, 'fact_sales', args.rows)
+            print(f"# {database}: fact_sales scaled to {rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+            before = {name: (time_query(connection, sql, args.repeat), scan_counts(explain(connection, sql)))
+                      for name, sql in workload.items()}
+
+            start = time.perf_counter()
+            created = build_indexes(connection, workload)
+            print(f"# {database}: {len(created)} indexes + ANALYZE in {time.perf_counter() - start:.1f}s")
+            for recommendation in created:
+                print(f"#   {recommendation.sql}")
+
+            print(f"{'database':<18} {'query':<26} {'before s':>9} {'after s':>9} {'speedup':>8}  table/index scans before -> after")
+            for name, sql in workload.items():
+                before_seconds, before_scans = before[name]
+                after_seconds = time_query(connection, sql, args.repeat)
+                after_scans = scan_counts(explain(connection, sql))
+                print(f"{database:<18} {name:<26} {before_seconds:>9.3f} {after_seconds:>9.3f} "
+                      f"{before_seconds / after_seconds:>7.1f}x  {before_scans} -> {after_scans}")
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
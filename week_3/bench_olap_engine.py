@@ -0,0 +1,132 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_index_advisor import scale_fact
+from csv_loader import tune_connection
+from index_advisor import WORKLOADS
+from olap_engine import OLAPEngine
+
+# SQLite vs OLAPEngine for the notebook BI questions on copies of data_warehouse.db and
+# olap_retail.db whose fact_sales is scaled up to --rows. For every query: SQLite time,
+# engine time on freshly opened column files (result cache empty) and on a cache hit,
+# plus a check that both return the same numbers. The column-file build is timed once.
+# Usage: python bench_olap_engine.py --rows 1000000 10000000 --repeat 3
+
+# (name, SQL, OLAPEngine.query kwargs); both sides return the group columns first
+QUERIES = {
+    'data_warehouse.db': [
+        ('sales_by_day_of_week', """
+            SELECT d.day_name, COUNT(*) AS transactions, SUM(f.total_amount) AS revenue
+            FROM fact_sales f JOIN dim_date d ON f.date_key = d.date_key
+            GROUP BY d.day_name
+        """, dict(by=['day_name'], measures={'transactions': (None, 'count'), 'revenue': ('total_amount', 'sum')})),
+        ('revenue_by_segment_country', """
+            SELECT c.customer_segment, c.country, COUNT(DISTINCT f.customer_id) AS customers,
+                   SUM(f.total_amount) AS revenue
+            FROM fact_sales f JOIN dim_customer c ON f.customer_id = c.customer_id
+            GROUP BY c.customer_segment, c.country
+        """, dict(by=['customer_segment', 'customer.country'],
+                  measures={'customers': ('customer_id', 'nunique'), 'revenue': ('total_amount', 'sum')})),
+        ('monthly_category_revenue', """
+            SELECT f.date_key / 10000 AS year, f.date_key / 100 % 100 AS month, p.category,
+                   SUM(f.total_amount) AS revenue, AVG(f.quantity) AS avg_quantity
+            FROM fact_sales f JOIN dim_product p ON f.product_id = p.product_id
+            GROUP BY 1, 2, 3
+        """, dict(by=['year', 'month', 'category'],
+                  measures={'revenue': ('total_amount', 'sum'), 'avg_quantity': ('quantity', 'mean')})),
+    ],
+    'olap_retail.db': [
+        ('category_revenue_jan_2024', WORKLOADS['olap_retail.db']['category_revenue_jan_2024'],
+         dict(by=['category_name'], where={'year': 2024, 'month': 1},
+              measures={'num_orders': ('order_id', 'nunique'), 'total_quantity': ('quantity', 'sum'),
+                        'total_revenue': ('revenue', 'sum'), 'total_profit': ('profit', 'sum')})),
+        ('quarterly_revenue', """
+            SELECT d.year, d.quarter, SUM(f.revenue) AS revenue, SUM(f.profit) AS profit
+            FROM fact_sales f JOIN dim_date d ON f.date_key = d.date_key
+            GROUP BY d.year, d.quarter
+        """, dict(by=['year', 'quarter'], measures={'revenue': ('revenue', 'sum'), 'profit': ('profit', 'sum')})),
+        ('region_segment_q1_2024', """
+            SELECT s.region, c.customer_segment, SUM(f.revenue) AS revenue, MAX(f.revenue) AS largest_sale
+            FROM fact_sales f
+            JOIN dim_store s ON f.store_key = s.store_key
+            JOIN dim_customer c ON f.customer_key = c.customer_key
+            WHERE f.date_key BETWEEN 20240101 AND 20240331
+            GROUP BY s.region, c.customer_segment
+        """, dict(by=['region', 'customer_segment'], where={'date_key': slice(20240101, 20240331)},
+                  measures={'revenue': ('revenue', 'sum'), 'largest_sale': ('revenue', 'max')})),
+    ],
+}
+
+
+def same_result(sql_result, engine_result, n_keys):
+    """Same groups and numerically equal measures, whatever the row order"""
+    if sql_result.shape != engine_result.shape:
+        return False
+    engine_result = engine_result.set_axis(sql_result.columns, axis=1)
+    keys = list(sql_result.columns[:n_keys])
+    left = sql_result.sort_values(keys).reset_index(drop=True)
+    right = engine_result.sort_values(keys).reset_index(drop=True)
+    return (left[keys].astype(str).equals(right[keys].astype(str))
+            and np.allclose(left.iloc[:, n_keys:].to_numpy(float), right.iloc[:, n_keys:].to_numpy(float), rtol=1e-9))
+
+
+def best_time(function, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite vs OLAPEngine benchmark')
+    parser.add_argument('--databases', nargs='+', default=list(QUERIES))
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'database':<18} {'rows':>11} {'query':<28} {'sqlite s':>9} {'engine s':>9} "
+          f"{'cached ms':>10} {'speedup':>8}  same")
+    for database in args.databases:
+        for rows in args.rows:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, database)
+                source = sqlite3.connect(os.path.join(here, database))
+                connection = sqlite3.connect(path, isolation_level=None)
+                source.backup(connection)
+                source.close()
+                tune_connection(connection)
+                scale_fact(connection, 'fact_sales', rows)
+                connection.close()
+
+                start = time.perf_counter()
+                OLAPEngine(path, cache_dir=os.path.join(directory, 'cache'))
+                print(f"# {database} {rows:,} rows: column files built in {time.perf_counter() - start:.1f}s")
+
+                connection = sqlite3.connect(path)
+                for name, sql, request in QUERIES[database]:
+                    sql_seconds, sql_result = best_time(lambda: pd.read_sql(sql, connection), args.repeat)
+                    engine_seconds = float('inf')
+                    for _ in range(args.repeat):
+                        # a new engine per run: memory-mapped columns, empty result cache
+                        engine = OLAPEngine(path, cache_dir=os.path.join(directory, 'cache'))
+                        start = time.perf_counter()
+                        engine_result = engine.query(**request)
+                        engine_seconds = min(engine_seconds, time.perf_counter() - start)
+                    cached_seconds, _ = best_time(lambda: engine.query(**request), args.repeat)
+                    same = same_result(sql_result, engine_result, len(request['by']))
+                    print(f"{database:<18} {rows:>11,} {name:<28} {sql_seconds:>9.3f} {engine_seconds:>9.3f} "
+                          f"{cached_seconds * 1000:>10.2f} {sql_seconds / engine_seconds:>7.1f}x  {same}")
+                connection.close()
+
+
+if __name__ == '__main__':
+    main()
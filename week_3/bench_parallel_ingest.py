@@ -0,0 +1,79 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import load_csv
+from parallel_ingest import ingest_files
+
+# Serial load_csv loop vs ingest_files (process pool + single writer) on synthetic
+# CSVs shaped like csv_data/suppliers.csv and csv_data/marketing_campaigns.csv.
+# Usage: python bench_parallel_ingest.py --files 2 20 200 --rows 20000 --workers 2 4 8
+
+
+def write_synthetic_csvs(directory, n_files, rows, seed=42):
+    """Alternate marketing_campaigns_NNN.csv / suppliers_NNN.csv files, rows each"""
+    rng = np.random.default_rng(seed)
+    jobs = []
+    for i in range(n_files):
+        if i % 2 == 0:
+            name = f'marketing_campaigns_{i:03d}'
+            df = pd.DataFrame({
+                'campaign_id': [f'CAMP_{j:07d}' for j in range(rows)],
+                'campaign_name': [f'Campaign {j}' for j in range(rows)],
+                'start_date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+                'channel': rng.choice(['Email', 'Social Media', 'TV', 'Online'], rows),
+                'budget': rng.uniform(1000, 50000, rows).round(2),
+                'conversion_rate': rng.uniform(0.01, 0.15, rows).round(4),
+            })
+        else:
+            name = f'suppliers_{i:03d}'
+            df = pd.DataFrame({
+                'supplier_id': np.arange(1, rows + 1),
+                'supplier_name': [f'Supplier Corp {j}' for j in range(rows)],
+                'country': rng.choice(['China', 'India', 'USA', 'Mexico'], rows),
+                'rating': rng.uniform(3.0, 5.0, rows).round(1),
+                'delivery_days': rng.integers(1, 30, rows),
+            })
+        path = os.path.join(directory, f'{name}.csv')
+        df.to_csv(path, index=False)
+        jobs.append((path, name))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel CSV ingestion benchmark')
+    parser.add_argument('--files', type=int, nargs='+', default=[2, 20, 200])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, os.cpu_count() or 4])
+    args = parser.parse_args()
+
+    print(f"{'files':>6} {'mode':>12} {'seconds':>9} {'rows/s':>12}")
+    for n_files in args.files:
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = write_synthetic_csvs(directory, n_files, args.rows)
+            total_rows = n_files * args.rows
+
+            database = os.path.join(directory, 'serial.db')
+            start = time.perf_counter()
+            connection = sqlite3.connect(database)
+            for csv_file, table_name in jobs:
+                load_csv(csv_file, connection, table_name, trace_memory=False)
+            connection.close()
+            elapsed = time.perf_counter() - start
+            print(f"{n_files:>6} {'serial':>12} {elapsed:>9.2f} {total_rows / elapsed:>12,.0f}")
+
+            for workers in args.workers:
+                database = os.path.join(directory, f'parallel_{workers}.db')
+                start = time.perf_counter()
+                ingest_files(jobs, database, workers=workers)
+                elapsed = time.perf_counter() - start
+                print(f"{n_files:>6} {f'{workers} workers':>12} {elapsed:>9.2f} {total_rows / elapsed:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
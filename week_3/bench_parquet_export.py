@@ -0,0 +1,74 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from bench_incremental_aggregates import append_facts
+from parquet_export import export_table, metadata_summary, read_table
+
+# CSV vs Parquet for the warehouse export: file size, full load time (with the
+# timestamps parsed), a projected + filtered read, and Total Revenue from the
+# Parquet footers vs summing the CSV.
+# fact_sales in a temp copy of data_warehouse.db is grown to --rows first.
+# Usage: python bench_parquet_export.py --rows 1000000 10000000
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def export_csv_file(connection, path, chunksize=500_000):
+    chunks = pd.read_sql("SELECT * FROM fact_sales", connection, chunksize=chunksize)
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CSV vs Parquet warehouse export benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'rows':>12} {'format':>8} {'MB':>8} {'export s':>9} {'load s':>8} {'query s':>8} {'revenue s':>10}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            source = sqlite3.connect(os.path.join(here, 'data_warehouse.db'))
+            connection = sqlite3.connect(os.path.join(directory, 'data_warehouse.db'), isolation_level=None)
+            source.backup(connection)
+            source.close()
+            current = connection.execute("SELECT COUNT(*) FROM fact_sales").fetchone()[0]
+            append_facts(connection, rows - current)
+
+            # CSV, as the notebook exports it (in chunks, so 10M rows fit in memory)
+            csv_path = os.path.join(directory, 'fact_sales.csv')
+            export_csv, _ = timed(lambda: export_csv_file(connection, csv_path))
+            load_csv, _ = timed(lambda: pd.read_csv(csv_path, parse_dates=['transaction_date']))
+            query_csv, _ = timed(lambda: (lambda df: df[df['date_key'] >= 20230301])(
+                pd.read_csv(csv_path, usecols=['date_key', 'customer_id', 'total_amount'])))
+            revenue_csv, _ = timed(lambda: pd.read_csv(csv_path, usecols=['total_amount'])['total_amount'].sum())
+            print(f"{rows:>12,} {'csv':>8} {os.path.getsize(csv_path) / 2**20:>8.1f} {export_csv:>9.2f} "
+                  f"{load_csv:>8.2f} {query_csv:>8.2f} {revenue_csv:>10.3f}")
+
+            parquet_dir = os.path.join(directory, 'parquet')
+            export_parquet, _ = timed(lambda: export_table(connection, 'fact_sales', parquet_dir))
+            load_parquet, _ = timed(lambda: read_table('fact_sales', parquet_dir))
+            query_parquet, _ = timed(lambda: read_table('fact_sales', parquet_dir,
+                                                        columns=['date_key', 'customer_id', 'total_amount'],
+                                                        filters=[('date_key', '>=', 20230301)]))
+            revenue_parquet, _ = timed(lambda: metadata_summary('fact_sales', parquet_dir)['sums']['total_amount'])
+            print(f"{rows:>12,} {'parquet':>8} {directory_size(os.path.join(parquet_dir, 'fact_sales')) / 2**20:>8.1f} "
+                  f"{export_parquet:>9.2f} {load_parquet:>8.2f} {query_parquet:>8.2f} {revenue_parquet:>10.3f}")
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
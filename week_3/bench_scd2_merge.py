@@ -0,0 +1,185 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import tune_connection
+from scd2_merge import open_dimension
+from warehouse_generator import CITIES, OLAP_RETAIL_DDL, SEGMENTS, STATES, build_dim_customer
+
+# SCD2Dimension.merge on an olap_retail dim_customer of --rows members against what the
+# notebooks do today (to_sql(if_exists='replace') of the whole snapshot, no history) and
+# a row-by-row SCD2 loop (indexed lookup + compare + UPDATE/INSERT per member, timed on
+# --baseline-rows and scaled up). The snapshot changes a tracked attribute (segment or
+# city/state) for --change-rate of the members, a type-1 attribute (email) for as many,
+# adds --new-rate new members and drops --new-rate / 2 of them; the merge report and the
+# resulting table are checked against those numbers. Also times a no-op re-merge and
+# the surrogate key lookup for a fact batch the size of the dimension.
+# Dimension and snapshot are generated CHUNK_ROWS at a time, so memory stays flat.
+# Usage: python bench_scd2_merge.py --rows 1000000 10000000
+
+DIM_CUSTOMER_DDL = next(ddl for ddl in OLAP_RETAIL_DDL if 'dim_customer' in ddl)
+CHUNK_ROWS = 1_000_000
+
+
+def dimension_chunks(n, seed=42):
+    """build_dim_customer rows for customer_id 1..n, CHUNK_ROWS at a time"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, CHUNK_ROWS):
+        chunk = build_dim_customer(min(CHUNK_ROWS, n - start), rng)
+        ids = chunk['customer_id'] + start
+        text_ids = ids.astype(str)
+        yield chunk.assign(customer_key=ids, customer_id=ids, full_name='First_' + text_ids + ' Last_' + text_ids,
+                           email='customer_' + text_ids + '@email.com')
+
+
+def create_dimension(path, n):
+    """olap_retail-shaped database holding only dim_customer with n members"""
+    connection = sqlite3.connect(path, isolation_level=None)
+    tune_connection(connection)
+    connection.execute(DIM_CUSTOMER_DDL)
+    connection.execute("BEGIN")
+    for chunk in dimension_chunks(n):
+        connection.executemany(f"INSERT INTO dim_customer VALUES ({', '.join('?' for _ in chunk.columns)})",
+                               zip(*(chunk[column].tolist() for column in chunk.columns)))
+    connection.execute("COMMIT")
+    connection.close()
+
+
+def snapshot_chunks(n, change_rate, new_rate, counts, seed=0):
+    """The source system's next full extract, chunk by chunk (the same rows on every call).
+
+    counts collects what a correct merge must report: new, changed, overwritten, expired.
+    """
+    counts.update(new=0, changed=0, overwritten=0, expired=0)
+    for number, chunk in enumerate(dimension_chunks(n)):
+        rng = np.random.default_rng([seed, number])
+        snapshot = chunk.drop(columns='customer_key').reset_index(drop=True)
+        draw = rng.random(len(snapshot))
+        moved = np.flatnonzero(draw < change_rate / 2)
+        promoted = np.flatnonzero((draw >= change_rate / 2) & (draw < change_rate))
+        # type-1 only: new email, half of them on members that also changed segment
+        emailed = np.flatnonzero((draw >= change_rate / 2) & (draw < change_rate * 1.5))
+        dropped = draw >= 1 - new_rate / 2
+
+        location = (snapshot['city'].to_numpy()[moved, None] == np.asarray(CITIES)).argmax(axis=1)
+        location = (location + 1 + rng.integers(0, len(CITIES) - 1, len(moved))) % len(CITIES)
+        snapshot.loc[moved, 'city'] = np.asarray(CITIES)[location]
+        snapshot.loc[moved, 'state'] = np.asarray(STATES)[location]
+        segment = (snapshot['customer_segment'].to_numpy()[promoted, None] == np.asarray(SEGMENTS)).argmax(axis=1)
+        snapshot.loc[promoted, 'customer_segment'] = np.asarray(SEGMENTS)[(segment + 1) % len(SEGMENTS)]
+        snapshot.loc[emailed, 'email'] = 'new_' + snapshot.loc[emailed, 'email']
+        snapshot = snapshot[~dropped]
+
+        n_new = int(len(chunk) * new_rate)
+        first_id = n + counts['new'] + 1
+        new = snapshot.sample(n_new, random_state=seed).assign(customer_id=np.arange(first_id, first_id + n_new))
+        counts['new'] += n_new
+        counts['changed'] += len(moved) + len(promoted)
+        counts['overwritten'] += len(emailed)
+        counts['expired'] += int(dropped.sum())
+        yield pd.concat([snapshot, new], ignore_index=True).sample(frac=1, random_state=seed, ignore_index=True)
+
+
+def row_by_row(path, snapshot, effective):
+    """The per-member SCD2 loop: look up the current version, compare, expire + insert"""
+    connection = sqlite3.connect(path, isolation_level=None)
+    tune_connection(connection)
+    tracked = ['city', 'state', 'customer_segment']
+    connection.execute("BEGIN")
+    for row in snapshot.itertuples(index=False):
+        current = connection.execute(
+            "SELECT customer_key, city, state, customer_segment, full_name, email FROM dim_customer "
+            "WHERE customer_id = ? AND is_current = 1", (row.customer_id,)).fetchone()
+        values = (row.customer_id, row.full_name, row.email, row.city, row.state, row.customer_segment)
+        if current is not None and list(current[1:4]) == [getattr(row, name) for name in tracked]:
+            if list(current[4:]) != [row.full_name, row.email]:
+                connection.execute("UPDATE dim_customer SET full_name = ?, email = ? WHERE customer_id = ?",
+                                   (row.full_name, row.email, row.customer_id))
+            continue
+        if current is not None:
+            connection.execute("UPDATE dim_customer SET valid_to = ?, is_current = 0 WHERE customer_key = ?",
+                               (effective, current[0]))
+        connection.execute(
+            "INSERT INTO dim_customer (customer_id, full_name, email, city, state, customer_segment, "
+            "valid_from, valid_to, is_current) VALUES (?, ?, ?, ?, ?, ?, ?, '9999-12-31 00:00:00', 1)",
+            (*values, effective))
+    connection.execute("COMMIT")
+    connection.close()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SCD2 dimension merge benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000_000])
+    parser.add_argument('--change-rate', type=float, default=0.02)
+    parser.add_argument('--new-rate', type=float, default=0.01)
+    parser.add_argument('--baseline-rows', type=int, default=100_000)
+    parser.add_argument('--directory', help='where to write the databases (default: a temp dir)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        for n in args.rows:
+            path = os.path.join(directory, f'dim_{n}.db')
+            create_dimension(path, n)
+            dimension = open_dimension(path, 'dim_customer')
+            prepare_seconds, _ = timed(dimension.prepare)
+
+            expected = {}
+            report = dimension.merge(snapshot_chunks(n, args.change_rate, args.new_rate, expected),
+                                     effective='2025-06-01', expire_missing=True)
+            got = {name: getattr(report, name) for name in expected}
+            assert got == expected, (got, expected)
+            total, current = dimension.connection.execute(
+                "SELECT COUNT(*), SUM(is_current) FROM dim_customer").fetchone()
+            assert total == n + expected['new'] + expected['changed']
+            assert current == report.staged
+            again = dimension.merge(snapshot_chunks(n, args.change_rate, args.new_rate, {}),
+                                    effective='2025-06-02', expire_missing=True)
+            assert again.unchanged == again.staged
+
+            natural_ids = np.arange(1, n + expected['new'] + 1)
+            lookup_seconds, keys = timed(lambda: dimension.surrogate_keys(natural_ids))
+            assert (keys > 0).sum() == current
+            dimension.close()
+
+            replace_connection = sqlite3.connect(path)
+            tune_connection(replace_connection)
+            start = time.perf_counter()
+            for number, chunk in enumerate(snapshot_chunks(n, args.change_rate, args.new_rate, {})):
+                chunk.to_sql('dim_customer_replaced', replace_connection, index=False,
+                             if_exists='replace' if number == 0 else 'append')
+            replace_seconds = time.perf_counter() - start
+            replace_connection.close()
+
+            baseline_path = os.path.join(directory, f'baseline_{n}.db')
+            baseline_n = min(args.baseline_rows, n)
+            create_dimension(baseline_path, baseline_n)
+            baseline = open_dimension(baseline_path, 'dim_customer')
+            baseline.prepare()
+            baseline.close()
+            baseline_snapshot = pd.concat(snapshot_chunks(baseline_n, args.change_rate, args.new_rate, {}))
+            loop_seconds, _ = timed(lambda: row_by_row(baseline_path, baseline_snapshot, '2025-06-01 00:00:00'))
+            loop_seconds *= report.staged / len(baseline_snapshot)
+
+            print(f"# {n:,} members: prepare {prepare_seconds:.1f}s")
+            print(f"  merge      {report}")
+            print(f"  re-merge   {again}")
+            print(f"  replace    to_sql(if_exists='replace') {replace_seconds:.1f}s (no history)")
+            print(f"  row loop   {loop_seconds:.1f}s (scaled from {baseline_n:,}) -> merge is "
+                  f"{loop_seconds / report.seconds:.1f}x faster")
+            print(f"  keys       surrogate_keys for {len(natural_ids):,} fact rows {lookup_seconds:.2f}s "
+                  f"(first call loads the cache)")
+
+
+if __name__ == '__main__':
+    main()
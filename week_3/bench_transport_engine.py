@@ -0,0 +1,170 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import tune_connection
+from transport_engine import TransportEngine
+
+# SQLite vs TransportEngine on a synthetic transport.db with --taps tap events, made the
+# way 03c_real_world_sql_data_pipelines.ipynb makes the real one (same tables, types and
+# distributions; one trip per 5 taps, 100 routes). For each question: the SQL over the
+# raw tables, the engine on an already-built column cache, and a check that both
+# agree. Also times the one-off column build, a cached reload, persist() and the
+# same question answered from the persisted, indexed summary tables.
+# Usage: python bench_transport_engine.py --taps 1000000 10000000 100000000
+
+GENERATE_BATCH = 2_000_000
+
+# (name, SQL over the raw tables, engine call, key columns the results are sorted by)
+QUESTIONS = [
+    ('per_trip', """
+        SELECT e.trip_id, COUNT(*) AS boardings, SUM(e.fare) AS revenue, MIN(e.tap_time) AS first_tap,
+               MAX(e.tap_time) AS last_tap, COUNT(DISTINCT e.stop_id) AS distinct_stops,
+               SUM(e.fare) / r.km AS fare_per_km
+        FROM tap_events e
+        JOIN trips t ON t.trip_id = e.trip_id
+        JOIN routes r ON r.routes_id = t.route_id
+        GROUP BY e.trip_id
+    """, lambda engine: engine.trip_summary().query('boardings > 0'), ['trip_id']),
+    ('by_route', """
+        SELECT r.routes_id AS route_id, r.mode, COUNT(*) AS trips, SUM(COALESCE(b.boardings, 0)) AS boardings,
+               SUM(b.revenue) AS revenue, SUM(r.km) AS vehicle_km
+        FROM trips t
+        JOIN routes r ON r.routes_id = t.route_id
+        LEFT JOIN (SELECT trip_id, COUNT(*) AS boardings, SUM(fare) AS revenue
+                   FROM tap_events GROUP BY trip_id) b ON b.trip_id = t.trip_id
+        GROUP BY r.routes_id, r.mode
+    """, lambda engine: engine.rollup(['route_id', 'mode']), ['route_id']),
+    ('by_mode', """
+        SELECT r.mode, COUNT(DISTINCT t.trip_id) AS trips, COUNT(*) AS boardings, SUM(e.fare) AS revenue
+        FROM tap_events e
+        JOIN trips t ON t.trip_id = e.trip_id
+        JOIN routes r ON r.routes_id = t.route_id
+        GROUP BY r.mode
+    """, lambda engine: engine.rollup(['mode']).assign(trips=lambda frame: frame['trips'] - _idle_trips(engine)),
+        ['mode']),
+    ('by_day_mode', """
+        SELECT substr(t.service_date, 1, 10) AS service_day, r.mode, COUNT(*) AS boardings, SUM(e.fare) AS revenue
+        FROM tap_events e
+        JOIN trips t ON t.trip_id = e.trip_id
+        JOIN routes r ON r.routes_id = t.route_id
+        GROUP BY 1, 2
+    """, lambda engine: engine.rollup(['service_day', 'mode']).query('boardings > 0'), ['service_day', 'mode']),
+]
+
+# The same question from the persisted tables: one route's daily figures
+SUMMARY_LOOKUP = ("SELECT service_day, SUM(boardings), SUM(revenue) FROM trip_summary "
+                  "WHERE route_id = ? GROUP BY service_day HAVING SUM(boardings) > 0")
+RAW_LOOKUP = """
+    SELECT substr(t.service_date, 1, 10), COUNT(*), SUM(e.fare)
+    FROM tap_events e JOIN trips t ON t.trip_id = e.trip_id
+    WHERE t.route_id = ? GROUP BY 1
+"""
+
+
+def _idle_trips(engine):
+    """Trips without taps per mode, which an inner join from tap_events cannot count"""
+    summary = engine.trip_summary()
+    idle = summary[summary['boardings'] == 0].groupby('mode').size()
+    return engine.rollup(['mode'])['mode'].map(idle).fillna(0).astype(int).to_numpy()
+
+
+def create_database(path, taps, seed=42):
+    """transport.db with the notebook's schema, taps tap events and taps // 5 trips"""
+    rng = np.random.default_rng(seed)
+    n_routes, n_trips = 100, max(taps // 5, 1)
+    connection = sqlite3.connect(path, isolation_level=None)
+    tune_connection(connection)
+    connection.execute('CREATE TABLE "routes" ("routes_id" INTEGER PRIMARY KEY, "routes_name" TEXT UNIQUE, '
+                       '"mode" TEXT, "km" REAL)')
+    connection.execute('CREATE TABLE "trips" ("trip_id" PRIMARY KEY, "route_id" INTEGER, "service_date" DATETIME)')
+    connection.execute('CREATE TABLE "tap_events" ("tap_id" PRIMARY KEY, "trip_id" TEXT, "tap_time" INTEGER, '
+                       '"stop_id" TEXT, "direction" TEXT, "fare" REAL)')
+    connection.execute("BEGIN")
+    routes = zip(range(1, n_routes + 1), [f'Route_{i}' for i in range(n_routes)],
+                 rng.choice(['bus', 'train', 'tram'], n_routes, p=[0.5, 0.4, 0.1]).tolist(),
+                 rng.exponential(50, n_routes).round(2).clip(10, 250).tolist())
+    connection.executemany('INSERT INTO routes VALUES (?, ?, ?, ?)', routes)
+    service_dates = pd.date_range('2025-01-01', periods=n_trips, freq='90min').strftime('%Y-%m-%d %H:%M:%S')
+    connection.executemany('INSERT INTO trips VALUES (?, ?, ?)',
+                           zip([f'TRIP_{i:08d}' for i in range(1, n_trips + 1)],
+                               rng.integers(1, n_routes + 1, n_trips).tolist(), service_dates))
+    stops = np.array(['A', 'B', 'C', 'D', 'E'], dtype=object)
+    directions = np.array(['east', 'west'], dtype=object)
+    for start in range(0, taps, GENERATE_BATCH):
+        size = min(GENERATE_BATCH, taps - start)
+        ids = np.arange(start + 1, start + size + 1)
+        trip_numbers = rng.integers(1, n_trips + 1, size)
+        connection.executemany('INSERT INTO tap_events VALUES (?, ?, ?, ?, ?, ?)', zip(
+            [f'TAP_{i:09d}' for i in ids], [f'TRIP_{i:08d}' for i in trip_numbers],
+            rng.integers(6, 24, size).tolist(), stops[rng.choice(5, size, p=[0.4, 0.2, 0.2, 0.1, 0.1])],
+            directions[rng.integers(0, 2, size)], rng.normal(3.5, 1.2, size).clip(1.2, 5.4).round(2).tolist()))
+    connection.execute("COMMIT")
+    connection.close()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def same(sql_frame, engine_frame, keys):
+    """Do the SQL and engine results agree on every column the SQL returns?"""
+    sql_frame = sql_frame.sort_values(keys, ignore_index=True)
+    engine_frame = engine_frame.sort_values(keys, ignore_index=True)[list(sql_frame.columns)]
+    if len(sql_frame) != len(engine_frame):
+        return False
+    for column in sql_frame.columns:
+        left, right = sql_frame[column], engine_frame[column]
+        if column in keys or not pd.api.types.is_numeric_dtype(left):
+            if not (left.astype(str).to_numpy() == right.astype(str).to_numpy()).all():
+                return False
+        elif not np.allclose(left.astype(float), right.astype(float), rtol=1e-9, equal_nan=True):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TransportEngine vs SQL benchmark')
+    parser.add_argument('--taps', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--directory', help='where to write the synthetic databases (default: a temp dir)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        for taps in args.taps:
+            path = os.path.join(directory, f'transport_{taps}.db')
+            seconds, _ = timed(lambda: create_database(path, taps))
+            print(f"# {taps:,} taps: database written in {seconds:.1f}s ({os.path.getsize(path) / 2**20:,.0f} MB)")
+
+            build_seconds, engine = timed(lambda: TransportEngine(path))
+            reload_seconds, engine = timed(lambda: TransportEngine(path))
+            assert engine.rebuilds == 0
+            print(f"# column build {build_seconds:.1f}s, cached reload {reload_seconds:.2f}s")
+
+            connection = sqlite3.connect(path)
+            print(f"{'question':>12} {'rows':>10} {'sql s':>8} {'engine s':>9} {'speed-up':>9} {'same':>5}")
+            for name, sql, ask, keys in QUESTIONS:
+                sql_seconds, expected = timed(lambda: pd.read_sql(sql, connection))
+                engine._trip_figures = None  # time the per-trip pass as part of every question
+                engine_seconds, result = timed(lambda: ask(engine))
+                print(f"{name:>12} {len(expected):>10,} {sql_seconds:>8.2f} {engine_seconds:>9.2f} "
+                      f"{sql_seconds / engine_seconds:>8.1f}x {str(same(expected, result, keys)):>5}")
+
+            persist_seconds, counts = timed(lambda: engine.persist())
+            route = 42
+            raw_seconds, raw = timed(lambda: connection.execute(RAW_LOOKUP, (route,)).fetchall())
+            summary_seconds, summary = timed(lambda: connection.execute(SUMMARY_LOOKUP, (route,)).fetchall())
+            assert sorted(row[:2] for row in raw) == sorted(row[:2] for row in summary)
+            print(f"# persist {persist_seconds:.1f}s ({counts['trip_summary']:,} trips); one route by day: "
+                  f"raw tables {raw_seconds * 1000:,.0f} ms, trip_summary {summary_seconds * 1000:,.1f} ms")
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
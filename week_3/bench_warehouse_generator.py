@@ -0,0 +1,74 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from warehouse_generator import generate_olap_retail
+
+# Throughput of the vectorized olap_retail generator vs the 03d notebook's per-row loop.
+# Each size runs in a fresh process so the max RSS column is per run, not cumulative.
+# Usage: python bench_warehouse_generator.py --sizes 1000000 10000000 100000000 --loop-rows 20000
+
+
+def notebook_loop(n_sales, database):
+    """The 03d fact loop (bookstore dimensions) followed by to_sql(if_exists='append')"""
+    np.random.seed(42)
+    prices = np.round(np.random.uniform(9.99, 39.99, 15), 2)
+    books = pd.DataFrame({'book_key': range(1, 16), 'price': prices})
+    start = time.perf_counter()
+    sales_data = []
+    for i in range(n_sales):
+        date_key = int((pd.Timestamp('2024-01-01') +
+                        timedelta(days=np.random.randint(0, 365))).strftime('%Y%m%d'))
+        customer_key = np.random.randint(1, 11)
+        book_key = np.random.randint(1, 16)
+        book_price = books[books['book_key'] == book_key]['price'].iloc[0]
+        quantity = np.random.randint(1, 4)
+        discount = np.random.choice([0, 5, 10, 15, 20], p=[0.5, 0.2, 0.15, 0.1, 0.05])
+        total = quantity * book_price * (1 - discount / 100)
+        sales_data.append({
+            'sale_id': i + 1, 'date_key': date_key, 'customer_key': customer_key, 'book_key': book_key,
+            'quantity': quantity, 'unit_price': book_price, 'discount_percent': discount,
+            'total_amount': round(total, 2),
+        })
+    connection = sqlite3.connect(database)
+    pd.DataFrame(sales_data).to_sql('fact_sales', connection, if_exists='append', index=False)
+    connection.close()
+    return time.perf_counter() - start
+
+
+def run_generator(database, n_sales, batch_size):
+    report = generate_olap_retail(database, n_sales, batch_size=batch_size)
+    return report.seconds, report.max_rss_bytes / 2**20, os.path.getsize(database) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warehouse generator benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--loop-rows', type=int, default=20_000)
+    parser.add_argument('--batch-size', type=int, default=250_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>13} {'path':>11} {'seconds':>9} {'rows/s':>12} {'max RSS MB':>11} {'db MB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        elapsed = notebook_loop(args.loop_rows, os.path.join(directory, 'loop.db'))
+        print(f"{args.loop_rows:>13,} {'loop':>11} {elapsed:>9.2f} {args.loop_rows / elapsed:>12,.0f}")
+
+        for n_sales in args.sizes:
+            database = os.path.join(directory, f'olap_{n_sales}.db')
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                elapsed, rss, size = pool.submit(run_generator, database, n_sales, args.batch_size).result()
+            print(f"{n_sales:>13,} {'vectorized':>11} {elapsed:>9.2f} {n_sales / elapsed:>12,.0f} "
+                  f"{rss:>11.0f} {size:>9.0f}")
+            os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
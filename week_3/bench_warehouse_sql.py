@@ -0,0 +1,86 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from bench_index_advisor import scale_fact
+from bench_olap_engine import QUERIES
+from csv_loader import tune_connection
+from index_advisor import WORKLOADS
+from warehouse_generator import generate_olap_retail
+
+# pytest-benchmark timings of the warehouse SQL workloads (index_advisor.WORKLOADS and
+# bench_olap_engine.QUERIES) at 1x/10x/100x of WAREHOUSE_ROWS fact rows (default
+# 100,000). olap_retail.db is generated by warehouse_generator at each size;
+# data_warehouse.db has no generator, so a copy of the shipped file has its fact_sales
+# scaled up by scale_fact. Every query is a full fetch, WAREHOUSE_ROUNDS rounds after one
+# warm-up. Databases live in WAREHOUSE_DIRECTORY (default: pytest's temp dir) and are
+# reused when they already hold the right number of rows. Each query is its own group,
+# so one report shows how it scales; pytest-benchmark writes and compares the JSON.
+# Environment: WAREHOUSE_SCALES=1,10,100 WAREHOUSE_ROWS=100000 WAREHOUSE_ROUNDS=3
+# Usage: pytest bench_warehouse_sql.py --benchmark-autosave                  (first run: saved under .benchmarks/)
+#        pytest bench_warehouse_sql.py --benchmark-autosave --benchmark-compare --benchmark-compare-fail=median:20%
+#        pytest bench_warehouse_sql.py --benchmark-json=warehouse_sql.json
+
+SCALES = [int(scale) for scale in os.environ.get('WAREHOUSE_SCALES', '1,10,100').split(',')]
+BASE_ROWS = int(os.environ.get('WAREHOUSE_ROWS', 100_000))
+ROUNDS = int(os.environ.get('WAREHOUSE_ROUNDS', 3))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (database, name, SQL): every workload query once, whichever module it came from
+CASES = [(database, name, sql) for database, queries in WORKLOADS.items() for name, sql in queries.items()]
+CASES += [(database, name, sql) for database, queries in QUERIES.items() for name, sql, _ in queries
+          if name not in WORKLOADS.get(database, {})]
+
+
+def fact_rows(path):
+    if not os.path.exists(path):
+        return None
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT COUNT(*) FROM fact_sales").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        connection.close()
+
+
+def build(database, path, rows):
+    """database's schema at path with rows fact rows (kept if it is already there)"""
+    if fact_rows(path) == rows:
+        return
+    if database == 'olap_retail.db':
+        generate_olap_retail(path, rows)
+        return
+    shutil.copyfile(os.path.join(HERE, database), path)
+    connection = sqlite3.connect(path, isolation_level=None)
+    tune_connection(connection)
+    scale_fact(connection, 'fact_sales', rows)
+    connection.close()
+
+
+@pytest.fixture(scope='session', params=SCALES, ids=[f'{scale}x' for scale in SCALES])
+def warehouse(request, tmp_path_factory):
+    """{database: open connection} with fact_sales at this scale of BASE_ROWS"""
+    rows = BASE_ROWS * request.param
+    directory = os.environ.get('WAREHOUSE_DIRECTORY') or tmp_path_factory.mktemp(f'warehouse_{request.param}x')
+    connections = {}
+    for database in sorted({database for database, _, _ in CASES}):
+        path = os.path.join(directory, f'{os.path.splitext(database)[0]}_{rows}.db')
+        build(database, path, rows)
+        connections[database] = sqlite3.connect(path)
+        tune_connection(connections[database])
+    yield request.param, rows, connections
+    for connection in connections.values():
+        connection.close()
+
+
+@pytest.mark.parametrize('database, name, sql', CASES, ids=[f'{database}:{name}' for database, name, _ in CASES])
+def test_query(benchmark, warehouse, database, name, sql):
+    scale, rows, connections = warehouse
+    connection = connections[database]
+    benchmark.group = f'{database}:{name}'
+    benchmark.extra_info.update(database=database, query=name, scale=scale, fact_rows=rows)
+    result = benchmark.pedantic(lambda: connection.execute(sql).fetchall(), rounds=ROUNDS, warmup_rounds=1)
+    assert result
@@ -0,0 +1,422 @@
+import copy
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+from csv_loader import tune_connection
+from scd2_merge import SCD_COLUMNS, open_dimension
+from warehouse_generator import REGIONS
+
+# Change-data-capture from oltp_retail.db into the olap_retail.db star schema
+# (03c_data_warehouse_design.ipynb) instead of a full re-extract.
+#
+#   OLTP write --trigger--> cdc_changelog --ChangeConsumer.consume_batch()--> dim_* upserts
+#                                                                             fact_sales refresh
+#
+# Triggers only record which row changed (table, key, parent order); the consumer reads
+# the current OLTP state for a whole batch of keys at once, so a row changed many times
+# between polls is processed once. Facts keep the ETL grain (one row per order item of a
+# Completed order): every order touched by a batch has its fact rows deleted and
+# re-inserted, which handles inserts, updates, status changes and deletes alike.
+# Natural -> surrogate key lookups (customer/product/store) are cached in memory.
+# dim_customer / dim_product converted to type-2 history by scd2_merge are written with
+# SCD2Dimension.apply_changes in the same transaction: a changed tracked attribute
+# expires the current version and adds a new one, and the caches hold current keys only.
+# The consumed position is stored in olap_retail.db (cdc_offsets) in the same
+# transaction as the warehouse changes.
+
+DEFAULT_BATCH_SIZE = 5_000
+
+# (table, key column, parent order column or None)
+TRACKED_TABLES = [
+    ('orders', 'order_id', 'order_id'),
+    ('order_items', 'order_item_id', 'order_id'),
+    ('customers', 'customer_id', None),
+    ('addresses', 'address_id', None),
+    ('products', 'product_id', None),
+    ('categories', 'category_id', None),
+    ('stores', 'store_id', None),
+]
+
+CHANGELOG_DDL = """CREATE TABLE IF NOT EXISTS cdc_changelog (
+    change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    row_id INTEGER,
+    order_id INTEGER,
+    changed_at REAL NOT NULL
+)"""
+
+# Unix time with sub-second precision, so lag can be measured in milliseconds
+_NOW_SQL = "(julianday('now') - 2440587.5) * 86400.0"
+
+OFFSETS_DDL = """CREATE TABLE IF NOT EXISTS cdc_offsets (
+    source TEXT PRIMARY KEY,
+    last_change_id INTEGER NOT NULL,
+    updated_at TEXT
+)"""
+
+NEW_CUSTOMER_SEGMENT = 'Bronze'
+
+
+def install_triggers(connection):
+    """Create cdc_changelog and AFTER INSERT/UPDATE/DELETE triggers on the OLTP tables"""
+    connection.execute("PRAGMA journal_mode = WAL")   # the consumer reads while orders are written
+    connection.execute(CHANGELOG_DDL)
+    for table, key, parent in TRACKED_TABLES:
+        for operation, event, row in [('I', 'INSERT', 'NEW'), ('U', 'UPDATE', 'NEW'), ('D', 'DELETE', 'OLD')]:
+            parent_value = f'{row}.{parent}' if parent else 'NULL'
+            body = (f"INSERT INTO cdc_changelog (table_name, operation, row_id, order_id, changed_at) "
+                    f"VALUES ('{table}', '{operation}', {row}.{key}, {parent_value}, {_NOW_SQL});")
+            if operation == 'U' and table == 'order_items':
+                # an item moved to another order changes the old order's facts too
+                body += (f"\n    INSERT INTO cdc_changelog (table_name, operation, row_id, order_id, changed_at) "
+                         f"SELECT 'order_items', 'U', OLD.{key}, OLD.order_id, {_NOW_SQL} "
+                         f"WHERE OLD.order_id IS NOT NEW.order_id;")
+            connection.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS cdc_{table}_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    {body}
+                END
+            """)
+    connection.commit()
+
+
+def drop_triggers(connection):
+    """Remove the CDC triggers (the changelog table is kept)"""
+    for table, _, _ in TRACKED_TABLES:
+        for event in ('insert', 'update', 'delete'):
+            connection.execute(f"DROP TRIGGER IF EXISTS cdc_{table}_{event}")
+    connection.commit()
+
+
+def date_key_from_text(value):
+    """YYYYMMDD int from an OLTP 'YYYY-MM-DD[ HH:MM:SS]' string"""
+    return int(value[0:4]) * 10000 + int(value[5:7]) * 100 + int(value[8:10])
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class CDCMetrics:
+    """Changes, facts and end-to-end lag (OLTP commit -> warehouse commit) over all batches"""
+
+    def __init__(self):
+        self.batches = 0
+        self.changes = 0
+        self.orders = 0
+        self.facts_written = 0
+        self.busy_seconds = 0.0
+        self.lags = []
+        self.started = time.time()
+
+    def record(self, changes, orders, facts_written, seconds, lags):
+        self.batches += 1
+        self.changes += changes
+        self.orders += orders
+        self.facts_written += facts_written
+        self.busy_seconds += seconds
+        self.lags.extend(lags)
+
+    @property
+    def changes_per_second(self):
+        """Consumer throughput while busy"""
+        return self.changes / self.busy_seconds if self.busy_seconds else 0.0
+
+    def lag_summary(self):
+        """p50/p95/max lag in milliseconds"""
+        lags = sorted(self.lags)
+        return {
+            'p50_ms': 1000 * _percentile(lags, 0.50),
+            'p95_ms': 1000 * _percentile(lags, 0.95),
+            'max_ms': 1000 * (lags[-1] if lags else 0.0),
+        }
+
+    def __str__(self):
+        lag = self.lag_summary()
+        return (f"{self.changes:,} changes in {self.batches:,} batches -> {self.facts_written:,} fact rows "
+                f"({self.changes_per_second:,.0f} changes/s busy); lag p50 {lag['p50_ms']:.0f} ms, "
+                f"p95 {lag['p95_ms']:.0f} ms, max {lag['max_ms']:.0f} ms")
+
+
+class ChangeConsumer:
+    """Applies cdc_changelog entries from the OLTP database to the OLAP star schema"""
+
+    # in-memory state a batch changes before its transaction commits
+    _CACHES = ('customer_keys', 'product_keys', 'store_keys', 'date_keys', 'unit_costs')
+
+    def __init__(self, oltp_database, olap_database, batch_size=DEFAULT_BATCH_SIZE, prune=True):
+        self.oltp = sqlite3.connect(oltp_database, check_same_thread=False)
+        self.oltp.execute("PRAGMA journal_mode = WAL")
+        self.olap = sqlite3.connect(olap_database, isolation_level=None, check_same_thread=False)
+        tune_connection(self.olap)
+        self.source = oltp_database
+        self.batch_size = batch_size
+        self.prune = prune
+        self.metrics = CDCMetrics()
+
+        self.olap.execute(OFFSETS_DDL)
+        self.olap.execute("CREATE INDEX IF NOT EXISTS idx_fact_order ON fact_sales(order_id)")
+        row = self.olap.execute("SELECT last_change_id FROM cdc_offsets WHERE source = ?", (self.source,)).fetchone()
+        self.last_change_id = row[0] if row else 0
+
+        # SCD2Dimension per dimension that scd2_merge has converted to type-2 history
+        self.dimensions = {}
+        for table in ('dim_customer', 'dim_product'):
+            columns = {row[1] for row in self.olap.execute(f"PRAGMA table_info({table})")}
+            if set(SCD_COLUMNS) <= columns:
+                self.dimensions[table] = open_dimension(olap_database, table)
+
+        # natural -> surrogate key caches (current versions only)
+        self.customer_keys = dict(self.olap.execute(
+            f"SELECT customer_id, customer_key FROM dim_customer{self._current('dim_customer')}"))
+        self.product_keys = dict(self.olap.execute(
+            f"SELECT product_id, product_key FROM dim_product{self._current('dim_product')}"))
+        self.store_keys = dict(self.olap.execute("SELECT store_id, store_key FROM dim_store"))
+        self.date_keys = {row[0] for row in self.olap.execute("SELECT date_key FROM dim_date")}
+        self.unit_costs = dict(self.oltp.execute("SELECT product_id, unit_cost FROM products"))
+
+    def close(self):
+        for dimension in self.dimensions.values():
+            dimension.close()
+        self.oltp.close()
+        self.olap.close()
+
+    def _current(self, table):
+        return ' WHERE is_current = 1' if table in self.dimensions else ''
+
+    def consume_batch(self):
+        """Apply up to batch_size changelog entries; returns the number consumed (0 = caught up)"""
+        start = time.perf_counter()
+        changes = self.oltp.execute(
+            "SELECT change_id, table_name, operation, row_id, order_id, changed_at FROM cdc_changelog "
+            "WHERE change_id > ? ORDER BY change_id LIMIT ?", (self.last_change_id, self.batch_size)).fetchall()
+        if not changes:
+            return 0
+
+        touched = {table: set() for table, _, _ in TRACKED_TABLES}
+        orders = set()
+        for _, table, _, row_id, order_id, _ in changes:
+            touched[table].add(row_id)
+            if order_id is not None:
+                orders.add(order_id)
+
+        customers, products, stores = self._affected_dimensions(touched)
+        caches = self._cache_snapshot()
+        self.olap.execute("BEGIN")
+        try:
+            self._upsert_customers(customers)
+            self._upsert_products(products)
+            self._upsert_stores(stores)
+            facts = self._refresh_orders(orders)
+            last = changes[-1][0]
+            self.olap.execute(
+                "INSERT INTO cdc_offsets VALUES (?, ?, datetime('now')) ON CONFLICT(source) DO UPDATE SET "
+                "last_change_id = excluded.last_change_id, updated_at = excluded.updated_at",
+                (self.source, last))
+            self.olap.execute("COMMIT")
+        except Exception:
+            self.olap.execute("ROLLBACK")
+            self._restore_caches(caches)   # keys handed out in this batch were never committed
+            raise
+        self.last_change_id = last
+        committed = time.time()
+
+        if self.prune:
+            self.oltp.execute("DELETE FROM cdc_changelog WHERE change_id <= ?", (last,))
+            self.oltp.commit()
+
+        self.metrics.record(len(changes), len(orders), facts, time.perf_counter() - start,
+                            [committed - change[5] for change in changes])
+        return len(changes)
+
+    def run(self, stop_event, poll_interval=0.05):
+        """Consume until stop_event is set, sleeping poll_interval whenever caught up"""
+        while not stop_event.is_set():
+            if self.consume_batch() == 0:
+                stop_event.wait(poll_interval)
+        while self.consume_batch():   # drain what arrived before the stop
+            pass
+
+    def _cache_snapshot(self):
+        return {name: copy.copy(getattr(self, name)) for name in self._CACHES}
+
+    def _restore_caches(self, snapshot):
+        for name, values in snapshot.items():
+            setattr(self, name, values)
+
+    def _ids(self, sql, ids):
+        """First column of sql for each chunk of ids (sql has one {ids} placeholder list)"""
+        found = set()
+        for chunk in _chunks(ids):
+            marks = ', '.join('?' for _ in chunk)
+            found.update(row[0] for row in self.oltp.execute(sql.format(ids=marks), chunk))
+        return found
+
+    def _rows(self, sql, ids, connection=None):
+        connection = connection or self.oltp
+        rows = []
+        for chunk in _chunks(ids):
+            marks = ', '.join('?' for _ in chunk)
+            rows.extend(connection.execute(sql.format(ids=marks), chunk))
+        return rows
+
+    def _affected_dimensions(self, touched):
+        """Customer/product/store ids whose dimension rows must be refreshed"""
+        customers = set(touched['customers'])
+        stores = set(touched['stores'])
+        products = set(touched['products'])
+        if touched['addresses']:
+            customers |= self._ids("SELECT customer_id FROM customers WHERE address_id IN ({ids})", touched['addresses'])
+            stores |= self._ids("SELECT store_id FROM stores WHERE address_id IN ({ids})", touched['addresses'])
+        if touched['categories']:
+            products |= self._ids("SELECT product_id FROM products WHERE category_id IN ({ids})", touched['categories'])
+        return customers, products, stores
+
+    def _surrogate_key(self, table, key_column, cache, natural_id):
+        """Cached surrogate key for natural_id; a new dimension member gets the next free key"""
+        key = cache.get(natural_id)
+        if key is None:
+            key = self.olap.execute(f"SELECT COALESCE(MAX({key_column}), 0) + 1 FROM {table}").fetchone()[0]
+            cache[natural_id] = key
+        return key
+
+    def _upsert_customers(self, customer_ids):
+        if not customer_ids:
+            return
+        rows = self._rows("""
+            SELECT c.customer_id, c.first_name || ' ' || c.last_name, c.email, a.city, a.state
+            FROM customers c LEFT JOIN addresses a ON c.address_id = a.address_id
+            WHERE c.customer_id IN ({ids})
+        """, customer_ids)
+        dimension = self.dimensions.get('dim_customer')
+        if dimension is not None:
+            # the segment is not in the OLTP data: keep the current version's
+            segments = dict(self._rows(
+                "SELECT customer_id, customer_segment FROM dim_customer WHERE is_current = 1 AND customer_id IN ({ids})",
+                customer_ids, self.olap))
+            members = pd.DataFrame(rows, columns=['customer_id', 'full_name', 'email', 'city', 'state'])
+            members['customer_segment'] = [segments.get(customer_id, NEW_CUSTOMER_SEGMENT)
+                                           for customer_id in members['customer_id']]
+            self.customer_keys.update(dimension.apply_changes(self.olap, members)[1])
+            return
+        for customer_id, full_name, email, city, state in rows:
+            key = self._surrogate_key('dim_customer', 'customer_key', self.customer_keys, customer_id)
+            self.olap.execute("""
+                INSERT INTO dim_customer (customer_key, customer_id, full_name, email, city, state, customer_segment)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(customer_key) DO UPDATE SET full_name = excluded.full_name,
+                    email = excluded.email, city = excluded.city, state = excluded.state
+            """, (key, customer_id, full_name, email, city, state, NEW_CUSTOMER_SEGMENT))
+
+    def _upsert_products(self, product_ids):
+        if not product_ids:
+            return
+        rows = self._rows("""
+            SELECT p.product_id, p.product_name, c.category_name, p.unit_price, p.unit_cost
+            FROM products p LEFT JOIN categories c ON p.category_id = c.category_id
+            WHERE p.product_id IN ({ids})
+        """, product_ids)
+        members = []
+        for product_id, name, category, price, cost in rows:
+            self.unit_costs[product_id] = cost
+            margin = round((price - cost) / price * 100, 2) if price else None
+            members.append((product_id, name, category, f'Brand_{product_id % 5}', price, cost, margin))
+        dimension = self.dimensions.get('dim_product')
+        if dimension is not None:
+            members = pd.DataFrame(members, columns=['product_id', 'product_name', 'category_name', 'brand',
+                                                     'unit_price', 'unit_cost', 'margin_percent'])
+            self.product_keys.update(dimension.apply_changes(self.olap, members)[1])
+            return
+        for member in members:
+            key = self._surrogate_key('dim_product', 'product_key', self.product_keys, member[0])
+            self.olap.execute("""
+                INSERT INTO dim_product (product_key, product_id, product_name, category_name, brand,
+                    unit_price, unit_cost, margin_percent)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(product_key) DO UPDATE SET product_name = excluded.product_name,
+                    category_name = excluded.category_name, unit_price = excluded.unit_price,
+                    unit_cost = excluded.unit_cost, margin_percent = excluded.margin_percent
+            """, (key, *member))
+
+    def _upsert_stores(self, store_ids):
+        if not store_ids:
+            return
+        rows = self._rows("""
+            SELECT s.store_id, s.store_name, a.city, a.state, s.manager_name
+            FROM stores s LEFT JOIN addresses a ON s.address_id = a.address_id
+            WHERE s.store_id IN ({ids})
+        """, store_ids)
+        for store_id, name, city, state, manager in rows:
+            key = self._surrogate_key('dim_store', 'store_key', self.store_keys, store_id)
+            self.olap.execute("""
+                INSERT INTO dim_store (store_key, store_id, store_name, city, state, region, manager_name)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(store_key) DO UPDATE SET store_name = excluded.store_name, city = excluded.city,
+                    state = excluded.state, region = excluded.region, manager_name = excluded.manager_name
+            """, (key, store_id, name, city, state, REGIONS.get(state), manager))
+
+    def _ensure_date(self, key):
+        if key in self.date_keys:
+            return
+        day = date(key // 10000, key // 100 % 100, key % 100)
+        self.olap.execute("INSERT OR IGNORE INTO dim_date VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)", (
+            key, day.isoformat(), day.year, (day.month - 1) // 3 + 1, day.month, day.strftime('%B'),
+            day.isocalendar()[1], day.day, day.weekday(), day.strftime('%A'), int(day.weekday() >= 5)))
+        self.date_keys.add(key)
+
+    def _refresh_orders(self, order_ids):
+        """Replace the fact rows of order_ids with their current Completed items; returns rows written"""
+        if not order_ids:
+            return 0
+        for chunk in _chunks(order_ids):
+            self.olap.execute(f"DELETE FROM fact_sales WHERE order_id IN ({', '.join('?' for _ in chunk)})", chunk)
+
+        items = self._rows("""
+            SELECT oi.order_id, o.order_date, oi.product_id, o.customer_id, o.store_id,
+                   oi.quantity, oi.unit_price, oi.discount
+            FROM order_items oi JOIN orders o ON oi.order_id = o.order_id
+            WHERE o.order_id IN ({ids}) AND o.status = 'Completed'
+        """, order_ids)
+
+        # dimension rows the cache has never seen (e.g. created before the triggers existed)
+        self._upsert_customers({item[3] for item in items if item[3] not in self.customer_keys})
+        self._upsert_products({item[2] for item in items if item[2] not in self.product_keys})
+        self._upsert_stores({item[4] for item in items if item[4] not in self.store_keys})
+
+        facts = []
+        for order_id, order_date, product_id, customer_id, store_id, quantity, unit_price, discount in items:
+            keys = (self.product_keys.get(product_id), self.customer_keys.get(customer_id),
+                    self.store_keys.get(store_id))
+            if None in keys or order_date is None:
+                continue   # like the ETL's dropna(): no fact without all its dimensions
+            key = date_key_from_text(order_date)
+            self._ensure_date(key)
+            revenue = quantity * unit_price * (1 - (discount or 0))
+            cost = quantity * (self.unit_costs.get(product_id) or 0)
+            facts.append((key, *keys, order_id, quantity, revenue, cost, revenue - cost))
+        self.olap.executemany(
+            "INSERT INTO fact_sales (date_key, product_key, customer_key, store_key, order_id, "
+            "quantity, revenue, cost, profit) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", facts)
+        return len(facts)
+
+
+def start_consumer(oltp_database, olap_database, batch_size=DEFAULT_BATCH_SIZE, poll_interval=0.05):
+    """Run a ChangeConsumer in a background thread; returns (consumer, stop_event, thread)"""
+    consumer = ChangeConsumer(oltp_database, olap_database, batch_size=batch_size)
+    stop_event = threading.Event()
+    thread = threading.Thread(target=consumer.run, args=(stop_event, poll_interval), name='cdc-consumer', daemon=True)
+    thread.start()
+    return consumer, stop_event, thread
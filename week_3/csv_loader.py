@@ -0,0 +1,206 @@
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Chunked, typed CSV -> SQLite loader for the week 3 pipeline notebooks.
+# Replaces read-everything-then-to_sql: each CSV is streamed in chunksize batches
+# with declared dtypes, cleaned per chunk and written with executemany inside a
+# single transaction, so memory stays bounded by the chunk size, not the file size.
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Connection settings for bulk loads. WAL lets readers keep querying while we write,
+# synchronous=NORMAL is safe under WAL, and a 64 MB page cache keeps index pages hot.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64_000,   # negative = size in KiB
+    'temp_store': 'MEMORY',
+}
+
+# Declared column types for the CSVs written by 03c_real_world_sql_data_pipelines.ipynb.
+# 'dates' lists the columns parsed as timestamps (no more guessing from the column name).
+CSV_SCHEMAS = {
+    'marketing_campaigns.csv': {
+        'dtypes': {'campaign_id': 'string', 'campaign_name': 'string', 'channel': 'category',
+                   'budget': 'float64', 'conversion_rate': 'float64'},
+        'dates': ['start_date'],
+    },
+    'suppliers.csv': {
+        'dtypes': {'supplier_id': 'int64', 'supplier_name': 'string', 'country': 'category',
+                   'rating': 'float64', 'delivery_days': 'int64'},
+        'dates': [],
+    },
+    'messy_data.csv': {
+        # Read salary as text so '60,000' and '$70000' survive until cleaning
+        'dtypes': {'id': 'float64', 'name': 'string', 'age': 'float64', 'email': 'string', 'salary': 'string'},
+        'dates': [],
+    },
+}
+
+
+def schema_for(csv_file):
+    """CSV_SCHEMAS entry for a file, matching exact names or numbered copies like suppliers_007.csv"""
+    name = os.path.basename(csv_file)
+    if name in CSV_SCHEMAS:
+        return CSV_SCHEMAS[name]
+    for schema_name, schema in CSV_SCHEMAS.items():
+        if name.startswith(schema_name[:-len('.csv')] + '_'):
+            return schema
+    return {}
+
+
+def tune_connection(connection, pragmas=SQLITE_PRAGMAS):
+    """Apply the bulk-load PRAGMAs to an open sqlite3 connection"""
+    for pragma, value in pragmas.items():
+        connection.execute(f"PRAGMA {pragma} = {value}")
+    return connection
+
+
+def clean_chunk(df, cleaning_log):
+    """The clean_and_import rules from the notebook, applied to one chunk.
+
+    cleaning_log is a dict of counters shared across chunks.
+    """
+    # 1. Remove rows with missing IDs
+    if 'id' in df.columns:
+        missing_id = df['id'].isna()
+        cleaning_log['rows with missing IDs removed'] = cleaning_log.get('rows with missing IDs removed', 0) + int(missing_id.sum())
+        df = df[~missing_id].copy()
+
+    # 2. Fill missing names
+    if 'name' in df.columns:
+        df['name'] = df['name'].fillna('Unknown').replace('', 'Unknown')
+
+    # 3. Validate age
+    if 'age' in df.columns:
+        df['age'] = pd.to_numeric(df['age'], errors='coerce')
+        invalid_age = (df['age'] < 0) | (df['age'] > 120)
+        cleaning_log['invalid ages cleared'] = cleaning_log.get('invalid ages cleared', 0) + int(invalid_age.sum())
+        df.loc[invalid_age, 'age'] = np.nan
+
+    # 4. Validate email
+    if 'email' in df.columns:
+        invalid_email = ~df['email'].astype(str).str.contains('@', na=False)
+        cleaning_log['invalid emails cleared'] = cleaning_log.get('invalid emails cleared', 0) + int(invalid_email.sum())
+        df['email'] = df['email'].astype(object)
+        df.loc[invalid_email, 'email'] = None
+
+    # 5. Clean salary
+    if 'salary' in df.columns:
+        salary = df['salary'].astype(str).str.replace('[$,]', '', regex=True)
+        df['salary'] = pd.to_numeric(salary, errors='coerce')
+
+    return df
+
+
+def sqlite_type(dtype):
+    """SQLite column affinity for a pandas dtype"""
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+
+def chunk_rows(df):
+    """Row tuples ready for executemany: NaN/NA -> None, timestamps -> ISO text like to_sql"""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column].dtype):
+            df[column] = df[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+    values = df.astype(object)
+    values = values.where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+class LoadReport:
+    """Rows written, elapsed time and peak traced memory for one file"""
+
+    def __init__(self, csv_file, table_name, rows_read, rows_written, seconds, peak_bytes, cleaning_log):
+        self.csv_file = csv_file
+        self.table_name = table_name
+        self.rows_read = rows_read
+        self.rows_written = rows_written
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+        self.cleaning_log = cleaning_log
+
+    @property
+    def rows_per_second(self):
+        return self.rows_written / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        peak = f"{self.peak_bytes / 2**20:.1f} MB peak" if self.peak_bytes is not None else "peak not traced"
+        return (f"{self.table_name}: {self.rows_written:,} rows in {self.seconds:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/s, {peak})")
+
+
+def load_csv(csv_file, connection, table_name, dtypes=None, dates=None, cleaner=clean_chunk,
+             chunksize=DEFAULT_CHUNKSIZE, if_exists='replace', trace_memory=True):
+    """Stream csv_file into table_name in one transaction and return a LoadReport.
+
+    dtypes/dates default to the CSV_SCHEMAS entry for the file (see schema_for).
+    if_exists is 'replace' (drop and recreate) or 'append'.
+    """
+    schema = schema_for(csv_file)
+    dtypes = schema.get('dtypes') if dtypes is None else dtypes
+    dates = schema.get('dates', []) if dates is None else dates
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    cleaning_log = {}
+    rows_read = rows_written = 0
+
+    # isolation_level=None: we issue BEGIN/COMMIT ourselves so all chunks share one transaction
+    previous_isolation = connection.isolation_level
+    connection.isolation_level = None
+    tune_connection(connection)
+    try:
+        connection.execute("BEGIN")
+        insert_sql = None
+        for chunk in pd.read_csv(csv_file, dtype=dtypes, parse_dates=dates or False, chunksize=chunksize):
+            rows_read += len(chunk)
+            if cleaner is not None:
+                chunk = cleaner(chunk, cleaning_log)
+
+            if insert_sql is None:
+                insert_sql = prepare_table(connection, table_name, chunk, if_exists)
+            connection.executemany(insert_sql, chunk_rows(chunk))
+            rows_written += len(chunk)
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.isolation_level = previous_isolation
+        peak = None
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    return LoadReport(csv_file, table_name, rows_read, rows_written,
+                      time.perf_counter() - start, peak, cleaning_log)
+
+
+def prepare_table(connection, table_name, chunk, if_exists):
+    """Create (or replace) table_name from the first chunk's dtypes and return the INSERT statement"""
+    columns = ', '.join(f'"{column}" {sqlite_type(dtype)}' for column, dtype in chunk.dtypes.items())
+    if if_exists == 'replace':
+        connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    elif if_exists != 'append':
+        raise ValueError(f"if_exists must be 'replace' or 'append', not {if_exists!r}")
+    connection.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({columns})')
+    placeholders = ', '.join('?' for _ in chunk.columns)
+    return f'INSERT INTO "{table_name}" VALUES ({placeholders})'
+
+
+def load_csvs(csv_files, connection, **kwargs):
+    """Load [(csv_file, table_name), ...] one after another and return their LoadReports"""
+    return [load_csv(csv_file, connection, table_name, **kwargs) for csv_file, table_name in csv_files]
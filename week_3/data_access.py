@@ -0,0 +1,193 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import pandas as pd
+
+# Shared SQLite data access for the week 3 notebooks and the dashboards.
+#
+#   pool = get_pool('data_warehouse.db')                 one pool per database file, shared
+#   pool.query("SELECT ... WHERE year = ?", (2024,))     -> DataFrame, on a read-only connection
+#   with pool.write() as connection: ...                 the single writer, one transaction
+#   pool.tables()                                        rows + columns of every table at once
+#
+# Readers open the file with a read-only URI (mode=ro), so analytics code cannot modify
+# the warehouse; writes go through one writer connection behind a lock (SQLite allows
+# one writer at a time anyway). The database is switched to WAL, so readers keep a
+# consistent snapshot while the writer commits and several dashboard sessions can query
+# the same file at once. Values are passed as ? parameters, never formatted into the SQL
+# text, so each connection's prepared-statement cache (cached_statements) reuses the
+# compiled statement for every call of the same query.
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 30
+STATEMENT_CACHE_SIZE = 256
+
+# Every user table with its columns in declaration order, in one statement
+TABLE_COLUMNS_SQL = """
+    SELECT m.name, p.name
+    FROM sqlite_master m JOIN pragma_table_info(m.name) p
+    WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'
+    ORDER BY m.name, p.cid
+"""
+
+
+def quote_identifier(name):
+    """Quote a table or column name for SQL (identifiers cannot be ? parameters)"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_metadata(connection, tables=None):
+    """DataFrame (table, rows, columns) for every table, or only the given ones.
+
+    Two statements in total, whatever the number of tables: one for all columns
+    (pragma_table_info joined to sqlite_master) and one UNION ALL of the row counts.
+    """
+    columns = {}
+    for table, column in connection.execute(TABLE_COLUMNS_SQL):
+        columns.setdefault(table, []).append(column)
+    if tables is not None:
+        columns = {table: columns[table] for table in tables if table in columns}
+    if not columns:
+        return pd.DataFrame(columns=['table', 'rows', 'columns'])
+    counts = dict(connection.execute(
+        ' UNION ALL '.join(f'SELECT ?, COUNT(*) FROM {quote_identifier(table)}' for table in columns),
+        list(columns)).fetchall())
+    return pd.DataFrame({'table': list(columns),
+                         'rows': [counts[table] for table in columns],
+                         'columns': list(columns.values())})
+
+
+def _frame(cursor):
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+
+
+class ConnectionPool:
+    """Read-only connections for queries plus one writer connection, for one SQLite file"""
+
+    def __init__(self, database, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, wal=True):
+        self.database = os.path.abspath(database)
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._readers = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self.closed = False
+        if wal or not os.path.exists(self.database):
+            # the writer creates the file, so read-only readers can open it
+            with self._write_lock:
+                connection = self._writer_connection()
+                if wal:
+                    connection.execute("PRAGMA journal_mode = WAL")
+
+    def _connect(self, target, **kwargs):
+        return sqlite3.connect(target, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE, **kwargs)
+
+    def _writer_connection(self):
+        if self._writer is None:
+            self._writer = self._connect(self.database)
+            self._writer.execute("PRAGMA synchronous = NORMAL")
+        return self._writer
+
+    def _acquire(self):
+        if self.closed:
+            raise sqlite3.ProgrammingError(f"pool for {self.database} is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._readers) < self.size:
+                connection = self._connect(f'file:{quote(self.database)}?mode=ro', uri=True)
+                self._readers.append(connection)
+                return connection
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no free connection to {self.database} after {self.timeout}s") from None
+
+    @contextmanager
+    def read(self):
+        """Borrow a read-only connection"""
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            self._idle.put(connection)
+
+    @contextmanager
+    def write(self):
+        """The writer connection, exclusively; commits on success, rolls back on error"""
+        with self._write_lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError(f"pool for {self.database} is closed")
+            connection = self._writer_connection()
+            try:
+                yield connection
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+    def query(self, sql, params=()):
+        """Run a SELECT on a pooled read-only connection and return a DataFrame"""
+        with self.read() as connection:
+            return _frame(connection.execute(sql, params))
+
+    def scalar(self, sql, params=()):
+        """First column of the first row (None when there are no rows)"""
+        with self.read() as connection:
+            row = connection.execute(sql, params).fetchone()
+        return None if row is None else row[0]
+
+    def execute(self, sql, params=()):
+        """Run one write statement in its own transaction; returns the number of changed rows"""
+        with self.write() as connection:
+            return connection.execute(sql, params).rowcount
+
+    def tables(self, tables=None):
+        """table_metadata() on a pooled connection"""
+        with self.read() as connection:
+            return table_metadata(connection, tables)
+
+    def close(self):
+        """Close every connection, including ones currently borrowed"""
+        self.closed = True
+        with self._lock:
+            for connection in self._readers:
+                connection.close()
+            self._readers = []
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, **kwargs):
+    """The shared ConnectionPool for a database file, created on first use"""
+    path = os.path.abspath(database)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None or pool.closed:
+            pool = _pools[path] = ConnectionPool(path, **kwargs)
+        return pool
+
+
+def close_pools():
+    """Close every shared pool"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,338 @@
+import sqlite3
+import time
+
+# Incremental refresh of the aggregate tables from 03c_real_world_sql_data_pipelines.ipynb.
+# The notebook rebuilds agg_daily_sales and agg_customer_ltv from the whole of
+# fact_sales on every run. Here a high-water mark (the largest transaction_id already
+# aggregated) is stored in agg_refresh_state, and each refresh aggregates only the
+# fact rows above it and merges them in with INSERT ... ON CONFLICT DO UPDATE.
+#
+# COUNT(DISTINCT customer_id) per day cannot be added up across loads, so the exact
+# per-day customer set is kept in agg_daily_customers; unique_customers is recounted
+# from it for the days a delta touches.
+#
+# Facts are assumed append-only with increasing transaction_id. Each refresh also
+# stores MAX(rowid), so the next one only has to look at the rows appended since: if
+# the table shrank below it, the row holding the mark is gone (reloaded), or an appended
+# row has an id at or below the mark (late row), refresh() falls back to a full
+# rebuild(). Those checks cost index lookups, not a pass over the history. Deletes or
+# updates further back are only caught by refresh(check_history=True), which compares
+# the stored count of rows at or below the mark with a full COUNT.
+
+WATERMARK_COLUMN = 'transaction_id'
+
+# The full-history queries from the notebook, used by rebuild() and verify()
+DAILY_SALES_SQL = """
+SELECT
+    d.date,
+    d.month_name,
+    d.day_name,
+    COUNT(DISTINCT f.customer_id) as unique_customers,
+    COUNT(f.transaction_id) as num_transactions,
+    SUM(f.total_amount) as total_revenue
+FROM fact_sales f
+JOIN dim_date d ON f.date_key = d.date_key
+GROUP BY d.date, d.month_name, d.day_name
+"""
+
+CUSTOMER_LTV_SQL = """
+SELECT
+    c.customer_id,
+    c.customer_segment,
+    c.country,
+    COUNT(f.transaction_id) as total_transactions,
+    SUM(f.total_amount) as lifetime_value
+FROM dim_customer c
+LEFT JOIN fact_sales f ON c.customer_id = f.customer_id
+GROUP BY c.customer_id, c.customer_segment, c.country
+"""
+
+AGGREGATE_DDL = [
+    """CREATE TABLE IF NOT EXISTS agg_refresh_state (
+    aggregate TEXT PRIMARY KEY,
+    watermark_column TEXT,
+    high_water_mark INTEGER,
+    rows_aggregated INTEGER,
+    last_rowid INTEGER,
+    refreshed_at TEXT
+)""",
+    """CREATE TABLE IF NOT EXISTS agg_daily_customers (
+    date TEXT,
+    customer_id INTEGER,
+    PRIMARY KEY (date, customer_id)
+) WITHOUT ROWID""",
+    # the delta scan is a range search on the watermark instead of a full scan
+    f"CREATE INDEX IF NOT EXISTS idx_fact_sales_{WATERMARK_COLUMN} ON fact_sales({WATERMARK_COLUMN})",
+]
+
+DAILY_SALES_DDL = """CREATE TABLE agg_daily_sales (
+    date TEXT PRIMARY KEY,
+    month_name TEXT,
+    day_name TEXT,
+    unique_customers INTEGER,
+    num_transactions INTEGER,
+    total_revenue REAL
+)"""
+
+CUSTOMER_LTV_DDL = """CREATE TABLE agg_customer_ltv (
+    customer_id INTEGER PRIMARY KEY,
+    customer_segment TEXT,
+    country TEXT,
+    total_transactions INTEGER,
+    lifetime_value REAL
+)"""
+
+AGGREGATES = ['agg_daily_sales', 'agg_customer_ltv']
+
+
+def _add(table, column):
+    """NULL-aware running total: SUM over no values is NULL, so NULL + x must stay x"""
+    return (f"{column} = CASE WHEN excluded.{column} IS NULL THEN {table}.{column} "
+            f"WHEN {table}.{column} IS NULL THEN excluded.{column} "
+            f"ELSE {table}.{column} + excluded.{column} END")
+
+
+class RefreshReport:
+    """What one refresh() or rebuild() processed"""
+
+    def __init__(self, mode, new_rows, days_touched, customers_touched, high_water_mark, seconds):
+        self.mode = mode
+        self.new_rows = new_rows
+        self.days_touched = days_touched
+        self.customers_touched = customers_touched
+        self.high_water_mark = high_water_mark
+        self.seconds = seconds
+
+    def __str__(self):
+        return (f"{self.mode}: {self.new_rows:,} fact rows -> {self.days_touched:,} days, "
+                f"{self.customers_touched:,} customers in {self.seconds:.2f}s "
+                f"(high-water mark {WATERMARK_COLUMN} = {self.high_water_mark})")
+
+
+def _max_watermark(connection):
+    return connection.execute(f"SELECT MAX({WATERMARK_COLUMN}) FROM fact_sales").fetchone()[0]
+
+
+def _rows_up_to(connection, mark):
+    return connection.execute(
+        f"SELECT COUNT(*) FROM fact_sales WHERE {WATERMARK_COLUMN} <= ?", (mark,)).fetchone()[0]
+
+
+def _last_rowid(connection):
+    return connection.execute("SELECT MAX(rowid) FROM fact_sales").fetchone()[0]
+
+
+def _set_watermark(connection, high_water_mark, rows_aggregated):
+    last_rowid = _last_rowid(connection)
+    for aggregate in AGGREGATES:
+        connection.execute(
+            "INSERT INTO agg_refresh_state VALUES (?, ?, ?, ?, ?, datetime('now')) "
+            "ON CONFLICT(aggregate) DO UPDATE SET watermark_column = excluded.watermark_column, "
+            "high_water_mark = excluded.high_water_mark, rows_aggregated = excluded.rows_aggregated, "
+            "last_rowid = excluded.last_rowid, refreshed_at = excluded.refreshed_at",
+            (aggregate, WATERMARK_COLUMN, high_water_mark, rows_aggregated, last_rowid))
+
+
+def _state(connection):
+    """(high_water_mark, rows_aggregated, last_rowid), or None when there is no usable stored state"""
+    try:
+        states = set(connection.execute(
+            "SELECT high_water_mark, rows_aggregated, last_rowid FROM agg_refresh_state"))
+    except sqlite3.OperationalError:
+        return None
+    # both aggregates are always refreshed together; anything else means a half-finished setup
+    return states.pop() if len(states) == 1 else None
+
+
+def high_water_mark(connection):
+    """Stored high-water mark, or None when the aggregates have never been built incrementally"""
+    state = _state(connection)
+    return state[0] if state else None
+
+
+def _run(connection, work):
+    """Run work(connection) inside one write transaction"""
+    previous_isolation = connection.isolation_level
+    connection.isolation_level = None
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(connection)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.isolation_level = previous_isolation
+    return result
+
+
+def rebuild(connection):
+    """Recompute both aggregates and the per-day customer sets from the full fact table"""
+    def work(connection):
+        start = time.perf_counter()
+        connection.execute("DROP TABLE IF EXISTS agg_refresh_state")
+        for ddl in AGGREGATE_DDL:
+            connection.execute(ddl)
+        connection.execute("DROP TABLE IF EXISTS agg_daily_sales")
+        connection.execute("DROP TABLE IF EXISTS agg_customer_ltv")
+        connection.execute("DELETE FROM agg_daily_customers")
+        connection.execute(DAILY_SALES_DDL)
+        connection.execute(CUSTOMER_LTV_DDL)
+
+        mark = _max_watermark(connection)
+        connection.execute(f"INSERT INTO agg_daily_sales {DAILY_SALES_SQL}")
+        connection.execute(f"INSERT INTO agg_customer_ltv {CUSTOMER_LTV_SQL}")
+        connection.execute("""
+            INSERT INTO agg_daily_customers
+            SELECT DISTINCT d.date, f.customer_id
+            FROM fact_sales f
+            JOIN dim_date d ON f.date_key = d.date_key
+            WHERE f.customer_id IS NOT NULL
+        """)
+        rows = connection.execute("SELECT COUNT(*) FROM fact_sales").fetchone()[0]
+        _set_watermark(connection, mark, _rows_up_to(connection, mark) if mark is not None else 0)
+
+        days = connection.execute("SELECT COUNT(*) FROM agg_daily_sales").fetchone()[0]
+        customers = connection.execute("SELECT COUNT(*) FROM agg_customer_ltv").fetchone()[0]
+        return RefreshReport('rebuild', rows, days, customers, mark, time.perf_counter() - start)
+
+    return _run(connection, work)
+
+
+def _history_changed(connection, mark, rows, last_rowid, check_history):
+    """Whether fact_sales no longer extends what was aggregated (see the header comment)"""
+    if (_last_rowid(connection) or 0) < (last_rowid or 0):
+        return True
+    if connection.execute(f"SELECT 1 FROM fact_sales WHERE {WATERMARK_COLUMN} = ? LIMIT 1",
+                          (mark,)).fetchone() is None:
+        return True
+    # unary + keeps SQLite on the rowid range instead of the watermark index (the whole history)
+    late = connection.execute(f"SELECT 1 FROM fact_sales WHERE rowid > ? AND +{WATERMARK_COLUMN} <= ? LIMIT 1",
+                              (last_rowid or 0, mark)).fetchone()
+    if late is not None:
+        return True
+    return check_history and _rows_up_to(connection, mark) != rows
+
+
+def refresh(connection, check_history=False):
+    """Merge the fact rows above the high-water mark into the aggregates.
+
+    Falls back to rebuild() the first time (no stored mark yet) and whenever the fact
+    table no longer extends what was aggregated; check_history=True also recounts the
+    rows at or below the mark (a full scan) to catch deletes further back.
+    """
+    state = _state(connection)
+    if state is None or state[0] is None or _history_changed(connection, *state, check_history):
+        return rebuild(connection)
+    previous_mark, previous_rows, _ = state
+
+    def work(connection):
+        start = time.perf_counter()
+        for ddl in AGGREGATE_DDL:
+            connection.execute(ddl)
+        mark = _max_watermark(connection)
+        if mark is None or mark <= previous_mark:
+            _add_new_customers(connection)
+            return RefreshReport('refresh', 0, 0, 0, previous_mark, time.perf_counter() - start)
+
+        connection.execute("DROP TABLE IF EXISTS temp.delta_sales")
+        connection.execute(f"""
+            CREATE TEMP TABLE delta_sales AS
+            SELECT f.customer_id, f.transaction_id, f.total_amount, d.date, d.month_name, d.day_name
+            FROM fact_sales f
+            JOIN dim_date d ON f.date_key = d.date_key
+            WHERE f.{WATERMARK_COLUMN} > ? AND f.{WATERMARK_COLUMN} <= ?
+        """, (previous_mark, mark))
+        new_rows = connection.execute(
+            f"SELECT COUNT(*) FROM fact_sales WHERE {WATERMARK_COLUMN} > ? AND {WATERMARK_COLUMN} <= ?",
+            (previous_mark, mark)).fetchone()[0]
+
+        # per-day customer sets first, so unique_customers can be recounted from them
+        connection.execute("""
+            INSERT INTO agg_daily_customers
+            SELECT DISTINCT date, customer_id FROM delta_sales
+            WHERE customer_id IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """)
+        connection.execute(f"""
+            INSERT INTO agg_daily_sales
+            SELECT
+                date, month_name, day_name,
+                (SELECT COUNT(*) FROM agg_daily_customers c WHERE c.date = delta.date),
+                COUNT(transaction_id),
+                SUM(total_amount)
+            FROM delta_sales delta
+            GROUP BY date, month_name, day_name
+            ON CONFLICT(date) DO UPDATE SET
+                unique_customers = excluded.unique_customers,
+                num_transactions = agg_daily_sales.num_transactions + excluded.num_transactions,
+                {_add('agg_daily_sales', 'total_revenue')}
+        """)
+        days = connection.execute("SELECT COUNT(DISTINCT date) FROM delta_sales").fetchone()[0]
+
+        _add_new_customers(connection)
+        connection.execute(f"""
+            INSERT INTO agg_customer_ltv
+            SELECT
+                c.customer_id, c.customer_segment, c.country,
+                COUNT(delta.transaction_id),
+                SUM(delta.total_amount)
+            FROM dim_customer c
+            JOIN delta_sales delta ON c.customer_id = delta.customer_id
+            GROUP BY c.customer_id, c.customer_segment, c.country
+            ON CONFLICT(customer_id) DO UPDATE SET
+                customer_segment = excluded.customer_segment,
+                country = excluded.country,
+                total_transactions = agg_customer_ltv.total_transactions + excluded.total_transactions,
+                {_add('agg_customer_ltv', 'lifetime_value')}
+        """)
+        customers = connection.execute(
+            "SELECT COUNT(DISTINCT customer_id) FROM delta_sales "
+            "WHERE customer_id IN (SELECT customer_id FROM dim_customer)").fetchone()[0]
+
+        connection.execute("DROP TABLE temp.delta_sales")
+        _set_watermark(connection, mark, previous_rows + new_rows)
+        return RefreshReport('refresh', new_rows, days, customers, mark, time.perf_counter() - start)
+
+    return _run(connection, work)
+
+
+def _add_new_customers(connection):
+    """Customers added to dim_customer since the last refresh get a zero-purchase LTV row (LEFT JOIN semantics)"""
+    connection.execute("""
+        INSERT INTO agg_customer_ltv
+        SELECT c.customer_id, c.customer_segment, c.country, 0, NULL
+        FROM dim_customer c
+        WHERE true
+        ON CONFLICT(customer_id) DO NOTHING
+    """)
+
+
+def verify(connection, tolerance=1e-9):
+    """Rows that differ between each aggregate table and a full rebuild query ({table: count}; all 0 = match).
+
+    Totals are compared with a relative tolerance: summing in load order and summing
+    the whole history at once round differently.
+    """
+    checks = {
+        'agg_daily_sales': (DAILY_SALES_SQL, 'date', ['month_name', 'day_name', 'unique_customers', 'num_transactions'],
+                            'total_revenue'),
+        'agg_customer_ltv': (CUSTOMER_LTV_SQL, 'customer_id', ['customer_segment', 'country', 'total_transactions'],
+                             'lifetime_value'),
+    }
+    mismatches = {}
+    for table, (full_sql, key, exact_columns, total) in checks.items():
+        differs = ' OR '.join([f"rebuilt.{column} IS NOT stored.{column}" for column in exact_columns] + [
+            f"(rebuilt.{total} IS NULL) <> (stored.{total} IS NULL)",
+            f"ABS(rebuilt.{total} - stored.{total}) > ? * MAX(1, ABS(rebuilt.{total}))",
+        ])
+        missing_or_different = connection.execute(f"""
+            SELECT COUNT(*) FROM ({full_sql}) rebuilt
+            LEFT JOIN {table} stored ON stored.{key} = rebuilt.{key}
+            WHERE stored.{key} IS NULL OR {differs}
+        """, (tolerance,)).fetchone()[0]
+        extra = connection.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE {key} NOT IN (SELECT {key} FROM ({full_sql}))").fetchone()[0]
+        mismatches[table] = missing_or_different + extra
+    return mismatches
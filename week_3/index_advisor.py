@@ -0,0 +1,280 @@
+import re
+import sqlite3
+
+import pandas as pd
+
+# Index advisor for the week 3 SQLite star schemas (data_warehouse.db, olap_retail.db).
+# Reads the schema (fact_* / dim_* tables and the fact -> dimension join keys), looks
+# at a registered query workload and recommends:
+#   - a key index on every dimension join column that has none (data_warehouse.db
+#     dims are plain to_sql tables, so SQLite builds an AUTOMATIC index per query),
+#   - a composite index on dimension filter columns + key (e.g. dim_date(year, month, date_key)),
+#   - a covering index per fact table and query: join keys first (filtered dimensions
+#     leading), then every other fact column the query touches, so the fact side is
+#     answered from the index without touching the table.
+# build_indexes creates what is missing and runs ANALYZE; plan_report shows which
+# workload queries still scan a whole table or a whole index (EXPLAIN QUERY PLAN).
+
+# The analytical queries from 03c_real_world_sql_data_pipelines.ipynb and
+# 03c_data_warehouse_design.ipynb, keyed by database file name.
+WORKLOADS = {
+    'data_warehouse.db': {
+        'daily_sales': """
+            SELECT d.date, d.month_name, d.day_name,
+                   COUNT(DISTINCT f.customer_id) as unique_customers,
+                   COUNT(f.transaction_id) as num_transactions,
+                   SUM(f.total_amount) as total_revenue
+            FROM fact_sales f
+            JOIN dim_date d ON f.date_key = d.date_key
+            GROUP BY d.date, d.month_name, d.day_name
+        """,
+        'customer_ltv': """
+            SELECT c.customer_id, c.customer_segment, c.country,
+                   COUNT(f.transaction_id) as total_transactions,
+                   SUM(f.total_amount) as lifetime_value
+            FROM dim_customer c
+            LEFT JOIN fact_sales f ON c.customer_id = f.customer_id
+            GROUP BY c.customer_id, c.customer_segment, c.country
+        """,
+        'total_revenue': "SELECT SUM(total_amount) as rev FROM fact_sales",
+    },
+    'olap_retail.db': {
+        'category_revenue_jan_2024': """
+            SELECT p.category_name,
+                   COUNT(DISTINCT f.order_id) as num_orders,
+                   SUM(f.quantity) as total_quantity,
+                   SUM(f.revenue) as total_revenue,
+                   SUM(f.profit) as total_profit
+            FROM fact_sales f
+            JOIN dim_product p ON f.product_key = p.product_key
+            JOIN dim_date d ON f.date_key = d.date_key
+            WHERE d.year = 2024
+              AND d.month = 1
+            GROUP BY p.category_name
+            ORDER BY total_revenue DESC
+        """,
+    },
+}
+
+_SQL_KEYWORDS = {'on', 'where', 'join', 'left', 'right', 'inner', 'outer', 'cross', 'group',
+                 'order', 'limit', 'using', 'natural', 'having', 'union'}
+
+
+def table_columns(connection, table):
+    """Column names of table in declaration order"""
+    return [row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')]
+
+
+def star_schema(connection):
+    """{fact_table: [(fact_column, dim_table, dim_column), ...]} for every fact_* table.
+
+    Declared foreign keys win; otherwise a fact column is linked to dim_<name> when
+    the dimension has a column of the same name called <name>_key or <name>_id.
+    """
+    tables = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+    dims = {table: table_columns(connection, table) for table in tables if table.startswith('dim_')}
+
+    schema = {}
+    for fact in (table for table in tables if table.startswith('fact_')):
+        columns = table_columns(connection, fact)
+        links = []
+        for row in connection.execute(f'PRAGMA foreign_key_list("{fact}")'):
+            dim_table, fact_column, dim_column = row[2], row[3], row[4]
+            if dim_table in dims:
+                links.append((fact_column, dim_table, dim_column or fact_column))
+        linked = {link[0] for link in links}
+        for dim_table, dim_columns in dims.items():
+            name = dim_table[len('dim_'):]
+            for key in (f'{name}_key', f'{name}_id'):
+                if key in dim_columns and key in columns and key not in linked:
+                    links.append((key, dim_table, key))
+                    linked.add(key)
+                    break
+        schema[fact] = links
+    return schema
+
+
+def existing_indexes(connection, table):
+    """Column tuples already indexed on table (explicit indexes plus INTEGER PRIMARY KEY)"""
+    indexed = []
+    for row in connection.execute(f'PRAGMA table_info("{table}")'):
+        if row[5] == 1 and row[2].upper() == 'INTEGER':
+            indexed.append((row[1],))
+    for row in connection.execute(f'PRAGMA index_list("{table}")'):
+        indexed.append(tuple(info[2] for info in connection.execute(f'PRAGMA index_info("{row[1]}")')))
+    return indexed
+
+
+def _aliases(sql):
+    """{alias: table} for every table in the FROM/JOIN clauses (a table is its own alias)"""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, flags=re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def referenced_columns(sql, table, columns, aliases=None):
+    """Columns of table that sql mentions, in table order"""
+    aliases = _aliases(sql) if aliases is None else aliases
+    names = [alias for alias, aliased in aliases.items() if aliased == table]
+    used = set()
+    for name in names:
+        used.update(re.findall(rf'\b{name}\.(\w+)', sql))
+    if len(set(aliases.values())) == 1:
+        # single-table query: bare column names are unambiguous
+        words = set(re.findall(r'\w+', sql))
+        used.update(column for column in columns if column in words)
+    return [column for column in columns if column in used]
+
+
+def _where_clause(sql):
+    match = re.search(r'\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)', sql,
+                      flags=re.IGNORECASE | re.DOTALL)
+    return match.group(1) if match else ''
+
+
+class IndexRecommendation:
+    """One CREATE INDEX the advisor wants, with the reason it was proposed"""
+
+    def __init__(self, table, columns, reason, unique=False):
+        self.table = table
+        self.columns = tuple(columns)
+        self.reason = reason
+        self.unique = unique
+
+    @property
+    def name(self):
+        return f"idx_{self.table}_{'_'.join(self.columns)}"
+
+    @property
+    def sql(self):
+        unique = 'UNIQUE ' if self.unique else ''
+        columns = ', '.join(f'"{column}"' for column in self.columns)
+        return f'CREATE {unique}INDEX IF NOT EXISTS "{self.name}" ON "{self.table}" ({columns})'
+
+    def __repr__(self):
+        return f"IndexRecommendation({self.table}({', '.join(self.columns)}): {self.reason})"
+
+
+def _covered(columns, indexed):
+    """True when some existing index starts with columns (so it already serves them)"""
+    return any(index[:len(columns)] == tuple(columns) for index in indexed)
+
+
+def recommend_indexes(connection, workload):
+    """IndexRecommendations for workload ({name: sql}) that no existing index already covers"""
+    schema = star_schema(connection)
+    columns = {}
+    recommendations = []
+
+    def add(table, index_columns, reason, unique=False):
+        if table not in columns:
+            columns[table] = table_columns(connection, table)
+        indexed = existing_indexes(connection, table) + [r.columns for r in recommendations if r.table == table]
+        if index_columns and not _covered(index_columns, indexed):
+            # a new, longer index makes any pending prefix of it redundant
+            recommendations[:] = [r for r in recommendations
+                                  if not (r.table == table and not r.unique
+                                          and tuple(index_columns[:len(r.columns)]) == r.columns)]
+            recommendations.append(IndexRecommendation(table, index_columns, reason, unique))
+
+    # 1. every dimension join column gets a key index
+    for fact, links in schema.items():
+        for fact_column, dim_table, dim_column in links:
+            distinct, total = connection.execute(
+                f'SELECT COUNT(DISTINCT "{dim_column}"), COUNT(*) FROM "{dim_table}"').fetchone()
+            add(dim_table, [dim_column], f'join key for {fact}.{fact_column}', unique=distinct == total)
+
+    # 2. per query: dimension filter indexes and covering fact indexes
+    for query_name, sql in workload.items():
+        aliases = _aliases(sql)
+        tables = set(aliases.values())
+        where = _where_clause(sql)
+        for fact, links in schema.items():
+            if fact not in tables:
+                continue
+            fact_columns = columns.setdefault(fact, table_columns(connection, fact))
+            leading, trailing = [], []
+            for fact_column, dim_table, dim_column in links:
+                if dim_table not in tables:
+                    continue
+                dim_columns = columns.setdefault(dim_table, table_columns(connection, dim_table))
+                filters = [column for column in referenced_columns(where, dim_table, dim_columns, aliases)
+                           if column != dim_column]
+                if filters:
+                    add(dim_table, filters + [dim_column], f'{query_name}: filter on {", ".join(filters)}')
+                    leading.append(fact_column)
+                else:
+                    trailing.append(fact_column)
+            keys = leading + trailing
+            rest = [column for column in referenced_columns(sql, fact, fact_columns, aliases) if column not in keys]
+            if not keys:
+                # no join: any index holding all the columns already lets SQLite scan it instead
+                indexed = existing_indexes(connection, fact) + [r.columns for r in recommendations if r.table == fact]
+                if any(set(rest) <= set(index) for index in indexed):
+                    continue
+            if keys or rest:
+                add(fact, keys + rest, f'{query_name}: covering index for {fact}')
+    return recommendations
+
+
+def analyze(connection, analysis_limit=1000):
+    """Refresh planner statistics; analysis_limit samples rows per index so 10M-row facts stay quick"""
+    connection.execute(f"PRAGMA analysis_limit = {analysis_limit}")
+    connection.execute("ANALYZE")
+    connection.commit()
+
+
+def build_indexes(connection, workload, run_analyze=True):
+    """Create the recommended indexes for workload, run ANALYZE and return what was created"""
+    recommendations = recommend_indexes(connection, workload)
+    for recommendation in recommendations:
+        try:
+            connection.execute(recommendation.sql)
+        except sqlite3.IntegrityError:
+            # key turned out not to be unique after all: fall back to a plain index
+            recommendation.unique = False
+            connection.execute(recommendation.sql)
+    connection.commit()
+    if run_analyze:
+        analyze(connection)
+    return recommendations
+
+
+def explain(connection, sql):
+    """EXPLAIN QUERY PLAN detail lines for sql"""
+    return [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def full_scans(plan):
+    """Plan steps that read a whole table (SCAN without an index) or build a throwaway AUTOMATIC index"""
+    return [step for step in plan
+            if (step.startswith('SCAN') and 'INDEX' not in step) or 'AUTOMATIC' in step]
+
+
+def index_scans(plan):
+    """Plan steps that read a whole index (SCAN ... USING [COVERING] INDEX).
+
+    Cheaper than a table scan, but still every entry: only SEARCH steps are index lookups.
+    """
+    return [step for step in plan
+            if step.startswith('SCAN') and 'INDEX' in step and 'AUTOMATIC' not in step]
+
+
+def plan_report(connection, workload):
+    """One row per workload query: its plan and the steps that still scan a table or a whole index"""
+    rows = []
+    for query_name, sql in workload.items():
+        plan = explain(connection, sql)
+        scans, whole_indexes = full_scans(plan), index_scans(plan)
+        rows.append({
+            'query': query_name,
+            'plan': ' | '.join(plan),
+            'full_scans': ' | '.join(scans),
+            'index_scans': ' | '.join(whole_indexes),
+            'scans': bool(scans or whole_indexes),
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,524 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from index_advisor import star_schema
+
+# In-memory OLAP engine for the week 3 star schemas (data_warehouse.db, olap_retail.db).
+#
+#   engine = OLAPEngine('olap_retail.db')
+#   engine.query(by=['year', 'category'], measures={'revenue': ('revenue', 'sum')},
+#                where={'region': 'West', 'month': [1, 2, 3]})
+#   engine.rollup(['year', 'quarter', 'month'], {'revenue': ('revenue', 'sum')})
+#
+# fact_sales is copied once into one .npy file per column under
+# .olap_cache/<database>.<fact table>/<build>/ and memory-mapped, so later sessions
+# open it without touching SQLite:
+#   - numeric columns as float64 (NULL -> NaN),
+#   - each dimension join key as the row number of the matching dimension row,
+#   - low-cardinality text columns (payment_method) as dictionary codes.
+# Dimension attributes are dictionary-encoded too (codes per dimension row), so a
+# group-by never joins: attribute codes are gathered through the join-key row numbers
+# and aggregated with np.bincount. year / quarter / month come straight from date_key.
+# Results are kept in an LRU cache; the cache and the column files are rebuilt when
+# the database file (or its -wal file) changes size or modification time. Every
+# build goes to a new versioned directory and CURRENT is switched to it, so files
+# another engine still has memory-mapped are never overwritten (Windows cannot delete
+# mapped files); superseded builds are removed once nothing maps them any more.
+
+CACHE_DIR = '.olap_cache'
+BUILD_SUFFIX = '.tmp'
+DEFAULT_BATCH_SIZE = 250_000
+DEFAULT_CACHE_SIZE = 128
+
+# Text fact columns with more distinct values than this (e.g. transaction_date) are not cached
+MAX_DEGENERATE_CARDINALITY = 4096
+
+# Group-bys with at most this many possible key combinations use a dense bincount;
+# above it the present combinations are found with np.unique first
+DENSE_GROUP_LIMIT = 1 << 22
+
+# Date hierarchy derived from date_key (YYYYMMDD)
+DATE_LEVELS = {
+    'year': lambda date_key: date_key // 10000,
+    'quarter': lambda date_key: (date_key // 100 % 100 - 1) // 3 + 1,
+    'month': lambda date_key: date_key // 100 % 100,
+}
+
+# Names used in the notebooks for the same attribute in the two warehouses
+LEVEL_ALIASES = {'category': 'category_name', 'segment': 'customer_segment'}
+
+AGGREGATIONS = ('sum', 'count', 'mean', 'min', 'max', 'nunique')
+
+
+def _affinity(declared):
+    """SQLite column affinity for a declared type"""
+    declared = (declared or '').upper()
+    if 'INT' in declared:
+        return 'INTEGER'
+    if 'CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared:
+        return 'TEXT'
+    if declared == '' or 'BLOB' in declared:
+        return 'BLOB'
+    if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        return 'REAL'
+    return 'NUMERIC'
+
+
+def file_signature(database):
+    """(size, mtime_ns) of the database file and its -wal file; changes on every commit"""
+    signature = []
+    for path in (database, database + '-wal'):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature.append([stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def new_build(directory):
+    """Empty directory for a new column-file build under directory (published with publish_build)"""
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, f'build-{time.time_ns()}-{os.getpid()}{BUILD_SUFFIX}')
+    os.makedirs(target)
+    return target
+
+
+def publish_build(directory, target):
+    """Rename a finished build to its version name and point CURRENT at it; returns its path"""
+    version = os.path.basename(target)[:-len(BUILD_SUFFIX)]
+    os.rename(target, os.path.join(directory, version))
+    pointer = os.path.join(directory, f'CURRENT{BUILD_SUFFIX}-{os.getpid()}')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, 'CURRENT'))
+    return os.path.join(directory, version)
+
+
+def current_build(directory):
+    """Path of the build CURRENT points to, or None"""
+    try:
+        with open(os.path.join(directory, 'CURRENT')) as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(directory, version)
+    return path if version and os.path.isdir(path) else None
+
+
+def remove_stale_builds(directory):
+    """Delete every build but the current one (and builds in progress); mapped ones are retried next time"""
+    current = current_build(directory)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name == 'CURRENT' or BUILD_SUFFIX in name or path == current:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)   # a column file of the old single-directory layout
+            except OSError:
+                pass
+
+
+def _encode(values):
+    """Dictionary-encode values: (int32 codes, categories), NULL is its own last category"""
+    codes, categories = pd.factorize(np.asarray(values, dtype=object), sort=True)
+    categories = list(categories)
+    if (codes < 0).any():
+        codes[codes < 0] = len(categories)
+        categories.append(None)
+    return codes.astype(np.int32), categories
+
+
+def _encode_numbers(values):
+    """Encode float values holding integers as offsets from their minimum (NaN -> last code)"""
+    finite = ~np.isnan(values)
+    if not finite.any():
+        return np.zeros(len(values), dtype=np.int64), np.array([None], dtype=object)
+    numbers = np.where(finite, values, 0).astype(np.int64)
+    low, high = numbers[finite].min(), numbers[finite].max()
+    codes = np.where(finite, numbers - low, high - low + 1)
+    categories = np.arange(low, high + 2).astype(object)
+    categories[-1] = None
+    return codes, categories
+
+
+def _category_matches(value, condition):
+    if isinstance(condition, slice):
+        return (value is not None and (condition.start is None or value >= condition.start)
+                and (condition.stop is None or value <= condition.stop))
+    if isinstance(condition, (list, tuple, set, frozenset)):
+        return value in condition
+    return value == condition
+
+
+def _column_matches(values, condition):
+    if isinstance(condition, slice):
+        mask = np.ones(len(values), dtype=bool)
+        if condition.start is not None:
+            mask &= values >= condition.start
+        if condition.stop is not None:
+            mask &= values <= condition.stop
+        return mask
+    if isinstance(condition, (list, tuple, set, frozenset)):
+        return np.isin(values, list(condition))
+    return values == condition
+
+
+def _freeze(condition):
+    if isinstance(condition, slice):
+        return ('slice', condition.start, condition.stop)
+    if isinstance(condition, (list, tuple, set, frozenset)):
+        return ('in', tuple(sorted(condition, key=repr)))
+    return ('eq', condition)
+
+
+class OLAPEngine:
+    """Group-by / slice / dice / roll-up over a memory-mapped copy of one fact table"""
+
+    def __init__(self, database, fact_table='fact_sales', cache_dir=None, cache_size=DEFAULT_CACHE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.database = os.path.abspath(database)
+        self.fact_table = fact_table
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(self.database), CACHE_DIR)
+        self.directory = os.path.join(cache_dir, f'{os.path.basename(self.database)}.{fact_table}')
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.signature = None
+        self.build = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.load_seconds = 0.0
+        self._results = OrderedDict()
+        self.refresh()
+
+    # -- column store ---------------------------------------------------------
+
+    def refresh(self):
+        """Reopen (rebuilding the column files if needed) when the database has changed"""
+        signature = file_signature(self.database)
+        if signature == self.signature:
+            return False
+        start = time.perf_counter()
+        self._results.clear()
+        connection = sqlite3.connect(f'file:{self.database}?mode=ro', uri=True, isolation_level=None)
+        try:
+            # dimensions and facts are read from one snapshot
+            connection.execute("BEGIN")
+            self._load_dimensions(connection)
+            manifest = self._read_manifest()
+            if manifest is None or manifest['signature'] != signature:
+                self._release_columns()
+                manifest = self._build(connection, signature)
+                self.rebuilds += 1
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        self._release_columns()
+        self.rows = manifest['rows']
+        self.columns = {name: np.load(os.path.join(self.build, f'{name}.npy'), mmap_mode='r')
+                        for name in manifest['numeric']}
+        self.join_rows = {name: np.load(os.path.join(self.build, f'{name}.rows.npy'), mmap_mode='r')
+                          for name in manifest['joins']}
+        self.text_codes = {name: (np.load(os.path.join(self.build, f'{name}.codes.npy'), mmap_mode='r'),
+                                  np.array(categories, dtype=object))
+                           for name, categories in manifest['text'].items()}
+        self._register_levels()
+        self.signature = signature
+        remove_stale_builds(self.directory)
+        self.load_seconds = time.perf_counter() - start
+        return True
+
+    def _release_columns(self):
+        """Drop this engine's memory maps of the current build"""
+        self.columns, self.join_rows, self.text_codes = {}, {}, {}
+
+    def _read_manifest(self):
+        self.build = current_build(self.directory)
+        if self.build is None or not os.path.exists(os.path.join(self.build, 'manifest.json')):
+            return None
+        with open(os.path.join(self.build, 'manifest.json')) as f:
+            return json.load(f)
+
+    def _load_dimensions(self, connection):
+        """{fact_column: (dim_table, key row lookup, {attribute: (codes, categories)})}"""
+        self.dimensions = {}
+        for fact_column, dim_table, dim_column in star_schema(connection).get(self.fact_table, []):
+            frame = pd.read_sql(f'SELECT * FROM "{dim_table}"', connection)
+            keys = pd.Index(frame[dim_column])
+            first = ~keys.duplicated()
+            attributes = {dim_column: (np.arange(len(frame), dtype=np.int32), list(frame[dim_column]))}
+            for column in frame.columns:
+                if column != dim_column:
+                    attributes[column] = _encode(frame[column])
+            self.dimensions[fact_column] = (dim_table, (keys[first], np.flatnonzero(first)), attributes)
+
+    def _build(self, connection, signature):
+        """Copy the fact table into a new build of .npy column files; returns the manifest"""
+        target = new_build(self.directory)
+        try:
+            manifest = self._write_columns(connection, target, signature)
+        except BaseException:
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+        self.build = publish_build(self.directory, target)
+        return manifest
+
+    def _write_columns(self, connection, target, signature):
+        info = list(connection.execute(f'PRAGMA table_info("{self.fact_table}")'))
+        numeric = [row[1] for row in info if _affinity(row[2]) != 'TEXT']
+        text = [row[1] for row in info if _affinity(row[2]) == 'TEXT' and row[1] not in self.dimensions]
+        joins = list(self.dimensions)
+        rows = connection.execute(f'SELECT COUNT(*) FROM "{self.fact_table}"').fetchone()[0]
+
+        def open_column(name, dtype):
+            return np.lib.format.open_memmap(os.path.join(target, name), mode='w+', dtype=dtype, shape=(rows,))
+
+        numeric_files = {name: open_column(f'{name}.npy', np.float64) for name in numeric}
+        join_files = {name: open_column(f'{name}.rows.npy', np.int32) for name in joins}
+        text_files = {name: open_column(f'{name}.codes.npy', np.int32) for name in text}
+        dictionaries = {name: {} for name in text}
+
+        columns = ', '.join(f'"{name}"' for name in dict.fromkeys(numeric + joins + text))
+        offset = 0
+        for chunk in pd.read_sql(f'SELECT {columns} FROM "{self.fact_table}"', connection, chunksize=self.batch_size):
+            end = offset + len(chunk)
+            for name, array in numeric_files.items():
+                array[offset:end] = pd.to_numeric(chunk[name], errors='coerce').to_numpy(np.float64)
+            for name, array in join_files.items():
+                keys, positions = self.dimensions[name][1]
+                found = keys.get_indexer(chunk[name])
+                array[offset:end] = np.where(found >= 0, positions[found], -1)
+            for name in list(text_files):
+                codes, uniques = pd.factorize(chunk[name], use_na_sentinel=False)
+                uniques = [None if pd.isna(value) else value for value in uniques]
+                dictionary = dictionaries[name]
+                for value in uniques:
+                    dictionary.setdefault(value, len(dictionary))
+                if len(dictionary) > MAX_DEGENERATE_CARDINALITY:
+                    # a timestamp or free text, not a dimension
+                    del text_files[name], dictionaries[name]
+                    continue
+                text_files[name][offset:end] = np.array([dictionary[value] for value in uniques], dtype=np.int32)[codes]
+            offset = end
+
+        for array in [*numeric_files.values(), *join_files.values(), *text_files.values()]:
+            array.flush()
+        for name in text:
+            if name not in text_files:
+                os.remove(os.path.join(target, f'{name}.codes.npy'))
+        manifest = {
+            'signature': signature,
+            'rows': offset,
+            'numeric': numeric,
+            'joins': joins,
+            'text': {name: list(dictionary) for name, dictionary in dictionaries.items()},
+        }
+        with open(os.path.join(target, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        del numeric_files, join_files, text_files
+        return manifest
+
+    def _register_levels(self):
+        """Name -> how to get its codes; ambiguous attribute names only as <dimension>.<column>"""
+        self.levels = {}
+        seen = {}
+        for fact_column, (dim_table, _, attributes) in self.dimensions.items():
+            for column in attributes:
+                qualified = f"{dim_table[len('dim_'):]}.{column}"
+                self.levels[qualified] = ('dim', fact_column, column)
+                seen.setdefault(column, []).append(qualified)
+        for column, qualified in seen.items():
+            if len(qualified) == 1:
+                self.levels[column] = self.levels[qualified[0]]
+        for name in self.text_codes:
+            self.levels.setdefault(name, ('text', name))
+        if 'date_key' in self.columns:
+            for name in DATE_LEVELS:
+                self.levels[name] = ('date', name)
+
+    def level_names(self):
+        """Every name usable in by= and where="""
+        return sorted(self.levels)
+
+    def _level(self, name):
+        if name not in self.levels and LEVEL_ALIASES.get(name) in self.levels:
+            name = LEVEL_ALIASES[name]
+        if name not in self.levels:
+            raise KeyError(f"unknown level {name!r}; available: {', '.join(self.level_names())}")
+        return self.levels[name]
+
+    def _codes(self, name, rows=None):
+        """(codes of the selected fact rows, categories) for a level; rows=None selects all"""
+        level = self._level(name)
+        if level[0] == 'dim':
+            _, fact_column, column = level
+            codes, categories = self.dimensions[fact_column][2][column]
+            # row number -1 (no matching dimension row) picks the appended None category
+            codes = np.append(codes, len(categories))
+            categories = np.array(list(categories) + [None], dtype=object)
+            join_rows = self.join_rows[fact_column]
+            return codes[join_rows if rows is None else join_rows[rows]], categories
+        if level[0] == 'text':
+            codes, categories = self.text_codes[level[1]]
+            return np.asarray(codes if rows is None else codes[rows]), categories
+        date_key = self.columns['date_key']
+        return _encode_numbers(DATE_LEVELS[level[1]](np.asarray(date_key if rows is None else date_key[rows])))
+
+    # -- queries ----------------------------------------------------------------
+
+    def _selection(self, where):
+        """Fact row numbers matching every condition (None = all rows)"""
+        if not where:
+            return None
+        mask = np.ones(self.rows, dtype=bool)
+        for name, condition in where.items():
+            if name in self.columns:
+                mask &= _column_matches(self.columns[name], condition)
+            else:
+                codes, categories = self._codes(name)
+                allowed = np.array([_category_matches(value, condition) for value in categories], dtype=bool)
+                mask &= allowed[codes]
+        return np.flatnonzero(mask)
+
+    def _groups(self, by, rows):
+        """(group id per selected row, number of ids, ids present, {level: labels of present ids})"""
+        n = self.rows if rows is None else len(rows)
+        if not by:
+            return np.zeros(n, dtype=np.int64), 1, np.array([0]), {}
+        codes, categories = zip(*(self._codes(name, rows) for name in by))
+        shape = tuple(len(level_categories) for level_categories in categories)
+        combinations = int(np.prod(shape, dtype=object))
+        if combinations <= DENSE_GROUP_LIMIT:
+            ids = np.ravel_multi_index(codes, shape)
+            n_groups = combinations
+            present = np.flatnonzero(np.bincount(ids, minlength=n_groups))
+            keys = np.unravel_index(present, shape)
+        elif combinations < 2**62:
+            keys, ids = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+            n_groups = len(keys)
+            present = np.arange(n_groups)
+            keys = np.unravel_index(keys, shape)
+        else:
+            keys, ids = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+            n_groups = len(keys)
+            present = np.arange(n_groups)
+            keys = keys.T
+        labels = {name: level_categories[key] for name, level_categories, key in zip(by, categories, keys)}
+        return ids.reshape(-1), n_groups, present, labels
+
+    def _aggregate(self, column, how, ids, n_groups, rows):
+        """One measure for every group id"""
+        if how not in AGGREGATIONS:
+            raise ValueError(f"aggregation must be one of {AGGREGATIONS}, not {how!r}")
+        if column in (None, '*'):
+            if how != 'count':
+                raise ValueError(f"{how!r} needs a column")
+            return np.bincount(ids, minlength=n_groups)
+
+        categories = None
+        if how == 'nunique' and (column in self.levels or column in LEVEL_ALIASES):
+            # dictionary codes (e.g. customer_id -> dim_customer row) are small and dense
+            values, categories = self._codes(column, rows)
+            valid = np.array([value is not None for value in categories], dtype=bool)[values]
+        elif column in self.columns:
+            values = np.asarray(self.columns[column] if rows is None else self.columns[column][rows])
+            valid = ~np.isnan(values)
+        elif how == 'count':
+            values, categories = self._codes(column, rows)
+            valid = np.array([value is not None for value in categories], dtype=bool)[values]
+        else:
+            raise KeyError(f"{column!r} is not a numeric column of {self.fact_table}")
+
+        if how == 'count':
+            return np.bincount(ids[valid], minlength=n_groups)
+        if how == 'nunique':
+            group, values = ids[valid], values[valid]
+            if categories is not None and n_groups * len(categories) <= DENSE_GROUP_LIMIT:
+                seen = np.bincount(group * len(categories) + values, minlength=n_groups * len(categories))
+                return (seen.reshape(n_groups, len(categories)) > 0).sum(axis=1)
+            order = np.lexsort((values, group))
+            group, values = group[order], values[order]
+            first = np.ones(len(group), dtype=bool)
+            first[1:] = (group[1:] != group[:-1]) | (values[1:] != values[:-1])
+            return np.bincount(group[first], minlength=n_groups)
+
+        counts = np.bincount(ids[valid], minlength=n_groups)
+        if how in ('sum', 'mean'):
+            sums = np.bincount(ids, weights=np.where(valid, values, 0.0), minlength=n_groups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = sums if how == 'sum' else sums / counts
+            # SQL semantics: no non-NULL values -> NULL
+            return np.where(counts > 0, result, np.nan)
+
+        group, values = ids[valid], values[valid]
+        order = np.argsort(group, kind='stable')
+        group, values = group[order], values[order]
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if len(group) else np.array([], dtype=np.int64)
+        result = np.full(n_groups, np.nan)
+        reduce = np.fmin if how == 'min' else np.fmax
+        if len(starts):
+            result[group[starts]] = reduce.reduceat(values, starts)
+        return result
+
+    def query(self, by=(), measures=None, where=None):
+        """Aggregate fact rows grouped by levels; returns a DataFrame with one row per group present.
+
+        by       level names: dimension attributes (category_name, region, customer_segment,
+                 day_name, ...; <dimension>.<column> when ambiguous), text fact columns
+                 (payment_method) and year / quarter / month
+        measures {output: (column, aggregation)} with aggregation in sum, count, mean, min,
+                 max, nunique; (None, 'count') counts rows. Default: {'rows': (None, 'count')}
+        where    {level or numeric fact column: value | [values] | slice(low, high)} ANDed;
+                 a single value slices, lists and inclusive slices dice
+        """
+        self.refresh()
+        by = [by] if isinstance(by, str) else list(by)
+        measures = measures or {'rows': (None, 'count')}
+        where = where or {}
+        key = (tuple(by), tuple((name, tuple(spec)) for name, spec in measures.items()),
+               tuple(sorted((name, _freeze(condition)) for name, condition in where.items())))
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return self._results[key].copy()
+        self.misses += 1
+
+        rows = self._selection(where)
+        ids, n_groups, present, labels = self._groups(by, rows)
+        data = dict(labels)
+        for name, (column, how) in measures.items():
+            data[name] = self._aggregate(column, how, ids, n_groups, rows)[present]
+        result = pd.DataFrame(data)
+        if by:
+            result = result.sort_values(by, na_position='last', ignore_index=True)
+
+        self._results[key] = result
+        if len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return result.copy()
+
+    def rollup(self, levels, measures=None, where=None):
+        """SQL GROUP BY ROLLUP(levels): every prefix of levels, subtotal rows have None in the rolled-up levels"""
+        levels = list(levels)
+        parts = []
+        for depth in range(len(levels), -1, -1):
+            part = self.query(levels[:depth], measures, where)
+            for name in levels[depth:]:
+                part[name] = None
+            parts.append(part[levels + [column for column in part.columns if column not in levels]])
+        return pd.concat(parts, ignore_index=True)
+
+    def cache_info(self):
+        """LRU result cache statistics"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._results),
+                'max_entries': self.cache_size, 'rebuilds': self.rebuilds}
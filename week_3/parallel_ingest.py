@@ -0,0 +1,201 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from csv_loader import DEFAULT_CHUNKSIZE, chunk_rows, clean_chunk, prepare_table, schema_for, tune_connection
+
+# Parallel multi-file CSV ingestion for the warehouse build.
+# Parsing and cleaning are CPU-bound and independent per file, so they run in a
+# ProcessPoolExecutor. SQLite allows one writer at a time, so every write goes
+# through a single writer thread that owns the only write connection.
+#
+#   workers (processes)  --results-->  main thread  --bounded queue-->  writer thread  -->  SQLite
+#
+# Back-pressure: at most max_pending files are being parsed at once, and the main
+# thread blocks on the writer queue when the writer falls behind.
+
+
+def parse_file(csv_file, table_name, clean=True, chunksize=DEFAULT_CHUNKSIZE, spill_dir=None):
+    """Worker: parse and clean one CSV.
+
+    Each cleaned chunk comes back either as a dict of NumPy column buffers or, when
+    spill_dir is given, as the path of a Parquet temp file (keeps large files out of
+    the inter-process pipe; needs pyarrow).
+    """
+    start = time.perf_counter()
+    schema = schema_for(csv_file)
+    dates = schema.get('dates', [])
+    cleaning_log = {}
+    parts = []
+    rows_read = 0
+
+    try:
+        for i, chunk in enumerate(pd.read_csv(csv_file, dtype=schema.get('dtypes'), parse_dates=dates or False,
+                                              chunksize=chunksize)):
+            rows_read += len(chunk)
+            if clean:
+                chunk = clean_chunk(chunk, cleaning_log)
+            if spill_dir is not None:
+                path = os.path.join(spill_dir, f'{table_name}_{uuid.uuid4().hex}_{i:05d}.parquet')
+                parts.append(('parquet', path))
+                chunk.to_parquet(path, index=False)
+            else:
+                parts.append(('numpy', {column: chunk[column].to_numpy() for column in chunk.columns}))
+    except Exception:
+        _discard_parts(parts)
+        raise
+
+    return {
+        'csv_file': csv_file,
+        'table_name': table_name,
+        'parts': parts,
+        'rows_read': rows_read,
+        'cleaning_log': cleaning_log,
+        'parse_seconds': time.perf_counter() - start,
+    }
+
+
+def _part_frame(part):
+    kind, payload = part
+    if kind == 'parquet':
+        frame = pd.read_parquet(payload)
+        os.remove(payload)
+        return frame
+    return pd.DataFrame(payload)
+
+
+def _discard_parts(parts):
+    """Remove the spill files of parts that were never written to SQLite"""
+    for kind, payload in parts:
+        if kind == 'parquet' and os.path.exists(payload):
+            os.remove(payload)
+
+
+class SQLiteWriter(threading.Thread):
+    """The single writer: one connection, one transaction per file"""
+
+    _DONE = object()
+
+    def __init__(self, database, queue_size=4, if_exists='replace'):
+        super().__init__(name='sqlite-writer', daemon=True)
+        self.database = database
+        self.if_exists = if_exists
+        self.results = queue.Queue(maxsize=queue_size)
+        self.reports = []
+        self.error = None
+
+    def submit(self, parsed):
+        """Queue a parse_file result; blocks while the queue is full (back-pressure)"""
+        if self.error is not None:
+            raise self.error
+        self.results.put(parsed)
+
+    def close(self):
+        """Flush the queue, stop the thread and return the per-file reports"""
+        self.results.put(self._DONE)
+        self.join()
+        if self.error is not None:
+            raise self.error
+        return self.reports
+
+    def run(self):
+        connection = sqlite3.connect(self.database, isolation_level=None)
+        tune_connection(connection)
+        try:
+            while True:
+                parsed = self.results.get()
+                if parsed is self._DONE:
+                    break
+                if self.error is None:
+                    try:
+                        self.reports.append(self._write(connection, parsed))
+                    except Exception as error:  # surfaced to the main thread on next submit/close
+                        self.error = error
+                if self.error is not None:
+                    _discard_parts(parsed['parts'])
+        finally:
+            connection.close()
+
+    def _write(self, connection, parsed):
+        start = time.perf_counter()
+        rows_written = 0
+        connection.execute("BEGIN")
+        try:
+            insert_sql = None
+            for part in parsed['parts']:
+                frame = _part_frame(part)
+                if insert_sql is None:
+                    insert_sql = prepare_table(connection, parsed['table_name'], frame, self.if_exists)
+                connection.executemany(insert_sql, chunk_rows(frame))
+                rows_written += len(frame)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return IngestReport(parsed, rows_written, time.perf_counter() - start)
+
+
+class IngestReport:
+    """Parse (worker) and write (writer thread) timings for one file"""
+
+    def __init__(self, parsed, rows_written, write_seconds):
+        self.csv_file = parsed['csv_file']
+        self.table_name = parsed['table_name']
+        self.rows_read = parsed['rows_read']
+        self.cleaning_log = parsed['cleaning_log']
+        self.parse_seconds = parsed['parse_seconds']
+        self.rows_written = rows_written
+        self.write_seconds = write_seconds
+
+    def __str__(self):
+        return (f"{self.table_name}: {self.rows_written:,} rows "
+                f"(parse {self.parse_seconds:.2f}s, write {self.write_seconds:.2f}s)")
+
+
+def ingest_files(csv_files, database, workers=None, max_pending=None, queue_size=4,
+                 clean=True, chunksize=DEFAULT_CHUNKSIZE, spill_dir=None, if_exists='replace'):
+    """Parse [(csv_file, table_name), ...] in a process pool and write them through one SQLite writer.
+
+    workers defaults to os.cpu_count(); max_pending (files being parsed at once)
+    defaults to 2 * workers. Returns IngestReports in completion order.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    writer = SQLiteWriter(database, queue_size=queue_size, if_exists=if_exists)
+    writer.start()
+    futures, submitted = [], set()
+
+    def hand_over(future):
+        writer.submit(future.result())
+        submitted.add(future)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for csv_file, table_name in csv_files:
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        hand_over(future)
+                future = pool.submit(parse_file, csv_file, table_name, clean, chunksize, spill_dir)
+                pending.add(future)
+                futures.append(future)
+
+            for future in wait(pending).done:
+                hand_over(future)
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass  # the first error is the one that propagates
+        for future in futures:
+            if future not in submitted and not future.cancelled() and future.exception() is None:
+                _discard_parts(future.result()['parts'])
+        raise
+    return writer.close()
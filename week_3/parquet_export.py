@@ -0,0 +1,273 @@
+import os
+import shutil
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Columnar export of the warehouse (data_warehouse.db / olap_retail.db) to Parquet.
+#
+#   warehouse_export/parquet/<table>/part-0.parquet               dimensions and aggregates
+#   warehouse_export/parquet/fact_sales/month=YYYYMM/part-0.parquet   facts, one partition per month
+#
+# Columns keep real types (int64 / float64 / timestamp / string, dictionary-encoded on
+# disk) and every row group carries min/max/null statistics, so read_table() can skip
+# whole partitions and row groups for a filter and read only the projected columns.
+# Each fact file also stores the sum of every measure in its footer (key-value
+# metadata), so metadata_summary() and write_summary() produce summary.txt figures
+# like Total Revenue from footers alone, without reading any column data.
+
+DEFAULT_EXPORT_DIR = os.path.join('warehouse_export', 'parquet')
+DEFAULT_BATCH_SIZE = 100_000
+ROW_GROUP_SIZE = 128_000
+COMPRESSION = 'zstd'
+
+FACT_TABLES = ['fact_sales']
+PARTITION_COLUMN = 'month'
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+# Stored as TEXT by to_sql but really timestamps
+TIMESTAMP_COLUMNS = {'date', 'registration_date', 'transaction_date', 'created_date', 'order_date', 'ship_date'}
+
+# Columns that are keys, not additive measures, even though they are numeric
+KEY_SUFFIXES = ('_id', '_key')
+
+SUM_PREFIX = 'sum:'
+
+
+def arrow_type(declared, column):
+    """Arrow type for a SQLite column from its declared type (SQLite affinity rules)"""
+    declared = (declared or '').upper()
+    if column in TIMESTAMP_COLUMNS or 'DATE' in declared or 'TIME' in declared:
+        return pa.timestamp('s')
+    if 'INT' in declared:
+        return pa.int64()
+    if 'CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared:
+        return pa.string()
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB', 'DEC', 'NUM')):
+        return pa.float64()
+    return pa.string()
+
+
+def table_schema(connection, table):
+    """Arrow schema for a SQLite table"""
+    return pa.schema([pa.field(row[1], arrow_type(row[2], row[1])) for row in connection.execute(f'PRAGMA table_info("{table}")')])
+
+
+def measure_columns(schema):
+    """Numeric non-key columns whose per-file sums go into the footer"""
+    return [field.name for field in schema
+            if (pa.types.is_integer(field.type) or pa.types.is_floating(field.type))
+            and not field.name.endswith(KEY_SUFFIXES) and field.name != PARTITION_COLUMN]
+
+
+def _column(values, field):
+    if pa.types.is_timestamp(field.type):
+        # ISO 8601 text ('2024-01-31' or '2024-01-31 00:00:00') -> timestamp
+        return pc.cast(pa.array(values, pa.string()), field.type)
+    return pa.array(values, field.type)
+
+
+def record_batches(connection, table, schema, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream a SQLite table as RecordBatches of at most batch_size rows"""
+    columns = ', '.join(f'"{name}"' for name in schema.names)
+    cursor = connection.execute(f'SELECT {columns} FROM "{table}"')
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        values = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays([_column(values[i], field) for i, field in enumerate(schema)], schema=schema)
+
+
+class _PartFile:
+    """One Parquet file being written, with running measure sums for its footer"""
+
+    def __init__(self, path, schema, measures):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.writer = pq.ParquetWriter(path, schema, compression=COMPRESSION, write_statistics=True)
+        self.measures = measures
+        self.sums = dict.fromkeys(measures, 0)
+        self.pending = []
+        self.pending_rows = 0
+        self.rows = 0
+
+    def add(self, batch):
+        for name in self.measures:
+            total = pc.sum(batch.column(name)).as_py()
+            if total is not None:
+                self.sums[name] += total
+        self.pending.append(batch)
+        self.pending_rows += batch.num_rows
+        self.rows += batch.num_rows
+        if self.pending_rows >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_table(pa.Table.from_batches(self.pending), row_group_size=ROW_GROUP_SIZE)
+            self.pending = []
+            self.pending_rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.add_key_value_metadata({f'{SUM_PREFIX}{name}': repr(total) for name, total in self.sums.items()})
+        self.writer.close()
+        return os.path.getsize(self.path)
+
+
+class ExportReport:
+    """Rows, files and bytes written for one exported table"""
+
+    def __init__(self, table, rows, files, size_bytes, seconds):
+        self.table = table
+        self.rows = rows
+        self.files = files
+        self.size_bytes = size_bytes
+        self.seconds = seconds
+
+    def __str__(self):
+        return (f"{self.table}: {self.rows:,} rows -> {self.files} file(s), "
+                f"{self.size_bytes / 2**20:.2f} MB in {self.seconds:.2f}s")
+
+
+def export_table(connection, table, directory=DEFAULT_EXPORT_DIR, batch_size=DEFAULT_BATCH_SIZE):
+    """Export one table; fact tables are partitioned by month (date_key // 100). Returns an ExportReport."""
+    start = time.perf_counter()
+    schema = table_schema(connection, table)
+    target = os.path.join(directory, table)
+    shutil.rmtree(target, ignore_errors=True)
+    measures = measure_columns(schema)
+    partitioned = table in FACT_TABLES and 'date_key' in schema.names
+
+    files = {}
+    for batch in record_batches(connection, table, schema, batch_size):
+        if not partitioned:
+            if None not in files:
+                files[None] = _PartFile(os.path.join(target, 'part-0.parquet'), schema, measures)
+            files[None].add(batch)
+            continue
+        # split the batch by month: one filter() per month present in it
+        months = pc.divide(batch.column('date_key'), 100)
+        for month in pc.unique(months).to_pylist():
+            if month not in files:
+                # rows without a date_key go to the partition pyarrow reads back as null
+                label = NULL_PARTITION if month is None else month
+                path = os.path.join(target, f'{PARTITION_COLUMN}={label}', 'part-0.parquet')
+                files[month] = _PartFile(path, schema, measures)
+            rows = pc.is_null(months) if month is None else pc.equal(months, month)
+            files[month].add(batch.filter(rows))
+    if not files:
+        files[None] = _PartFile(os.path.join(target, 'part-0.parquet'), schema, measures)
+
+    size = sum(part.close() for part in files.values())
+    rows = sum(part.rows for part in files.values())
+    return ExportReport(table, rows, len(files), size, time.perf_counter() - start)
+
+
+def export_warehouse(connection, directory=DEFAULT_EXPORT_DIR, tables=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Export tables (default: every dim_*, fact_* and agg_* table) and return their ExportReports"""
+    if tables is None:
+        tables = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND "
+            "(name LIKE 'dim\\_%' ESCAPE '\\' OR name LIKE 'fact\\_%' ESCAPE '\\' OR name LIKE 'agg\\_%' ESCAPE '\\') "
+            "ORDER BY name")]
+    return [export_table(connection, table, directory, batch_size) for table in tables]
+
+
+def _partition_filters(filters):
+    """Add month partition filters implied by date_key filters, so whole partitions are skipped"""
+    implied = []
+    for column, op, value in filters:
+        if column != 'date_key':
+            continue
+        month = value // 100
+        if op in ('>', '>='):
+            implied.append((PARTITION_COLUMN, '>=', month))
+        elif op in ('<', '<='):
+            implied.append((PARTITION_COLUMN, '<=', month))
+        elif op in ('=', '=='):
+            implied.append((PARTITION_COLUMN, '==', month))
+    return implied
+
+
+def read_arrow(table, directory=DEFAULT_EXPORT_DIR, columns=None, filters=None):
+    """Read an exported table as a pyarrow Table.
+
+    columns projects (only those column chunks are read); filters is a list of
+    (column, op, value) tuples ANDed together, pushed down to partition pruning and
+    row-group statistics, e.g. [('date_key', '>=', 20240101), ('total_amount', '>', 100)].
+    """
+    path = os.path.join(directory, table)
+    if filters:
+        filters = list(filters)
+        if table in FACT_TABLES:
+            filters += _partition_filters(filters)
+    result = pq.read_table(path, columns=columns, filters=filters or None, partitioning='hive')
+    if columns is None and PARTITION_COLUMN in result.column_names and table in FACT_TABLES:
+        result = result.drop_columns([PARTITION_COLUMN])
+    return result
+
+
+def read_table(table, directory=DEFAULT_EXPORT_DIR, columns=None, filters=None):
+    """read_arrow() as a pandas DataFrame"""
+    return read_arrow(table, directory, columns, filters).to_pandas()
+
+
+def _parquet_files(path):
+    for root, _, names in os.walk(path):
+        for name in sorted(names):
+            if name.endswith('.parquet'):
+                yield os.path.join(root, name)
+
+
+def metadata_summary(table, directory=DEFAULT_EXPORT_DIR):
+    """Row count, measure sums and per-column min/max for an exported table, read from footers only"""
+    summary = {'rows': 0, 'files': 0, 'sums': {}, 'min': {}, 'max': {}}
+    for path in _parquet_files(os.path.join(directory, table)):
+        metadata = pq.read_metadata(path)
+        summary['files'] += 1
+        summary['rows'] += metadata.num_rows
+        for key, value in (metadata.metadata or {}).items():
+            key = key.decode()
+            if key.startswith(SUM_PREFIX):
+                name = key[len(SUM_PREFIX):]
+                summary['sums'][name] = summary['sums'].get(name, 0) + float(value.decode())
+        for group in range(metadata.num_row_groups):
+            row_group = metadata.row_group(group)
+            for i in range(row_group.num_columns):
+                chunk = row_group.column(i)
+                statistics = chunk.statistics
+                if statistics is None or not statistics.has_min_max:
+                    continue
+                name = chunk.path_in_schema
+                if name not in summary['min'] or statistics.min < summary['min'][name]:
+                    summary['min'][name] = statistics.min
+                if name not in summary['max'] or statistics.max > summary['max'][name]:
+                    summary['max'][name] = statistics.max
+    return summary
+
+
+def write_summary(directory=DEFAULT_EXPORT_DIR, path=os.path.join('warehouse_export', 'summary.txt'),
+                  database='data_warehouse.db', fact_table='fact_sales', revenue_column='total_amount',
+                  customer_table='dim_customer'):
+    """summary.txt from Parquet footers (no column data is read); returns the text"""
+    facts = metadata_summary(fact_table, directory)
+    customers = metadata_summary(customer_table, directory)
+    first, last = facts['min'].get('date_key'), facts['max'].get('date_key')
+    summary = f"""
+DATA WAREHOUSE SUMMARY
+{'='*30}
+Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}
+
+Total Revenue: ${facts['sums'].get(revenue_column, 0):,.2f}
+Total Customers: {customers['rows']:,}
+Transactions: {facts['rows']:,} ({first} - {last}, {facts['files']} monthly partitions)
+Database: {database}
+"""
+    with open(path, 'w') as f:
+        f.write(summary)
+    return summary
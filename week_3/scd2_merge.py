@@ -0,0 +1,492 @@
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import tune_connection
+
+# Type-2 slowly changing dimension merge for dim_customer / dim_product in olap_retail.db,
+# instead of rebuilding them with to_sql(if_exists='replace') (history lost, every row
+# rewritten) or 'append' (duplicate members).
+#
+#   dimension = open_dimension('olap_retail.db', 'dim_customer')
+#   dimension.prepare()                        once: adds valid_from / valid_to / is_current /
+#                                              row_hash / type1_hash, keeps existing surrogate keys
+#   report = dimension.merge(snapshot, effective='2025-06-01')
+#   dimension.surrogate_keys(fact_frame['customer_id'])   current keys for fact loading
+#   report, keys = dimension.apply_changes(connection, members)   a few members, in the
+#                                              caller's transaction (cdc_pipeline)
+#
+# Each snapshot row gets two 64-bit hashes: one over the tracked (type-2) attributes and
+# one over the rest (type-1, overwritten in place on every version). The snapshot is
+# bulk-inserted into a TEMP staging table and diffed against the current rows with one
+# join on the partial unique index (natural key WHERE is_current = 1), so only new and
+# changed members are touched: changed current rows are expired (valid_to = effective,
+# is_current = 0) and new versions inserted, in one transaction that also records the
+# merge in scd_merges. olap_retail's fact_sales references the surrogate keys, so each
+# fact stays joined to the version it was loaded against. data_warehouse.db has no
+# layout here: its fact_sales joins the dimensions on the natural ids, and every reader
+# (incremental_aggregates, the LTV queries, OLAPEngine) would count each version.
+
+STAGE_BATCH_SIZE = 100_000
+INITIAL_VALID_FROM = '1900-01-01 00:00:00'
+OPEN_END = '9999-12-31 00:00:00'
+UNKNOWN_KEY = 0   # surrogate_keys() result for natural keys without a current row
+
+SCD_COLUMNS = {
+    'valid_from': 'TEXT NOT NULL',
+    'valid_to': 'TEXT NOT NULL',
+    'is_current': 'INTEGER NOT NULL',
+    'row_hash': 'INTEGER',
+    'type1_hash': 'INTEGER',
+}
+
+MERGE_LOG_DDL = """CREATE TABLE IF NOT EXISTS scd_merges (
+    merge_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    effective TEXT NOT NULL,
+    staged INTEGER,
+    new_rows INTEGER,
+    changed_rows INTEGER,
+    overwritten_rows INTEGER,
+    expired_rows INTEGER,
+    seconds REAL,
+    merged_at TEXT
+)"""
+
+# database layout -> table -> SCD2Dimension arguments
+DIMENSION_LAYOUTS = {
+    'olap_retail': {
+        'dim_customer': {'natural_key': 'customer_id', 'surrogate_key': 'customer_key',
+                         'tracked': ['customer_segment', 'city', 'state']},
+        'dim_product': {'natural_key': 'product_id', 'surrogate_key': 'product_key',
+                        'tracked': ['unit_price', 'margin_percent']},
+    },
+}
+
+
+def open_dimension(database, table, layout='olap_retail'):
+    """SCD2Dimension for one of the DIMENSION_LAYOUTS tables"""
+    if layout not in DIMENSION_LAYOUTS:
+        raise ValueError(f"no SCD2 layout {layout!r}; expected one of {list(DIMENSION_LAYOUTS)}")
+    return SCD2Dimension(database, table, **DIMENSION_LAYOUTS[layout][table])
+
+
+def _affinity(declared):
+    """SQLite column affinity of a declared type: 'integer', 'text', 'blob', 'real' or 'numeric'"""
+    declared = (declared or '').upper()
+    if 'INT' in declared:
+        return 'integer'
+    if any(name in declared for name in ('CHAR', 'CLOB', 'TEXT')):
+        return 'text'
+    if not declared or 'BLOB' in declared:
+        return 'blob'
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+        return 'real'
+    return 'numeric'
+
+
+def _sql_values(values, affinity):
+    """values as SQLite would store them in a column of this affinity (numbers as float64)"""
+    if affinity in ('integer', 'real', 'numeric'):
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+    if affinity == 'text' and not pd.api.types.is_string_dtype(values):
+        values = values.astype(object)
+        values = values.where(values.isna(), values.astype(str))
+    if values.dtype == object:
+        values = values.where(values.notna(), None)   # NaN and None hash differently in object columns
+    return values   # str columns hash like object columns of the same strings
+
+
+def attribute_hash(frame, columns, affinities):
+    """int64 hash per row of frame[columns]; values are first coerced to their column's affinity,
+    so a snapshot row hashes the same as the row SQLite stored for it"""
+    if not columns:
+        return np.zeros(len(frame), dtype=np.int64)
+    coerced = pd.DataFrame({column: _sql_values(frame[column], affinities[column]) for column in columns},
+                           index=frame.index)
+    # categorize=False: factorizing first only pays off for low-cardinality columns
+    return pd.util.hash_pandas_object(coerced, index=False, categorize=False).to_numpy().view(np.int64)
+
+
+def _timestamp(value):
+    if value is None:
+        value = pd.Timestamp.now()
+    return pd.Timestamp(value).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class MergeReport:
+    """What one merge did to the dimension"""
+
+    def __init__(self, table, effective, staged, unchanged, new, changed, overwritten, expired, seconds):
+        self.table = table
+        self.effective = effective
+        self.staged = staged
+        self.unchanged = unchanged
+        self.new = new
+        self.changed = changed
+        self.overwritten = overwritten
+        self.expired = expired
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.staged / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return (f"{self.table} @ {self.effective}: {self.staged:,} snapshot rows in {self.seconds:.1f}s "
+                f"({self.rows_per_second:,.0f} rows/s) - {self.unchanged:,} unchanged, {self.new:,} new, "
+                f"{self.changed:,} new versions, {self.overwritten:,} type-1 updates, {self.expired:,} expired")
+
+
+class SCD2Dimension:
+    """A dimension table kept as type-2 history, merged from full or partial snapshots"""
+
+    def __init__(self, database, table, natural_key, tracked, surrogate_key=None, type1=None):
+        self.database = database
+        self.table = table
+        self.natural_key = natural_key
+        self.tracked = list(tracked)
+        self.surrogate_key = surrogate_key or f"{table.removeprefix('dim_')}_key"
+        self._type1 = None if type1 is None else list(type1)
+        self.connection = sqlite3.connect(database, isolation_level=None)
+        tune_connection(self.connection)
+        # a 10M-row snapshot stages to ~1 GB; let SQLite spill it to a temp file
+        self.connection.execute("PRAGMA temp_store = FILE")
+        self.connection.execute(MERGE_LOG_DDL)
+        self._keys = None
+        self._describe()
+
+    def close(self):
+        self.connection.close()
+
+    def _describe(self):
+        info = self.connection.execute(f"PRAGMA table_info({self.table})").fetchall()
+        if not info:
+            raise ValueError(f"{self.database} has no table {self.table}")
+        self.declared = {name: declared for _, name, declared, *_ in info}
+        self.is_scd2 = set(SCD_COLUMNS) <= set(self.declared)
+        self.attributes = [name for name in self.declared
+                           if name not in SCD_COLUMNS and name != self.surrogate_key]
+        missing = [name for name in [self.natural_key, *self.tracked] if name not in self.attributes]
+        if missing:
+            raise ValueError(f"{self.table} has no column(s) {missing}")
+        if self._type1 is None:
+            self.type1 = [name for name in self.attributes if name != self.natural_key and name not in self.tracked]
+        else:
+            self.type1 = self._type1
+        self.affinities = {name: _affinity(self.declared[name]) for name in self.attributes}
+
+    def _hashes(self, frame):
+        return (attribute_hash(frame, self.tracked, self.affinities),
+                attribute_hash(frame, self.type1, self.affinities))
+
+    def _create_indexes(self):
+        table, key = self.table, self.natural_key
+        self.connection.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_current "
+                                f"ON {table}({key}) WHERE is_current = 1")
+        self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_history ON {table}({key}, valid_from)")
+
+    # -- one-off conversion ---------------------------------------------------------
+
+    def prepare(self, batch_size=STAGE_BATCH_SIZE):
+        """Rebuild the table with the SCD2 columns (a no-op once done); returns {'rows', 'superseded'}.
+
+        Existing rows keep their surrogate key (or get one, in rowid order, when the table
+        had none) and become versions valid from INITIAL_VALID_FROM. When a natural key
+        appears more than once (appended snapshots), its last row is the current version
+        and the earlier ones are kept as superseded, zero-length versions.
+        """
+        if self.is_scd2:
+            self._create_indexes()
+            return {'rows': 0, 'superseded': 0}
+        table, key = self.table, self.surrogate_key
+        had_key = key in self.declared
+        rebuilt = f"{table}__scd2"
+        columns = ',\n    '.join([f'"{name}" {self.declared[name]}'.rstrip() for name in self.attributes]
+                                 + [f'{name} {declared}' for name, declared in SCD_COLUMNS.items()])
+        insert_columns = [key, *self.attributes, *SCD_COLUMNS]
+        insert_sql = (f"INSERT INTO {rebuilt} ({', '.join(insert_columns)}) "
+                      f"VALUES ({', '.join('?' for _ in insert_columns)})")
+        order = key if had_key else 'rowid'
+
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute(f"DROP TABLE IF EXISTS {rebuilt}")
+            self.connection.execute(f"CREATE TABLE {rebuilt} (\n    {key} INTEGER PRIMARY KEY,\n    {columns}\n)")
+            rows = 0
+            for chunk in pd.read_sql(f"SELECT * FROM {table} ORDER BY {order}", self.connection,
+                                     chunksize=batch_size):
+                row_hash, type1_hash = self._hashes(chunk)
+                keys = chunk[key].tolist() if had_key else [None] * len(chunk)
+                self.connection.executemany(insert_sql, zip(
+                    keys, *(self._column(chunk[name]) for name in self.attributes),
+                    [INITIAL_VALID_FROM] * len(chunk), [OPEN_END] * len(chunk), [1] * len(chunk),
+                    row_hash.tolist(), type1_hash.tolist()))
+                rows += len(chunk)
+            superseded = self.connection.execute(f"""
+                UPDATE {rebuilt} SET valid_to = valid_from, is_current = 0
+                WHERE {key} NOT IN (SELECT MAX({key}) FROM {rebuilt} GROUP BY {self.natural_key})
+            """).rowcount
+            # drop + rename (not rename + drop) so fact_sales' REFERENCES keep naming this table
+            self.connection.execute(f"DROP TABLE {table}")
+            self.connection.execute(f"ALTER TABLE {rebuilt} RENAME TO {table}")
+            self._create_indexes()
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        self._describe()
+        self._keys = None
+        return {'rows': rows, 'superseded': superseded}
+
+    # -- merging --------------------------------------------------------------------
+
+    @staticmethod
+    def _column(values):
+        """Column values for executemany, NaN/NaT as NULL"""
+        values = values.to_numpy(dtype=object)
+        values[pd.isna(values)] = None
+        return values.tolist()
+
+    def _stage(self, snapshot):
+        """Hash the snapshot into the TEMP table scd_stage; returns the number of rows staged.
+
+        scd_stage is clustered on the natural key (WITHOUT ROWID) and each chunk is sorted
+        before it is inserted, so the diff below reads it, and probes the dimension's
+        index, in key order instead of jumping around a heap.
+        """
+        frames = [snapshot] if isinstance(snapshot, pd.DataFrame) else snapshot
+        stage_columns = [*self.attributes, 'row_hash', 'type1_hash']
+        self.connection.execute("DROP TABLE IF EXISTS temp.scd_stage")
+        columns = ', '.join([f'"{name}" {self.declared[name]}'.rstrip() for name in self.attributes]
+                            + ['row_hash INTEGER', 'type1_hash INTEGER'])
+        self.connection.execute(
+            f"CREATE TEMP TABLE scd_stage ({columns}, PRIMARY KEY ({self.natural_key})) WITHOUT ROWID")
+        insert_sql = f"INSERT INTO scd_stage VALUES ({', '.join('?' for _ in stage_columns)})"
+        needed = [self.natural_key, *self.tracked, *self.type1]
+        staged = 0
+        self.connection.execute("BEGIN")
+        try:
+            for frame in frames:
+                missing = [name for name in needed if name not in frame.columns]
+                if missing:
+                    raise ValueError(f"snapshot has no column(s) {missing}")
+                if frame[self.natural_key].isna().any():
+                    raise ValueError(f"snapshot has rows without a {self.natural_key}")
+                frame = frame.sort_values(self.natural_key)
+                row_hash, type1_hash = self._hashes(frame)
+                # columns the snapshot does not carry (not tracked, not type-1) are stored as NULL
+                self.connection.executemany(insert_sql, zip(
+                    *(self._column(frame[name]) if name in frame.columns else [None] * len(frame)
+                      for name in self.attributes),
+                    row_hash.tolist(), type1_hash.tolist()))
+                staged += len(frame)
+            self.connection.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            self.connection.execute("ROLLBACK")
+            raise ValueError(f"snapshot has duplicate {self.natural_key} values") from None
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return staged
+
+    def last_effective(self):
+        """effective time of the latest merge into this table (None before the first)"""
+        return self.connection.execute("SELECT MAX(effective) FROM scd_merges WHERE table_name = ?",
+                                       (self.table,)).fetchone()[0]
+
+    def merge(self, snapshot, effective=None, expire_missing=False):
+        """Apply a snapshot (DataFrame or iterable of DataFrame chunks) as of effective; returns a MergeReport.
+
+        Natural keys not seen before are inserted, members whose tracked attributes
+        changed get a new version, type-1 attributes are overwritten on all versions.
+        With expire_missing=True the snapshot is treated as complete and current members
+        missing from it are expired.
+        """
+        if not self.is_scd2:
+            raise ValueError(f"{self.table} is not an SCD2 table yet - call prepare() first")
+        start = time.perf_counter()
+        effective = _timestamp(effective)
+        last = self.last_effective()
+        if last is not None and effective <= last:
+            raise ValueError(f"effective {effective} is not after the last merge into {self.table} ({last})")
+        table, key, natural = self.table, self.surrogate_key, self.natural_key
+        attributes = ', '.join(f'"{name}"' for name in self.attributes)
+
+        staged = self._stage(snapshot)
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            # the only rows that need work: new members and changed current versions
+            self.connection.execute("DROP TABLE IF EXISTS temp.scd_diff")
+            self.connection.execute(f"""
+                CREATE TEMP TABLE scd_diff AS
+                SELECT s.{natural} AS natural_key, d.{key} AS current_key,
+                       d.{key} IS NOT NULL AND d.row_hash IS NOT s.row_hash AS changed,
+                       d.{key} IS NOT NULL AND d.type1_hash IS NOT s.type1_hash AS overwritten
+                FROM scd_stage s
+                LEFT JOIN {table} d ON d.{natural} = s.{natural} AND d.is_current = 1
+                WHERE d.{key} IS NULL OR d.row_hash IS NOT s.row_hash OR d.type1_hash IS NOT s.type1_hash
+            """)
+            first_new_key = self.connection.execute(f"SELECT COALESCE(MAX({key}), 0) + 1 FROM {table}").fetchone()[0]
+            changed = self.connection.execute(f"""
+                UPDATE {table} SET valid_to = ?, is_current = 0
+                WHERE {key} IN (SELECT current_key FROM scd_diff WHERE changed)
+            """, (effective,)).rowcount
+            inserted = self.connection.execute(f"""
+                INSERT INTO {table} ({attributes}, valid_from, valid_to, is_current, row_hash, type1_hash)
+                SELECT {', '.join(f's."{name}"' for name in self.attributes)}, ?, ?, 1, s.row_hash, s.type1_hash
+                FROM scd_diff x JOIN scd_stage s ON s.{natural} = x.natural_key
+                WHERE x.current_key IS NULL OR x.changed
+                ORDER BY x.natural_key
+            """, (effective, OPEN_END)).rowcount
+            different, overwritten = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(overwritten), 0) FROM scd_diff").fetchone()
+            if overwritten:
+                self.connection.execute(f"""
+                    UPDATE {table} AS d SET {', '.join(f'"{name}" = s."{name}"' for name in self.type1)},
+                        type1_hash = s.type1_hash
+                    FROM (SELECT s.* FROM scd_diff x JOIN scd_stage s ON s.{natural} = x.natural_key
+                          WHERE x.overwritten) AS s
+                    WHERE d.{natural} = s.{natural} AND d.type1_hash IS NOT s.type1_hash
+                """)
+            gone = []
+            if expire_missing:
+                gone = [row[0] for row in self.connection.execute(f"""
+                    UPDATE {table} SET valid_to = ?, is_current = 0
+                    WHERE is_current = 1 AND {natural} NOT IN (SELECT {natural} FROM scd_stage)
+                    RETURNING {natural}
+                """, (effective,))]
+            seconds = time.perf_counter() - start
+            self.connection.execute(
+                "INSERT INTO scd_merges (table_name, effective, staged, new_rows, changed_rows, overwritten_rows, "
+                "expired_rows, seconds, merged_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+                (table, effective, staged, inserted - changed, changed, overwritten, len(gone), seconds))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        finally:
+            self.connection.execute("DROP TABLE IF EXISTS temp.scd_diff")
+            self.connection.execute("DROP TABLE IF EXISTS temp.scd_stage")
+
+        if self._keys is not None:
+            self._update_keys(first_new_key, gone)
+        return MergeReport(table, effective, staged, staged - different, inserted - changed, changed, overwritten,
+                           len(gone), time.perf_counter() - start)
+
+    def apply_changes(self, connection, members, effective=None):
+        """Write a few changed members on connection, inside the caller's open transaction.
+
+        The row-at-a-time counterpart of merge() for change-data-capture batches: the same
+        hashes and versions, no staging table. members is a DataFrame with one row per
+        natural key; effective defaults to now and is never earlier than the last merge.
+        The batch is logged in scd_merges like a merge. Returns (MergeReport,
+        {natural key: current surrogate key}).
+        """
+        if not self.is_scd2:
+            raise ValueError(f"{self.table} is not an SCD2 table yet - call prepare() first")
+        start = time.perf_counter()
+        table, key, natural = self.table, self.surrogate_key, self.natural_key
+        missing = [name for name in [natural, *self.tracked, *self.type1] if name not in members.columns]
+        if missing:
+            raise ValueError(f"members have no column(s) {missing}")
+        if members[natural].duplicated().any():
+            raise ValueError(f"members have duplicate {natural} values")
+        effective = _timestamp(effective)
+        last = connection.execute("SELECT MAX(effective) FROM scd_merges WHERE table_name = ?",
+                                  (table,)).fetchone()[0]
+        if last is not None and effective < last:
+            effective = last
+
+        row_hash, type1_hash = self._hashes(members)
+        natural_ids = members[natural].tolist()
+        current = {}
+        for first in range(0, len(natural_ids), 500):
+            chunk = natural_ids[first:first + 500]
+            current.update((row[0], row[1:]) for row in connection.execute(
+                f"SELECT {natural}, {key}, row_hash, type1_hash FROM {table} "
+                f"WHERE is_current = 1 AND {natural} IN ({', '.join('?' for _ in chunk)})", chunk))
+        next_key = connection.execute(f"SELECT COALESCE(MAX({key}), 0) + 1 FROM {table}").fetchone()[0]
+        values = {name: self._column(members[name]) if name in members.columns else [None] * len(members)
+                  for name in self.attributes}
+        attributes = ', '.join(f'"{name}"' for name in self.attributes)
+        insert_sql = (f"INSERT INTO {table} ({key}, {attributes}, valid_from, valid_to, is_current, row_hash, "
+                      f"type1_hash) VALUES ({', '.join('?' for _ in range(len(self.attributes) + 6))})")
+        type1_columns = ', '.join(f'"{name}" = ?' for name in self.type1)
+        overwrite_sql = f"UPDATE {table} SET {type1_columns}, type1_hash = ? WHERE {natural} = ? AND type1_hash IS NOT ?"
+
+        keys = {}
+        unchanged = new = changed = overwritten = 0
+        for i, natural_id in enumerate(natural_ids):
+            found = current.get(natural_id)
+            tracked_hash, other_hash = int(row_hash[i]), int(type1_hash[i])
+            if found is not None and found[1:] == (tracked_hash, other_hash):
+                unchanged += 1
+            if found is None or found[1] != tracked_hash:
+                if found is None:
+                    new += 1
+                else:
+                    connection.execute(f"UPDATE {table} SET valid_to = ?, is_current = 0 WHERE {key} = ?",
+                                       (effective, found[0]))
+                    changed += 1
+                connection.execute(insert_sql, (next_key, *(values[name][i] for name in self.attributes),
+                                                effective, OPEN_END, 1, tracked_hash, other_hash))
+                keys[natural_id] = next_key
+                next_key += 1
+            else:
+                keys[natural_id] = found[0]
+            if found is not None and found[2] != other_hash:
+                # type-1 attributes are overwritten on every version, like merge()
+                connection.execute(overwrite_sql, (*(values[name][i] for name in self.type1), other_hash,
+                                                   natural_id, other_hash))
+                overwritten += 1
+        seconds = time.perf_counter() - start
+        connection.execute(
+            "INSERT INTO scd_merges (table_name, effective, staged, new_rows, changed_rows, overwritten_rows, "
+            "expired_rows, seconds, merged_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, datetime('now'))",
+            (table, effective, len(members), new, changed, overwritten, seconds))
+        self._keys = None   # reloaded from the committed table on next use
+        return MergeReport(table, effective, len(members), unchanged, new, changed, overwritten, 0, seconds), keys
+
+    # -- natural -> current surrogate key cache ------------------------------------------
+
+    def _read_keys(self, where='is_current = 1', parameters=()):
+        chunks = pd.read_sql(f"SELECT {self.natural_key}, {self.surrogate_key} FROM {self.table} WHERE {where}",
+                             self.connection, params=parameters, chunksize=1_000_000)
+        frame = pd.concat(list(chunks), ignore_index=True)
+        return pd.Series(frame[self.surrogate_key].to_numpy(dtype=np.int64), index=frame[self.natural_key])
+
+    def _update_keys(self, first_new_key, gone):
+        fresh = self._read_keys(f'{self.surrogate_key} >= ?', (first_new_key,))
+        replaced = self._keys.index.isin(fresh.index) | self._keys.index.isin(gone)
+        self._keys = pd.concat([self._keys[~replaced], fresh])
+
+    @property
+    def current_keys(self):
+        """natural key -> surrogate key of the current version, loaded once and kept in step by merge()"""
+        if self._keys is None:
+            self._keys = self._read_keys()
+        return self._keys
+
+    def surrogate_keys(self, natural_ids):
+        """int64 current surrogate keys for natural_ids (UNKNOWN_KEY where there is no current member)"""
+        keys = self.current_keys
+        positions = keys.index.get_indexer(pd.Index(natural_ids))
+        result = keys.to_numpy()[positions]
+        result[positions < 0] = UNKNOWN_KEY
+        return result
+
+    def history(self, natural_id):
+        """All versions of one member, oldest first"""
+        if isinstance(natural_id, np.generic):
+            natural_id = natural_id.item()   # sqlite3 binds numpy scalars as blobs
+        return pd.read_sql(f"SELECT * FROM {self.table} WHERE {self.natural_key} = ? ORDER BY valid_from, "
+                           f"{self.surrogate_key}", self.connection, params=(natural_id,))
+
+    def as_of(self, when):
+        """The dimension as it was at `when` (one version per member that existed then)"""
+        when = _timestamp(when)
+        return pd.read_sql(f"SELECT * FROM {self.table} WHERE valid_from <= ? AND valid_to > ?",
+                           self.connection, params=(when, when))
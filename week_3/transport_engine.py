@@ -0,0 +1,470 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from olap_engine import current_build, file_signature, new_build, publish_build, remove_stale_builds
+
+# Journey and fare analytics for transport.db (03c_real_world_sql_data_pipelines.ipynb).
+#
+#   engine = TransportEngine('transport.db')
+#   engine.trip_summary()                 boardings, revenue, fare per km, first/last tap per trip
+#   engine.trip_taps('TRIP_0042')         one trip's taps in journey order
+#   engine.stop_sequences()               'A>C>B' per trip (consecutive repeats collapsed)
+#   engine.rollup(['mode', 'service_day'])
+#   engine.persist()                      trip_summary / route_summary / mode_summary /
+#                                         daily_summary tables, indexed, in the database
+#
+# transport.db has no indexes, and tap_events.trip_id is TEXT while trips.trip_id is
+# untyped, so every SQL join is a scan plus per-row type coercion. Here trip_id is
+# resolved once, at load time, to the trip's row number in trips (taps with no
+# matching trip get the extra row number len(trips)), and routes / service days /
+# stops / directions become small integer codes. The taps are then sorted by
+# (trip row, tap_time, rowid) and trip i's taps are rows offsets[i]:offsets[i + 1],
+# so every per-trip figure is one np.bincount or ufunc.reduceat over sorted arrays.
+#
+# The sorted tap columns are kept as .npy files under .transport_cache/<database>/<build>/
+# (a new versioned build each time, as in olap_engine) and memory-mapped; they are
+# rebuilt when the database file (or its -wal file) changes size or modification
+# time - except through persist(), which re-signs them.
+
+CACHE_DIR = '.transport_cache'
+DEFAULT_BATCH_SIZE = 1_000_000
+SEQUENCE_SEPARATOR = '>'
+
+TAP_COLUMNS = {'trip': np.int32, 'tap_time': np.int32, 'stop': np.int32, 'direction': np.int32,
+               'fare': np.float64}
+
+# Trip-level group levels for rollup()
+LEVELS = ('route_id', 'mode', 'service_day')
+
+SUMMARY_DDL = {
+    'trip_summary': """CREATE TABLE trip_summary (
+    trip_id TEXT PRIMARY KEY,
+    route_id INTEGER,
+    mode TEXT,
+    service_day TEXT,
+    boardings INTEGER,
+    revenue REAL,
+    km REAL,
+    fare_per_km REAL,
+    first_tap INTEGER,
+    last_tap INTEGER,
+    distinct_stops INTEGER,
+    stop_sequence TEXT
+) WITHOUT ROWID""",
+    'route_summary': """CREATE TABLE route_summary (
+    route_id INTEGER PRIMARY KEY,
+    mode TEXT,
+    trips INTEGER,
+    boardings INTEGER,
+    revenue REAL,
+    vehicle_km REAL,
+    fare_per_km REAL,
+    avg_fare REAL
+)""",
+    'mode_summary': """CREATE TABLE mode_summary (
+    mode TEXT PRIMARY KEY,
+    trips INTEGER,
+    boardings INTEGER,
+    revenue REAL,
+    vehicle_km REAL,
+    fare_per_km REAL,
+    avg_fare REAL
+) WITHOUT ROWID""",
+    'daily_summary': """CREATE TABLE daily_summary (
+    service_day TEXT,
+    mode TEXT,
+    trips INTEGER,
+    boardings INTEGER,
+    revenue REAL,
+    vehicle_km REAL,
+    fare_per_km REAL,
+    avg_fare REAL,
+    PRIMARY KEY (service_day, mode)
+) WITHOUT ROWID""",
+}
+
+SUMMARY_INDEXES = [
+    "CREATE INDEX idx_trip_summary_route_day ON trip_summary(route_id, service_day)",
+    "CREATE INDEX idx_trip_summary_day_mode ON trip_summary(service_day, mode)",
+    "CREATE INDEX idx_route_summary_mode ON route_summary(mode)",
+    "CREATE INDEX idx_daily_summary_mode ON daily_summary(mode, service_day)",
+]
+
+# rollup() tables written by persist(): table -> levels
+ROLLUP_TABLES = {
+    'route_summary': ['route_id', 'mode'],
+    'mode_summary': ['mode'],
+    'daily_summary': ['service_day', 'mode'],
+}
+
+
+# set bits per byte value, for counting the stops in a 64-bit mask
+_BIT_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+
+def _codes(values, categories):
+    """Codes of values in a category Index, -1 when absent"""
+    return categories.get_indexer(values).astype(np.int32)
+
+
+class TransportEngine:
+    """Taps grouped by trip in sorted, integer-keyed column arrays, with per-trip and rolled-up fare figures"""
+
+    def __init__(self, database, cache_dir=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.database = os.path.abspath(database)
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(self.database), CACHE_DIR)
+        self.directory = os.path.join(cache_dir, os.path.basename(self.database))
+        self.batch_size = batch_size
+        self.signature = None
+        self.build = None
+        self.rebuilds = 0
+        self.load_seconds = 0.0
+        self.refresh()
+
+    # -- loading ------------------------------------------------------------------
+
+    def refresh(self):
+        """Reload (rebuilding the tap column files if needed) when the database has changed"""
+        signature = file_signature(self.database)
+        if signature == self.signature:
+            return False
+        start = time.perf_counter()
+        connection = sqlite3.connect(f'file:{self.database}?mode=ro', uri=True, isolation_level=None)
+        try:
+            # trips, routes and taps from one snapshot
+            connection.execute("BEGIN")
+            self._load_trips(connection)
+            # signed after opening: opening a WAL database creates its (empty) -wal file
+            signature = file_signature(self.database)
+            manifest = self._read_manifest()
+            if manifest is None or manifest['signature'] != signature or manifest['trips'] != self.n_trips:
+                self.taps = {}   # release this engine's maps of the old build
+                manifest = self._build(connection, signature)
+                self.rebuilds += 1
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        self.n_taps = manifest['taps']
+        self.stops = pd.Index(manifest['stops'], dtype=object)
+        self.directions = pd.Index(manifest['directions'], dtype=object)
+        self.taps = {name: np.load(os.path.join(self.build, f'{name}.npy'), mmap_mode='r')
+                     for name in TAP_COLUMNS}
+        self.offsets = np.load(os.path.join(self.build, 'offsets.npy'))
+        self._trip_figures = None
+        self.signature = signature
+        remove_stale_builds(self.directory)
+        self.load_seconds = time.perf_counter() - start
+        return True
+
+    def _read_manifest(self):
+        self.build = current_build(self.directory)
+        if self.build is None or not os.path.exists(os.path.join(self.build, 'manifest.json')):
+            return None
+        with open(os.path.join(self.build, 'manifest.json')) as f:
+            return json.load(f)
+
+    def _load_trips(self, connection):
+        """Trip-level arrays, one entry per trips row, with route and day as codes"""
+        routes = pd.read_sql('SELECT routes_id, mode, km FROM routes', connection)
+        trips = pd.read_sql('SELECT trip_id, route_id, service_date FROM trips', connection)
+        # the one place trip ids are compared: as text, whatever each table stored
+        self.trip_ids = pd.Index(trips['trip_id'].astype(str), dtype=object)
+        self.n_trips = len(trips)
+        self.route_ids = pd.Index(routes['routes_id'])
+        self.modes = pd.Index(sorted(routes['mode'].dropna().unique()), dtype=object)
+        self.route_mode = _codes(routes['mode'], self.modes)
+        self.route_km = routes['km'].to_numpy(dtype=np.float64)
+        self.trip_route = _codes(trips['route_id'], self.route_ids)
+        days = trips['service_date'].astype(str).str[:10].where(trips['service_date'].notna())
+        self.days = pd.Index(sorted(days.dropna().unique()), dtype=object)
+        self.trip_day = _codes(days, self.days)
+        found = self.trip_route >= 0
+        self.trip_km = np.where(found, self.route_km[self.trip_route], np.nan)
+        self.trip_mode = np.where(found, self.route_mode[self.trip_route], -1).astype(np.int32)
+
+    def _build(self, connection, signature):
+        """Write a new build of the tap column files; returns the manifest"""
+        target = new_build(self.directory)
+        try:
+            manifest = self._write_columns(connection, target, signature)
+        except BaseException:
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+        self.build = publish_build(self.directory, target)
+        return manifest
+
+    def _write_columns(self, connection, target, signature):
+        """Read tap_events in batches, sort by (trip, tap_time, rowid) and write the column files"""
+        rows = connection.execute('SELECT COUNT(*) FROM tap_events').fetchone()[0]
+
+        def open_column(name, dtype):
+            return np.lib.format.open_memmap(os.path.join(target, f'{name}.npy'), mode='w+', dtype=dtype,
+                                             shape=(rows,))
+
+        # unsorted columns first, in scan (rowid) order
+        raw = {name: open_column(f'{name}.unsorted', dtype) for name, dtype in TAP_COLUMNS.items()}
+        dictionaries = {'stop': {}, 'direction': {}}
+        offset = 0
+        cursor = connection.execute('SELECT trip_id, tap_time, stop_id, direction, fare FROM tap_events ORDER BY rowid')
+        while True:
+            batch = cursor.fetchmany(self.batch_size)
+            if not batch:
+                break
+            end = offset + len(batch)
+            chunk = pd.DataFrame(batch, columns=['trip_id', 'tap_time', 'stop_id', 'direction', 'fare'])
+            trip = _codes(chunk['trip_id'].astype(str).where(chunk['trip_id'].notna()), self.trip_ids)
+            raw['trip'][offset:end] = np.where(trip >= 0, trip, self.n_trips)
+            tap_time = pd.to_numeric(chunk['tap_time'], errors='coerce')
+            raw['tap_time'][offset:end] = tap_time.fillna(-1).to_numpy(np.int64)
+            for name, column in (('stop', 'stop_id'), ('direction', 'direction')):
+                codes, uniques = pd.factorize(chunk[column], use_na_sentinel=False)
+                dictionary = dictionaries[name]
+                for value in uniques:
+                    dictionary.setdefault(None if pd.isna(value) else value, len(dictionary))
+                mapping = np.array([dictionary[None if pd.isna(value) else value] for value in uniques], dtype=np.int32)
+                raw[name][offset:end] = mapping[codes]
+            raw['fare'][offset:end] = pd.to_numeric(chunk['fare'], errors='coerce').to_numpy(np.float64)
+            offset = end
+
+        # (trip, tap_time) as one int64 key; the stable sort keeps rowid order within ties
+        tap_time = np.asarray(raw['tap_time'], dtype=np.int64)
+        low = tap_time.min() if rows else 0
+        span = (tap_time.max() - low + 1) if rows else 1
+        key = np.asarray(raw['trip'], dtype=np.int64) * span + (tap_time - low)
+        del tap_time
+        order = np.argsort(key, kind='stable')
+        del key
+        for name, dtype in TAP_COLUMNS.items():
+            column = open_column(name, dtype)
+            column[:] = np.asarray(raw[name])[order]
+            column.flush()
+            del column
+        counts = np.bincount(np.asarray(raw['trip']), minlength=self.n_trips + 1)
+        np.save(os.path.join(target, 'offsets.npy'), np.concatenate([[0], np.cumsum(counts)]))
+        del order, raw
+        for name in TAP_COLUMNS:
+            os.remove(os.path.join(target, f'{name}.unsorted.npy'))
+
+        manifest = {
+            'signature': signature,
+            'taps': rows,
+            'trips': self.n_trips,
+            'stops': list(dictionaries['stop']),
+            'directions': list(dictionaries['direction']),
+        }
+        with open(os.path.join(target, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        return manifest
+
+    # -- per trip -------------------------------------------------------------------
+
+    @property
+    def unmatched_taps(self):
+        """Taps whose trip_id is not in trips"""
+        return int(self.offsets[-1] - self.offsets[-2])
+
+    def _trip_of_taps(self):
+        return np.asarray(self.taps['trip'])
+
+    def _per_trip(self):
+        """Trip-level figures (computed once per load) as a dict of arrays of length n_trips"""
+        if self._trip_figures is not None:
+            return self._trip_figures
+        n = self.n_trips
+        trip = self._trip_of_taps()
+        fare = np.asarray(self.taps['fare'])
+        tap_time = np.asarray(self.taps['tap_time'])
+        stop = np.asarray(self.taps['stop'])
+        boardings = np.diff(self.offsets)[:n]
+        has_fare = ~np.isnan(fare)
+        fares = np.bincount(trip[has_fare], minlength=n + 1)[:n]
+        revenue = np.bincount(trip, weights=np.where(has_fare, fare, 0.0), minlength=n + 1)[:n]
+        # SQL semantics: SUM over no non-NULL fares is NULL
+        revenue = np.where(fares > 0, revenue, np.nan)
+        starts, ends = self.offsets[:n], self.offsets[1:n + 1]
+        taken = boardings > 0
+        first_tap = np.full(n, -1, dtype=np.int64)
+        last_tap = np.full(n, -1, dtype=np.int64)
+        first_tap[taken] = tap_time[starts[taken]]
+        last_tap[taken] = tap_time[ends[taken] - 1]
+        distinct = self._distinct_stops(stop[:self.offsets[n]], taken)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fare_per_km = revenue / self.trip_km
+        self._trip_figures = {
+            'boardings': boardings, 'revenue': revenue, 'fare_per_km': fare_per_km,
+            'first_tap': first_tap, 'last_tap': last_tap, 'distinct_stops': distinct,
+        }
+        return self._trip_figures
+
+    def _distinct_stops(self, stop, taken):
+        """Distinct stops per trip, from the matched taps (sorted by trip)"""
+        n = self.n_trips
+        distinct = np.zeros(n, dtype=np.int64)
+        if len(self.stops) <= 64:
+            # OR the stops of each trip into a 64-bit mask and count its bits
+            masks = np.bitwise_or.reduceat(np.left_shift(np.uint64(1), stop.astype(np.uint64)),
+                                           self.offsets[:n][taken]) if taken.any() else np.empty(0, np.uint64)
+            distinct[taken] = _BIT_COUNTS[masks.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+        else:
+            trip = self._trip_of_taps()[:len(stop)]
+            pair = np.unique(trip.astype(np.int64) * len(self.stops) + stop)
+            distinct = np.bincount(pair // len(self.stops), minlength=n)
+        return distinct
+
+    def _labels(self, codes, categories):
+        """Category labels for codes, None where a code is -1"""
+        labels = np.append(np.asarray(categories, dtype=object), None)
+        return labels[np.where(codes >= 0, codes, len(categories))]
+
+    def trip_summary(self, stop_sequences=False):
+        """One row per trip (trips without taps have 0 boardings); stop_sequences adds the 'A>B>C' column"""
+        self.refresh()
+        figures = self._per_trip()
+        summary = pd.DataFrame({
+            'trip_id': self.trip_ids.to_numpy(),
+            'route_id': self._labels(self.trip_route, self.route_ids),
+            'mode': self._labels(self.trip_mode, self.modes),
+            'service_day': self._labels(self.trip_day, self.days),
+            'boardings': figures['boardings'],
+            'revenue': figures['revenue'],
+            'km': self.trip_km,
+            'fare_per_km': figures['fare_per_km'],
+            'first_tap': pd.array(np.where(figures['first_tap'] >= 0, figures['first_tap'], 0), dtype='Int64'),
+            'last_tap': pd.array(np.where(figures['last_tap'] >= 0, figures['last_tap'], 0), dtype='Int64'),
+            'distinct_stops': figures['distinct_stops'],
+        })
+        summary.loc[figures['boardings'] == 0, ['first_tap', 'last_tap']] = pd.NA
+        if stop_sequences:
+            summary['stop_sequence'] = self.stop_sequences().to_numpy()
+        return summary
+
+    def trip_taps(self, trip_id):
+        """One trip's taps in journey order (tap_time, then table order)"""
+        self.refresh()
+        row = self.trip_ids.get_loc(str(trip_id))
+        rows = slice(self.offsets[row], self.offsets[row + 1])
+        return pd.DataFrame({
+            'tap_time': np.asarray(self.taps['tap_time'][rows]),
+            'stop_id': self.stops.to_numpy()[np.asarray(self.taps['stop'][rows])],
+            'direction': self.directions.to_numpy()[np.asarray(self.taps['direction'][rows])],
+            'fare': np.asarray(self.taps['fare'][rows]),
+        })
+
+    def stop_sequences(self, separator=SEQUENCE_SEPARATOR):
+        """Stops of each trip in journey order with consecutive repeats collapsed, as a Series by trip_id"""
+        self.refresh()
+        n = self.n_trips
+        end = self.offsets[n]  # matched taps only
+        trip = self._trip_of_taps()[:end]
+        stop = np.asarray(self.taps['stop'][:end])
+        keep = np.ones(end, dtype=bool)
+        keep[1:] = (stop[1:] != stop[:-1]) | (trip[1:] != trip[:-1])
+        labels = np.array([str(value) for value in self.stops], dtype=object)[stop[keep]]
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(trip[keep], minlength=n))])
+        sequences = [separator.join(labels[bounds[i]:bounds[i + 1]]) for i in range(n)]
+        return pd.Series(sequences, index=pd.Index(self.trip_ids, name='trip_id'), name='stop_sequence')
+
+    # -- rollups ----------------------------------------------------------------------
+
+    def _level_codes(self, name):
+        if name == 'route_id':
+            return self.trip_route, self.route_ids
+        if name == 'mode':
+            return self.trip_mode, self.modes
+        if name == 'service_day':
+            return self.trip_day, self.days
+        raise KeyError(f"unknown level {name!r}; expected one of {LEVELS}")
+
+    def rollup(self, by=()):
+        """Trips, boardings, revenue, vehicle-km, fare per km and average fare per group of trips.
+
+        by is a list of route_id, mode and service_day (missing route / day -> None);
+        () gives the network total. Only groups with at least one trip are returned.
+        """
+        self.refresh()
+        by = [by] if isinstance(by, str) else list(by)
+        figures = self._per_trip()
+        codes, categories = zip(*(self._level_codes(name) for name in by)) if by else ((), ())
+        # -1 (missing) becomes an extra last code per level
+        shape = tuple(len(level) + 1 for level in categories)
+        ids = (np.ravel_multi_index([np.where(c >= 0, c, len(level)) for c, level in zip(codes, categories)], shape)
+               if by else np.zeros(self.n_trips, dtype=np.int64))
+        size = int(np.prod(shape)) if by else 1
+        trips = np.bincount(ids, minlength=size)
+        present = np.flatnonzero(trips)
+
+        def total(values):
+            valid = ~np.isnan(values)
+            sums = np.bincount(ids[valid], weights=values[valid], minlength=size)
+            return np.where(np.bincount(ids[valid], minlength=size) > 0, sums, np.nan)[present]
+
+        keys = np.unravel_index(present, shape) if by else ()
+        result = pd.DataFrame({name: self._labels(np.where(key < len(level), key, -1), level)
+                               for name, level, key in zip(by, categories, keys)}, index=range(len(present)))
+        result['trips'] = trips[present]
+        result['boardings'] = np.bincount(ids, weights=figures['boardings'], minlength=size)[present].astype(np.int64)
+        result['revenue'] = total(figures['revenue'])
+        result['vehicle_km'] = total(self.trip_km)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['fare_per_km'] = result['revenue'] / result['vehicle_km']
+            result['avg_fare'] = result['revenue'] / result['boardings'].where(result['boardings'] > 0)
+        return result
+
+    # -- persistence -------------------------------------------------------------------
+
+    def persist(self, database=None, stop_sequences=True):
+        """Write trip_summary and the ROLLUP_TABLES (replacing them) with their indexes; returns row counts.
+
+        database defaults to the source database; the tap column files are then
+        re-signed, since only the summary tables changed.
+        """
+        self.refresh()
+        target = os.path.abspath(database or self.database)
+        tables = {'trip_summary': self.trip_summary(stop_sequences=stop_sequences)}
+        if not stop_sequences:
+            tables['trip_summary']['stop_sequence'] = None
+        for table, levels in ROLLUP_TABLES.items():
+            tables[table] = self.rollup(levels)
+        connection = sqlite3.connect(target, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for table, frame in tables.items():
+                connection.execute(f'DROP TABLE IF EXISTS {table}')
+                connection.execute(SUMMARY_DDL[table])
+                frame = frame.astype(object).where(frame.notna(), None)
+                connection.executemany(f'INSERT INTO {table} ({", ".join(frame.columns)}) '
+                                       f'VALUES ({", ".join("?" * len(frame.columns))})',
+                                       frame.itertuples(index=False, name=None))
+            for statement in SUMMARY_INDEXES:
+                connection.execute(statement)
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+        if target == self.database:
+            self._resign()
+        return {table: len(frame) for table, frame in tables.items()}
+
+    def _resign(self):
+        """Point the column files at the database's new signature after writing only summary tables"""
+        manifest = self._read_manifest()
+        # signed the way refresh() signs: with a read-only connection open, which recreates
+        # the (empty) -wal file the writer's close just removed
+        connection = sqlite3.connect(f'file:{self.database}?mode=ro', uri=True)
+        try:
+            connection.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            manifest['signature'] = self.signature = file_signature(self.database)
+        finally:
+            connection.close()
+        with open(os.path.join(self.build, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
@@ -0,0 +1,340 @@
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import tune_connection
+
+# Vectorized synthetic star-schema generator for the week 3 warehouses.
+# Replaces the per-row `for i in range(n_sales)` fact loops and the
+# `[int(d.strftime('%Y%m%d')) for d in date_range]` date keys from
+# 03d_data_warehousing_fundamentals.ipynb. Dimensions are built in one go; facts are
+# sampled batch by batch with NumPy (foreign keys are integer draws, measures are
+# array arithmetic) and streamed into SQLite, so memory is bounded by batch_size and
+# olap_retail.db-shaped warehouses of 100M+ fact rows can be produced.
+
+DEFAULT_BATCH_SIZE = 250_000
+
+CATEGORIES = ['Electronics', 'Clothing', 'Food', 'Books', 'Sports']
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
+STATES = ['NY', 'CA', 'IL', 'TX', 'AZ']
+REGIONS = {'NY': 'Northeast', 'CA': 'West', 'IL': 'Midwest', 'TX': 'South', 'AZ': 'West'}
+SEGMENTS = ['Bronze', 'Silver', 'Gold']
+SEGMENT_WEIGHTS = [0.6, 0.3, 0.1]
+
+# Discounts as used by the notebooks: percent for the bookstore/coffee shop facts,
+# fractions for the olap_retail order items
+DISCOUNT_PERCENTS = np.array([0, 5, 10, 15, 20])
+DISCOUNT_PERCENT_WEIGHTS = [0.5, 0.2, 0.15, 0.1, 0.05]
+ORDER_DISCOUNTS = np.array([0, 0.05, 0.10, 0.15])
+ORDER_DISCOUNT_WEIGHTS = [0.6, 0.2, 0.15, 0.05]
+ITEMS_PER_ORDER = 3   # mean order size (1-5 items in the OLTP notebook)
+
+# Same tables as olap_retail.db (03c_data_warehouse_design.ipynb)
+OLAP_RETAIL_DDL = [
+    """CREATE TABLE dim_date (
+    date_key INTEGER PRIMARY KEY,
+    date DATE,
+    year INTEGER,
+    quarter INTEGER,
+    month INTEGER,
+    month_name TEXT,
+    week INTEGER,
+    day_of_month INTEGER,
+    day_of_week INTEGER,
+    day_name TEXT,
+    is_weekend INTEGER,
+    is_holiday INTEGER
+)""",
+    """CREATE TABLE dim_product (
+    product_key INTEGER PRIMARY KEY,
+    product_id INTEGER,
+    product_name TEXT,
+    category_name TEXT,
+    brand TEXT,
+    unit_price DECIMAL(10,2),
+    unit_cost DECIMAL(10,2),
+    margin_percent DECIMAL(5,2)
+)""",
+    """CREATE TABLE dim_customer (
+    customer_key INTEGER PRIMARY KEY,
+    customer_id INTEGER,
+    full_name TEXT,
+    email TEXT,
+    city TEXT,
+    state TEXT,
+    customer_segment TEXT
+)""",
+    """CREATE TABLE dim_store (
+    store_key INTEGER PRIMARY KEY,
+    store_id INTEGER,
+    store_name TEXT,
+    city TEXT,
+    state TEXT,
+    region TEXT,
+    manager_name TEXT
+)""",
+    """CREATE TABLE fact_sales (
+    sale_key INTEGER PRIMARY KEY,
+    date_key INTEGER,
+    product_key INTEGER,
+    customer_key INTEGER,
+    store_key INTEGER,
+    order_id INTEGER,
+    quantity INTEGER,
+    revenue DECIMAL(12,2),
+    cost DECIMAL(12,2),
+    profit DECIMAL(12,2),
+    FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
+    FOREIGN KEY (product_key) REFERENCES dim_product(product_key),
+    FOREIGN KEY (customer_key) REFERENCES dim_customer(customer_key),
+    FOREIGN KEY (store_key) REFERENCES dim_store(store_key)
+)""",
+]
+
+# Built after the facts are loaded: one sort per index instead of a B-tree insert per row
+OLAP_RETAIL_INDEXES = [
+    "CREATE INDEX idx_fact_date ON fact_sales(date_key)",
+    "CREATE INDEX idx_fact_product ON fact_sales(product_key)",
+    "CREATE INDEX idx_fact_customer ON fact_sales(customer_key)",
+    "CREATE INDEX idx_fact_store ON fact_sales(store_key)",
+]
+
+FACT_COLUMNS = ['sale_key', 'date_key', 'product_key', 'customer_key', 'store_key',
+                'order_id', 'quantity', 'revenue', 'cost', 'profit']
+
+
+def date_key(dates):
+    """YYYYMMDD integer keys for a DatetimeIndex/Series, without strftime"""
+    dates = pd.DatetimeIndex(dates)
+    return (dates.year * 10000 + dates.month * 100 + dates.day).to_numpy(dtype=np.int64)
+
+
+def build_dim_date(start='2023-01-01', end='2025-12-31'):
+    """olap_retail dim_date for every day from start to end"""
+    dates = pd.date_range(start, end, freq='D')
+    return pd.DataFrame({
+        'date_key': date_key(dates),
+        'date': dates.date,
+        'year': dates.year,
+        'quarter': dates.quarter,
+        'month': dates.month,
+        'month_name': dates.month_name(),
+        'week': dates.isocalendar().week.to_numpy(),
+        'day_of_month': dates.day,
+        'day_of_week': dates.dayofweek,
+        'day_name': dates.day_name(),
+        'is_weekend': (dates.dayofweek >= 5).astype(int),
+        'is_holiday': 0,
+    })
+
+
+def build_dim_product(n_products, rng):
+    """olap_retail dim_product; product_key is 1..n_products"""
+    ids = pd.Series(np.arange(1, n_products + 1))
+    unit_price = np.round(rng.uniform(10, 500, n_products), 2)
+    unit_cost = np.round(rng.uniform(5, 250, n_products), 2)
+    return pd.DataFrame({
+        'product_key': ids,
+        'product_id': ids,
+        'product_name': 'Product_' + ids.astype(str),
+        'category_name': np.asarray(CATEGORIES)[rng.integers(0, len(CATEGORIES), n_products)],
+        'brand': 'Brand_' + (ids % 5).astype(str),
+        'unit_price': unit_price,
+        'unit_cost': unit_cost,
+        'margin_percent': np.round((unit_price - unit_cost) / unit_price * 100, 2),
+    })
+
+
+def build_dim_customer(n_customers, rng):
+    """olap_retail dim_customer; customer_key is 1..n_customers"""
+    ids = pd.Series(np.arange(1, n_customers + 1))
+    text_ids = ids.astype(str)
+    location = rng.integers(0, len(CITIES), n_customers)
+    return pd.DataFrame({
+        'customer_key': ids,
+        'customer_id': ids,
+        'full_name': 'First_' + text_ids + ' Last_' + text_ids,
+        'email': 'customer_' + text_ids + '@email.com',
+        'city': np.asarray(CITIES)[location],
+        'state': np.asarray(STATES)[location],
+        'customer_segment': rng.choice(SEGMENTS, n_customers, p=SEGMENT_WEIGHTS),
+    })
+
+
+def build_dim_store(n_stores, rng):
+    """olap_retail dim_store; store_key is 1..n_stores"""
+    ids = pd.Series(np.arange(1, n_stores + 1))
+    location = rng.integers(0, len(CITIES), n_stores)
+    city = pd.Series(np.asarray(CITIES)[location])
+    state = pd.Series(np.asarray(STATES)[location])
+    return pd.DataFrame({
+        'store_key': ids,
+        'store_id': ids,
+        'store_name': 'Store_' + city + '_' + ids.astype(str),
+        'city': city,
+        'state': state,
+        'region': state.map(REGIONS),
+        'manager_name': 'Manager_' + ids.astype(str),
+    })
+
+
+def sample_sales(rng, n_sales, date_keys, customer_keys, product_keys, unit_prices,
+                 product_column='product_key', first_id=1):
+    """Bookstore/coffee-shop style fact rows (the 03d notebook loop, vectorized).
+
+    product_keys and unit_prices are aligned arrays from the product dimension;
+    product_column names the key column ('book_key' for the bookstore).
+    """
+    product = rng.integers(0, len(product_keys), n_sales)
+    quantity = rng.integers(1, 4, n_sales)
+    discount = rng.choice(DISCOUNT_PERCENTS, n_sales, p=DISCOUNT_PERCENT_WEIGHTS)
+    unit_price = np.asarray(unit_prices)[product]
+    return pd.DataFrame({
+        'sale_id': np.arange(first_id, first_id + n_sales),
+        'date_key': np.asarray(date_keys)[rng.integers(0, len(date_keys), n_sales)],
+        'customer_key': np.asarray(customer_keys)[rng.integers(0, len(customer_keys), n_sales)],
+        product_column: np.asarray(product_keys)[product],
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'discount_percent': discount,
+        'total_amount': np.round(quantity * unit_price * (1 - discount / 100), 2),
+    })
+
+
+class FactSampler:
+    """Draws olap_retail fact_sales batches; order attributes carry over batch boundaries.
+
+    Items of one order share its date, customer and store. A new order starts with
+    probability 1 / ITEMS_PER_ORDER at each item.
+    """
+
+    def __init__(self, rng, date_keys, dim_product, n_customers, n_stores):
+        self.rng = rng
+        self.date_keys = np.asarray(date_keys)
+        self.unit_price = dim_product['unit_price'].to_numpy()
+        self.unit_cost = dim_product['unit_cost'].to_numpy()
+        self.n_customers = n_customers
+        self.n_stores = n_stores
+        self.next_sale_key = 1
+        self.last_order = 0
+        self.open_order = None   # (date_key, customer_key, store_key) of the last order
+
+    def batch(self, n):
+        """Dict of FACT_COLUMNS -> arrays for the next n fact rows"""
+        rng = self.rng
+        new_order = rng.random(n) < 1 / ITEMS_PER_ORDER
+        if self.open_order is None:
+            new_order[0] = True
+        order_id = self.last_order + np.cumsum(new_order)
+        local = order_id - order_id[0]
+        n_orders = int(local[-1]) + 1
+
+        order_date = self.date_keys[rng.integers(0, len(self.date_keys), n_orders)]
+        order_customer = rng.integers(1, self.n_customers + 1, n_orders)
+        order_store = rng.integers(1, self.n_stores + 1, n_orders)
+        if not new_order[0]:
+            # first items continue the order that ended the previous batch
+            order_date[0], order_customer[0], order_store[0] = self.open_order
+        self.last_order = int(order_id[-1])
+        self.open_order = (order_date[-1], order_customer[-1], order_store[-1])
+
+        product = rng.integers(0, len(self.unit_price), n)
+        quantity = rng.integers(1, 5, n)
+        discount = rng.choice(ORDER_DISCOUNTS, n, p=ORDER_DISCOUNT_WEIGHTS)
+        revenue = np.round(quantity * self.unit_price[product] * (1 - discount), 2)
+        cost = np.round(quantity * self.unit_cost[product], 2)
+
+        sale_key = np.arange(self.next_sale_key, self.next_sale_key + n)
+        self.next_sale_key += n
+        return {
+            'sale_key': sale_key,
+            'date_key': order_date[local],
+            'product_key': product + 1,
+            'customer_key': order_customer[local],
+            'store_key': order_store[local],
+            'order_id': order_id,
+            'quantity': quantity,
+            'revenue': revenue,
+            'cost': cost,
+            'profit': np.round(revenue - cost, 2),
+        }
+
+
+class WarehouseReport:
+    """Fact rows written, elapsed time and max RSS for one generated warehouse"""
+
+    def __init__(self, database, dimension_rows, fact_rows, seconds, max_rss_bytes):
+        self.database = database
+        self.dimension_rows = dimension_rows
+        self.fact_rows = fact_rows
+        self.seconds = seconds
+        self.max_rss_bytes = max_rss_bytes
+
+    @property
+    def rows_per_second(self):
+        return self.fact_rows / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return (f"{self.database}: {self.fact_rows:,} fact rows in {self.seconds:.1f}s "
+                f"({self.rows_per_second:,.0f} rows/s, {self.max_rss_bytes / 2**20:.0f} MB max RSS)")
+
+
+def _max_rss_bytes():
+    """Peak RSS of this process (NaN where the resource module does not exist, i.e. Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024   # bytes on macOS, KiB on Linux
+
+
+def generate_olap_retail(database, n_sales, n_customers=1000, n_products=200, n_stores=10,
+                         start='2023-01-01', end='2025-12-31', seed=42, batch_size=DEFAULT_BATCH_SIZE):
+    """Build an olap_retail.db-shaped warehouse with n_sales fact rows and return a WarehouseReport.
+
+    Existing star-schema tables in database are dropped. Facts are committed batch by
+    batch, so the WAL and memory stay bounded by batch_size.
+    """
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    connection = sqlite3.connect(database, isolation_level=None)
+    tune_connection(connection)
+    try:
+        for table in ['fact_sales', 'dim_product', 'dim_customer', 'dim_store', 'dim_date']:
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        for ddl in OLAP_RETAIL_DDL:
+            connection.execute(ddl)
+
+        dim_date = build_dim_date(start, end)
+        dimensions = {
+            'dim_date': dim_date,
+            'dim_product': build_dim_product(n_products, rng),
+            'dim_customer': build_dim_customer(n_customers, rng),
+            'dim_store': build_dim_store(n_stores, rng),
+        }
+        for table, frame in dimensions.items():
+            frame.to_sql(table, connection, if_exists='append', index=False)
+
+        sampler = FactSampler(rng, dim_date['date_key'].to_numpy(), dimensions['dim_product'],
+                              n_customers, n_stores)
+        insert_sql = f"INSERT INTO fact_sales VALUES ({', '.join('?' for _ in FACT_COLUMNS)})"
+        written = 0
+        while written < n_sales:
+            n = min(batch_size, n_sales - written)
+            batch = sampler.batch(n)
+            connection.execute("BEGIN")
+            connection.executemany(insert_sql, zip(*(batch[column].tolist() for column in FACT_COLUMNS)))
+            connection.execute("COMMIT")
+            written += n
+
+        for index in OLAP_RETAIL_INDEXES:
+            connection.execute(index)
+    finally:
+        connection.close()
+
+    dimension_rows = sum(len(frame) for frame in dimensions.values())
+    return WarehouseReport(database, dimension_rows, written, time.perf_counter() - started, _max_rss_bytes())
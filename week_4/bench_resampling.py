@@ -0,0 +1,87 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from resampling import bootstrap, bootstrap_segments, permutation_test
+
+# resampling.bootstrap against the straightforward loop (gather the resample, then
+# np.mean / np.median / np.percentile on it) for B replicates of a skewed sample, plus
+# the per-segment bootstrap and the permutation ANOVA next to stats.f_oneway.
+# The loop is timed on --baseline-replicates and scaled up to B; both sides use the
+# same statistics so the intervals can be compared.
+# Usage: python bench_resampling.py --rows 1000000 --replicates 10000 --workers 4
+
+
+def orders(n, seed=42):
+    """Order amounts by member_type and city, like the 01d notebook's e-commerce data"""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'amount': rng.lognormal(4, 1, n).clip(10, 1000),
+        'member_type': rng.choice(['Basic', 'Premium', 'VIP'], n, p=[0.6, 0.3, 0.1]),
+        'city': rng.choice(['Perth', 'Sydney', 'Melbourne', 'Brisbane', 'Adelaide'], n,
+                           p=[0.15, 0.3, 0.25, 0.2, 0.1]),
+    })
+    frame.loc[frame['member_type'] == 'VIP', 'amount'] *= 1.02
+    return frame
+
+
+def loop_bootstrap(values, replicates, seed):
+    """One resample at a time, the way the notebooks would write it"""
+    rng = np.random.default_rng(seed)
+    results = np.empty((replicates, 3))
+    for i in range(replicates):
+        sample = values[rng.integers(0, len(values), len(values))]
+        results[i] = np.mean(sample), np.median(sample), np.percentile(sample, 90)
+    return np.quantile(results, [0.025, 0.975], axis=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap and permutation test benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--replicates', type=int, default=10_000)
+    parser.add_argument('--baseline-replicates', type=int, default=100)
+    parser.add_argument('--permutations', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'B':>7} {'loop s':>9} {'engine s':>9} {'speed-up':>9} {'segments s':>10} "
+          f"{'f_oneway p':>10} {'perm p':>7} {'perm s':>7}")
+    for n in args.rows:
+        frame = orders(n)
+        values = frame['amount'].to_numpy()
+
+        start = time.perf_counter()
+        baseline = loop_bootstrap(values, args.baseline_replicates, seed=0)
+        loop_seconds = (time.perf_counter() - start) * args.replicates / args.baseline_replicates
+
+        start = time.perf_counter()
+        summary = bootstrap(values, ['mean', 'median', 'p90'], args.replicates, seed=0, workers=args.workers)
+        engine_seconds = time.perf_counter() - start
+        # same sample, same statistics: the intervals must agree up to Monte Carlo noise
+        for (low, high), (_, row) in zip(baseline.T, summary.iterrows()):
+            width = row['ci_high'] - row['ci_low']
+            assert abs(low - row['ci_low']) < width and abs(high - row['ci_high']) < width, row.name
+
+        start = time.perf_counter()
+        bootstrap_segments(frame, 'amount', ['member_type', 'city'], ['mean', 'median'],
+                           replicates=args.replicates // 10, seed=0, workers=args.workers)
+        segment_seconds = time.perf_counter() - start
+
+        groups = [group.to_numpy() for _, group in frame.groupby('member_type')['amount']]
+        f_pvalue = stats.f_oneway(*groups).pvalue
+        start = time.perf_counter()
+        permuted = permutation_test(frame['amount'], frame['member_type'], permutations=args.permutations, seed=0)
+        permutation_seconds = time.perf_counter() - start
+
+        print(f"{n:>10,} {args.replicates:>7,} {loop_seconds:>9.1f} {engine_seconds:>9.1f} "
+              f"{loop_seconds / engine_seconds:>8.1f}x {segment_seconds:>10.1f} {f_pvalue:>10.4f} "
+              f"{permuted.pvalue:>7.4f} {permutation_seconds:>7.1f}")
+        print(summary.round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Bootstrap confidence intervals and permutation tests for the week 4 statistics
+# notebooks (and the member_type ANOVA in week 1's 01d notebook).
+#
+#   bootstrap(amounts, ['mean', 'median', 'p90'], replicates=10_000, seed=42)
+#   bootstrap_segments(df, 'amount', by='member_type', statistics=['mean', 'median'])
+#   permutation_test(df['amount'], df['member_type'])            instead of stats.f_oneway
+#
+# Replicates are drawn as an index matrix, one row per replicate, in chunks of rows
+# that fit in max_bytes. The named statistics never gather the resampled values:
+# each row of indices becomes a count per (sorted) value with one offset np.bincount,
+# so means and variances are one matrix product with the values and percentiles are
+# read off cumulative counts - no gather, sort or partition per replicate. Any other
+# statistic can be passed as a function f(samples, axis) and gets the gathered
+# (chunk, n) sample matrix.
+#
+# Work is split into blocks of BLOCK_REPLICATES replicates per segment, and every
+# block has its own SeedSequence child stream, so blocks run in a process pool and
+# the results depend only on the seed - not on workers or max_bytes.
+
+DEFAULT_REPLICATES = 10_000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MAX_BYTES = 256 * 2**20
+BLOCK_REPLICATES = 1000
+ORDER_BLOCK = 1024
+NAMED_STATISTICS = ('mean', 'std', 'var', 'median')  # plus 'p<q>' percentiles, e.g. 'p2.5', 'p90'
+
+PermutationResult = namedtuple('PermutationResult', ['statistic', 'pvalue'])
+
+
+def _percentile(name):
+    """q in [0, 1] for a named quantile statistic ('median', 'p90'), else None"""
+    if name == 'median':
+        return 0.5
+    if isinstance(name, str) and name.startswith('p'):
+        try:
+            q = float(name[1:])
+        except ValueError:
+            q = None
+        if q is not None and 0 <= q <= 100:
+            return q / 100
+    return None
+
+
+def _statistic_name(statistic):
+    return getattr(statistic, '__name__', repr(statistic)) if callable(statistic) else statistic
+
+
+def _check_statistics(statistics):
+    for statistic in statistics:
+        if not callable(statistic) and statistic not in NAMED_STATISTICS and _percentile(statistic) is None:
+            raise ValueError(f"unknown statistic {statistic!r}; expected one of {list(NAMED_STATISTICS)}, "
+                             f"'p<q>' with 0 <= q <= 100, or a function f(samples, axis)")
+    names = [_statistic_name(statistic) for statistic in statistics]
+    if len(set(names)) < len(names):
+        raise ValueError(f"statistics need distinct names, got {names}")
+
+
+def _clean(values):
+    """Values as a sorted float array without NaN (all named statistics are order-free)"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.sort(values[~np.isnan(values)])
+
+
+def _order_statistics(counts, ranks):
+    """Positions in the sorted values of the given 0-based order statistics of each resample.
+
+    Cumulative counts per ORDER_BLOCK values find the block holding each order
+    statistic; only that block is then summed value by value.
+    """
+    rows, n = counts.shape
+    starts = np.arange(0, n, ORDER_BLOCK)
+    block_cumulative = np.cumsum(np.add.reduceat(counts, starts, axis=1), axis=1)
+    row_index = np.arange(rows)
+    positions = np.empty((rows, len(ranks)), dtype=np.int64)
+    for j, rank in enumerate(ranks):
+        block = np.count_nonzero(block_cumulative <= rank, axis=1)
+        before = np.where(block > 0, block_cumulative[row_index, block - 1], 0)
+        columns = np.minimum(starts[block][:, None] + np.arange(ORDER_BLOCK), n - 1)
+        within = np.cumsum(counts[row_index[:, None], columns], axis=1) + before[:, None]
+        positions[:, j] = starts[block] + np.count_nonzero(within <= rank, axis=1)
+    return positions
+
+
+def _from_counts(sorted_values, counts, statistics):
+    """Named statistics of each resample given as counts per sorted value, shape (chunk, n)"""
+    n = len(sorted_values)
+    results = {}
+    if any(statistic in ('mean', 'std', 'var') for statistic in statistics):
+        centre = sorted_values.mean()
+        centred = sorted_values - centre  # keeps the variance from cancelling
+        sums = counts.astype(np.float64) @ np.column_stack([centred, centred * centred]) / n
+        mean = sums[:, 0]
+        var = np.maximum(sums[:, 1] - mean * mean, 0) * n / (n - 1)
+        results.update(mean=mean + centre, var=var, std=np.sqrt(var))
+    quantiles = {statistic: _percentile(statistic) for statistic in statistics if _percentile(statistic) is not None}
+    if quantiles:
+        # np.quantile's linear method: between order statistics floor(h) and floor(h) + 1
+        h = {statistic: q * (n - 1) for statistic, q in quantiles.items()}
+        ranks = sorted({rank for position in h.values()
+                        for rank in (int(np.floor(position)), min(int(np.floor(position)) + 1, n - 1))})
+        positions = dict(zip(ranks, sorted_values[_order_statistics(counts, ranks)].T))
+        for statistic, position in h.items():
+            low = int(np.floor(position))
+            lower, upper = positions[low], positions[min(low + 1, n - 1)]
+            results[statistic] = lower + (position - low) * (upper - lower)
+    return {statistic: results[statistic] for statistic in statistics}
+
+
+def bootstrap_replicates(values, statistics, replicates, rng, max_bytes=DEFAULT_MAX_BYTES):
+    """{statistic name: array of replicate values} from resampling sorted values with rng"""
+    n = len(values)
+    named = [s for s in statistics if not callable(s)]
+    functions = [s for s in statistics if callable(s)]
+    # per element of a chunk: indices and counts (int64) plus counts as float64
+    chunk = int(max(1, min(replicates, max_bytes // (24 * max(n, 1)))))
+    parts = {_statistic_name(s): [] for s in statistics}
+    for start in range(0, replicates, chunk):
+        rows = min(chunk, replicates - start)
+        indices = rng.integers(0, n, size=(rows, n))
+        for function in functions:
+            parts[_statistic_name(function)].append(np.asarray(function(values[indices], axis=1)))
+        if named:
+            indices += np.arange(rows)[:, None] * n  # row i counts into bins [i * n, (i + 1) * n)
+            counts = np.bincount(indices.ravel(), minlength=rows * n).reshape(rows, n)
+            for name, result in _from_counts(values, counts, named).items():
+                parts[name].append(result)
+            del counts
+    return {name: np.concatenate(chunks) for name, chunks in parts.items()}
+
+
+def _run_block(args):
+    values, statistics, replicates, seed_sequence, max_bytes = args
+    return bootstrap_replicates(values, statistics, replicates, np.random.default_rng(seed_sequence), max_bytes)
+
+
+def _blocks(replicates):
+    return [min(BLOCK_REPLICATES, replicates - start) for start in range(0, replicates, BLOCK_REPLICATES)]
+
+
+def _map(tasks, workers):
+    """Run _run_block over tasks, in a process pool when workers > 1"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        return [_run_block(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(_run_block, tasks))
+
+
+def _summary(values, replicates, statistics, confidence):
+    """One row per statistic: point estimate, bootstrap standard error and percentile interval"""
+    point = _from_counts(values, np.ones((1, len(values)), dtype=np.int64), [s for s in statistics if not callable(s)])
+    alpha = (1 - confidence) / 2
+    rows = {}
+    for statistic in statistics:
+        name = _statistic_name(statistic)
+        estimate = float(statistic(values[None, :], axis=1)[0]) if callable(statistic) else float(point[name][0])
+        ci_low, ci_high = np.quantile(replicates[name], [alpha, 1 - alpha])
+        rows[name] = {'n': len(values), 'estimate': estimate, 'std_error': np.std(replicates[name], ddof=1),
+                      'ci_low': ci_low, 'ci_high': ci_high}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def bootstrap(values, statistics=('mean',), replicates=DEFAULT_REPLICATES, confidence=DEFAULT_CONFIDENCE,
+              seed=None, workers=None, max_bytes=DEFAULT_MAX_BYTES, return_replicates=False):
+    """Percentile bootstrap confidence intervals for statistics of one sample (NaN dropped).
+
+    Returns a DataFrame indexed by statistic with n, estimate, std_error, ci_low and
+    ci_high; with return_replicates=True also the {statistic: replicate array} dict.
+    """
+    statistics = list(statistics)
+    _check_statistics(statistics)
+    values = _clean(values)
+    if len(values) < 2:
+        raise ValueError('bootstrap needs at least two non-missing values')
+    blocks = _blocks(replicates)
+    streams = np.random.SeedSequence(seed).spawn(len(blocks))
+    results = _map([(values, statistics, size, stream, max_bytes) for size, stream in zip(blocks, streams)], workers)
+    combined = {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+    summary = _summary(values, combined, statistics, confidence)
+    return (summary, combined) if return_replicates else summary
+
+
+def bootstrap_segments(frame, value, by, statistics=('mean',), replicates=DEFAULT_REPLICATES,
+                       confidence=DEFAULT_CONFIDENCE, seed=None, workers=None, max_bytes=DEFAULT_MAX_BYTES):
+    """bootstrap() of frame[value] within each group of by, with segments spread over a process pool.
+
+    Segment i (in groupby order) uses child i of SeedSequence(seed), so adding a
+    segment or changing workers never changes another segment's intervals.
+    Segments with fewer than two values are left out. Returns a DataFrame indexed
+    by (group keys..., statistic).
+    """
+    statistics = list(statistics)
+    _check_statistics(statistics)
+    segments = [(key, _clean(group)) for key, group in frame.groupby(by, observed=True)[value]]
+    segments = [(key, values) for key, values in segments if len(values) >= 2]
+    tasks, owners = [], []
+    for (key, values), segment_seed in zip(segments, np.random.SeedSequence(seed).spawn(len(segments))):
+        blocks = _blocks(replicates)
+        for size, stream in zip(blocks, segment_seed.spawn(len(blocks))):
+            tasks.append((values, statistics, size, stream, max_bytes))
+            owners.append(key)
+    results = _map(tasks, workers)
+
+    summaries = {}
+    for key, values in segments:
+        mine = [result for owner, result in zip(owners, results) if owner == key]
+        combined = {name: np.concatenate([result[name] for result in mine]) for name in mine[0]}
+        summaries[key] = _summary(values, combined, statistics, confidence)
+    names = [by] if isinstance(by, str) else list(by)
+    return pd.concat(summaries, names=names + ['statistic'])
+
+
+def permutation_test(values, groups, statistic='anova', permutations=DEFAULT_REPLICATES, seed=None):
+    """Permutation test that the groups share one distribution (rows with missing values dropped).
+
+    statistic='anova': the one-way ANOVA F statistic, an alternative to
+    stats.f_oneway whose p-value does not assume normal residuals.
+    statistic='mean_difference': mean of the second group minus the first (sorted
+    labels), two-sided. Returns PermutationResult(statistic, pvalue) like scipy's
+    tests; the p-value is (1 + permutations at least as extreme) / (1 + permutations).
+
+    Each permutation only shuffles the (int8) group labels and sums the values per
+    group with a weighted np.bincount; the statistic is then computed for all
+    permutations at once from the (permutations, groups) matrix of sums.
+    """
+    if statistic not in ('anova', 'mean_difference'):
+        raise ValueError(f"unknown statistic {statistic!r}; expected 'anova' or 'mean_difference'")
+    values = np.asarray(values, dtype=np.float64)
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    keep = ~np.isnan(values) & (codes >= 0)
+    values, codes = values[keep], codes[keep].astype(np.min_scalar_type(len(labels)))
+    n, k = len(values), len(labels)
+    if statistic == 'mean_difference' and k != 2:
+        raise ValueError(f"mean_difference needs exactly two groups, got {k}")
+    if k < 2:
+        raise ValueError('a permutation test needs at least two groups')
+    values = values - values.mean()  # F and the difference are shift-invariant; keeps sums small
+    sizes = np.bincount(codes, minlength=k).astype(np.float64)
+    total_ss = np.sum(values * values)
+
+    def statistic_of(sums):
+        if statistic == 'mean_difference':
+            return sums[:, 1] / sizes[1] - sums[:, 0] / sizes[0]
+        between = np.sum(sums * sums / sizes, axis=1)  # the grand mean is 0 after centring
+        with np.errstate(divide='ignore', invalid='ignore'):  # constant values: F is NaN, like f_oneway
+            return (between / (k - 1)) / ((total_ss - between) / (n - k))
+
+    observed = statistic_of(np.bincount(codes, weights=values, minlength=k)[None, :])[0]
+    rng = np.random.default_rng(seed)
+    sums = np.array([np.bincount(rng.permutation(codes), weights=values, minlength=k) for _ in range(permutations)])
+    permuted = statistic_of(sums.reshape(permutations, k))
+    if statistic == 'mean_difference':
+        permuted, observed_extreme = np.abs(permuted), abs(observed)
+    else:
+        observed_extreme = observed
+    # the relative tolerance keeps the identity permutation's rounding from counting against it
+    extreme = np.count_nonzero(permuted >= observed_extreme * (1 - 1e-12))
+    pvalue = np.nan if np.isnan(observed) else (1 + extreme) / (1 + permutations)
+    return PermutationResult(float(observed), float(pvalue))